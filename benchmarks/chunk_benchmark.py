@@ -0,0 +1,93 @@
+"""SSE chunk formatting micro-benchmark
+
+Compares serialization.format_chunk against the previous dict + json.dumps formatter
+for typical progress lines, heartbeats and final chunks, and checks that both
+produce the same JSON payload.
+
+Usage:
+    python -m benchmarks.chunk_benchmark [--count 100000] [--repeat 5]
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+
+from src.core import serialization
+from src.core.serialization import format_chunk
+
+CASES = {
+    "progress": dict(reasoning_content="**Video Generation Progress**: 42% (running)\n"),
+    "heartbeat": dict(reasoning_content="Image generation in progress... (30s elapsed)\n"),
+    "first": dict(reasoning_content="**Generation Process Begins**\n\nInitializing generation request...\n", is_first=True),
+    "final": dict(content="```html\n<video src='http://127.0.0.1:8000/tmp/abc.mp4' controls></video>\n```", finish_reason="STOP"),
+}
+
+
+def legacy_format_chunk(content: str = None, reasoning_content: str = None,
+                        finish_reason: str = None, is_first: bool = False) -> bytes:
+    """Previous GenerationHandler._format_stream_chunk, encoded the way Starlette sends str chunks"""
+    chunk_id = f"chatcmpl-{int(datetime.now().timestamp() * 1000)}"
+    delta = {}
+    if is_first:
+        delta["role"] = "assistant"
+    delta["content"] = content
+    delta["reasoning_content"] = reasoning_content
+    delta["tool_calls"] = None
+    response = {
+        "id": chunk_id,
+        "object": "chat.completion.chunk",
+        "created": int(datetime.now().timestamp()),
+        "model": "sora",
+        "choices": [{
+            "index": 0,
+            "delta": delta,
+            "finish_reason": finish_reason,
+            "native_finish_reason": finish_reason
+        }],
+        "usage": {
+            "prompt_tokens": 0
+        }
+    }
+    if finish_reason:
+        response["usage"]["completion_tokens"] = 1
+        response["usage"]["total_tokens"] = 1
+    return f'data: {json.dumps(response)}\n\n'.encode("utf-8")
+
+
+def _payload(chunk: bytes) -> dict:
+    """Parsed JSON of an SSE data line, without the time-dependent fields"""
+    data = json.loads(chunk[len(b"data: "):])
+    data.pop("id")
+    data.pop("created")
+    return data
+
+
+def _measure(formatter, kwargs: dict, count: int, repeat: int) -> float:
+    """Best chunks per second"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(count):
+            formatter(**kwargs)
+        best = min(best, time.perf_counter() - start)
+    return count / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SSE chunk formatting micro-benchmark")
+    parser.add_argument("--count", type=int, default=100000, help="Chunks per measurement")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement, the best one is reported")
+    args = parser.parse_args()
+
+    print(f"backend: {serialization.BACKEND}")
+    print(f"{'case':<12}{'legacy/s':>14}{'template/s':>14}{'speedup':>10}")
+    for name, kwargs in CASES.items():
+        if _payload(legacy_format_chunk(**kwargs)) != _payload(format_chunk(**kwargs)):
+            raise SystemExit(f"Payload mismatch for case {name}")
+        legacy = _measure(legacy_format_chunk, kwargs, args.count, args.repeat)
+        template = _measure(format_chunk, kwargs, args.count, args.repeat)
+        print(f"{name:<12}{legacy:>14,.0f}{template:>14,.0f}{template / legacy:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""PoW solver micro-benchmark
+
+Times SoraClient._solve_pow:
+- raw iterations per second (difficulty that is never met within the window)
+- time to solution for the difficulties returned in proofofwork.difficulty
+
+A solve at these difficulties takes around a millisecond, which is what bounds the gain
+any solver rewrite can bring to a request.
+
+Usage:
+    python -m benchmarks.pow_benchmark [--iterations 100000] [--seeds 200] [--repeat 5]
+
+Timings are best-of-N to filter out scheduler noise.
+"""
+import argparse
+import base64
+import json
+import random
+import statistics
+import time
+
+from src.services import sora_client
+from src.services.sora_client import SoraClient, DESKTOP_USER_AGENTS
+
+# Difficulties seen in sentinel/req proofofwork.difficulty (plus the fixed initial "0fffff")
+DIFFICULTIES = ["0fffff", "07ffff", "03ffff", "01ffff"]
+
+
+def _measure_rate(config_list: list, iterations: int, repeat: int) -> float:
+    """Best iterations per second over a fixed window"""
+    original_max = sora_client.POW_MAX_ITERATION
+    sora_client.POW_MAX_ITERATION = iterations
+    try:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            # Difficulty of 8 zero bytes is never met, so the solver runs the full window
+            SoraClient._solve_pow("0.123456789", "0000000000000000", config_list)
+            best = min(best, time.perf_counter() - start)
+        return iterations / best
+    finally:
+        sora_client.POW_MAX_ITERATION = original_max
+
+
+def _measure_solve(seed: str, difficulty: str, config_list: list, repeat: int) -> tuple:
+    """Best seconds to solve one case, and the iterations the solution took"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        solution, success = SoraClient._solve_pow(seed, difficulty, config_list)
+        best = min(best, time.perf_counter() - start)
+    if not success:
+        raise SystemExit(f"No solution for seed={seed} difficulty={difficulty}")
+    # The iteration counter is the fourth element of the encoded config
+    return best, json.loads(base64.b64decode(solution))[3]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PoW solver micro-benchmark")
+    parser.add_argument("--iterations", type=int, default=100000, help="Iterations for the raw rate window")
+    parser.add_argument("--seeds", type=int, default=200, help="Seeds per difficulty for time-to-solution")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement, the best one is reported")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    config_list = SoraClient._get_pow_config(DESKTOP_USER_AGENTS[0])
+    print(f"raw rate: {_measure_rate(config_list, args.iterations, args.repeat):,.0f} iter/s")
+    print()
+
+    print(f"{'difficulty':<12}{'mean ms':>10}{'p50 ms':>10}{'max ms':>10}{'mean iter':>12}")
+    for difficulty in DIFFICULTIES:
+        times, iterations = [], []
+        for _ in range(args.seeds):
+            config_list = SoraClient._get_pow_config(rng.choice(DESKTOP_USER_AGENTS))
+            elapsed, iteration = _measure_solve(str(rng.random()), difficulty, config_list, args.repeat)
+            times.append(elapsed * 1000)
+            iterations.append(iteration + 1)
+        print(f"{difficulty:<12}{statistics.mean(times):>10.3f}{statistics.median(times):>10.3f}"
+              f"{max(times):>10.3f}{statistics.mean(iterations):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -123,6 +123,14 @@ class UpdateProxyConfigRequest(BaseModel):
     proxy_enabled: bool
     proxy_url: Optional[str] = None
 
+class AddProxyPoolEntryRequest(BaseModel):
+    proxy_url: str
+    remark: Optional[str] = None
+
+class UpdateProxyPoolEntryRequest(BaseModel):
+    enabled: Optional[bool] = None
+    remark: Optional[str] = None
+
 class UpdateAdminPasswordRequest(BaseModel):
     old_password: str
     new_password: str
@@ -796,6 +804,63 @@ async def update_proxy_config(
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+# Proxy pool endpoints
+@router.get("/api/proxy/pool")
+async def get_proxy_pool(token: str = Depends(verify_admin_token)) -> dict:
+    """Get proxy pool members with their health"""
+    entries = await db.get_proxy_pool()
+    health = {item["proxy_url"]: item for item in proxy_manager.get_pool_status()}
+    return {
+        "policy": config.proxy_pool_policy,
+        "proxies": [
+            {
+                "id": entry.id,
+                "proxy_url": entry.proxy_url,
+                "enabled": entry.enabled,
+                "remark": entry.remark,
+                "health": health.get(entry.proxy_url)
+            }
+            for entry in entries
+        ]
+    }
+
+@router.post("/api/proxy/pool")
+async def add_proxy_pool_entry(
+    request: AddProxyPoolEntryRequest,
+    token: str = Depends(verify_admin_token)
+):
+    """Add a proxy to the pool"""
+    try:
+        entry_id = await db.add_proxy_pool_entry(request.proxy_url.strip(), request.remark)
+        await proxy_manager.reload_pool()
+        return {"success": True, "message": "Proxy added to pool", "id": entry_id}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.put("/api/proxy/pool/{entry_id}")
+async def update_proxy_pool_entry(
+    entry_id: int,
+    request: UpdateProxyPoolEntryRequest,
+    token: str = Depends(verify_admin_token)
+):
+    """Enable/disable a pool proxy or change its remark"""
+    try:
+        await db.update_proxy_pool_entry(entry_id, enabled=request.enabled, remark=request.remark)
+        await proxy_manager.reload_pool()
+        return {"success": True, "message": "Proxy pool entry updated"}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.delete("/api/proxy/pool/{entry_id}")
+async def delete_proxy_pool_entry(entry_id: int, token: str = Depends(verify_admin_token)):
+    """Remove a proxy from the pool"""
+    try:
+        await db.delete_proxy_pool_entry(entry_id)
+        await proxy_manager.reload_pool()
+        return {"success": True, "message": "Proxy removed from pool"}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # Watermark-free config endpoints
 @router.get("/api/watermark-free/config")
 async def get_watermark_free_config(token: str = Depends(verify_admin_token)) -> dict:
@@ -830,6 +895,22 @@ async def update_watermark_free_config(
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/api/watermark-free/stats")
+async def get_watermark_free_stats(token: str = Depends(verify_admin_token)):
+    """Get per parse method success rate and latency"""
+    return {
+        "success": True,
+        "stats": generation_handler.watermark_resolver.get_stats() if generation_handler else None
+    }
+
+@router.get("/api/watermark-free/cleanup")
+async def get_post_cleanup_stats(token: str = Depends(verify_admin_token)):
+    """Get published post cleanup queue counts by status"""
+    return {
+        "success": True,
+        "stats": await generation_handler.post_cleanup.get_stats() if generation_handler else None
+    }
+
 # Captcha config endpoints
 @router.get("/api/captcha/config")
 async def get_captcha_config(token: str = Depends(verify_admin_token)) -> dict:
@@ -1161,6 +1242,56 @@ async def update_at_auto_refresh_enabled(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update AT auto refresh enabled status: {str(e)}")
 
+# Generation dedup endpoints
+@router.get("/api/dedup/stats")
+async def get_dedup_stats(token: str = Depends(verify_admin_token)):
+    """Get generation deduplication statistics"""
+    return {
+        "success": True,
+        "enabled": config.dedup_enabled,
+        "stats": generation_handler.single_flight.get_stats() if generation_handler else None
+    }
+
+@router.post("/api/dedup/purge")
+async def purge_dedup_results(token: str = Depends(verify_admin_token)):
+    """Drop cached generation results so identical requests generate again"""
+    purged = generation_handler.single_flight.purge() if generation_handler else 0
+    return {"success": True, "purged": purged}
+
+# Character registry endpoints
+@router.get("/api/characters")
+async def get_registered_characters(limit: int = 100, token: str = Depends(verify_admin_token)):
+    """Get characters registered for reuse"""
+    return {"success": True, "characters": await db.get_all_registered_characters(limit)}
+
+@router.delete("/api/characters/{entry_id}")
+async def delete_registered_character(entry_id: int, token: str = Depends(verify_admin_token)):
+    """Remove a character from the registry, the next request for its video creates it again
+
+    Private characters are deleted upstream as well, an entry whose upstream delete fails is kept.
+    """
+    entry = await db.get_registered_character(entry_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Character not found")
+    if not await generation_handler.character_cleanup.drop(entry):
+        raise HTTPException(status_code=502, detail="Failed to delete character upstream, kept in registry")
+    return {"success": True, "message": "Character removed from registry"}
+
+# Prompt enhancement cache endpoints
+@router.get("/api/prompt-enhance/cache/stats")
+async def get_prompt_enhance_cache_stats(token: str = Depends(verify_admin_token)):
+    """Get prompt enhancement cache statistics"""
+    return {
+        "success": True,
+        "stats": generation_handler.enhance_cache.get_stats() if generation_handler else None
+    }
+
+@router.post("/api/prompt-enhance/cache/purge")
+async def purge_prompt_enhance_cache(token: str = Depends(verify_admin_token)):
+    """Drop cached enhanced prompts"""
+    purged = generation_handler.enhance_cache.clear() if generation_handler else 0
+    return {"success": True, "purged": purged}
+
 # Task management endpoints
 @router.post("/api/tasks/{task_id}/cancel")
 async def cancel_task(task_id: str, token: str = Depends(verify_admin_token)):
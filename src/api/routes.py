@@ -1,24 +1,53 @@
 """API routes - OpenAI compatible endpoints"""
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, UploadFile, File, Form
 from fastapi.responses import StreamingResponse, JSONResponse
 from datetime import datetime
-from typing import List
+from typing import List, Optional, Tuple
+import asyncio
+import hashlib
 import json
 import re
+import time
 from ..core.auth import verify_api_key_header
-from ..core.models import ChatCompletionRequest
+from ..core.models import ChatCompletionRequest, JobCreateRequest, Task, Batch, BatchItem
+from ..core.config import config
+from ..core.logger import debug_logger
+from ..core.serialization import SSE_DONE, dumps, format_chunk, format_event
+from ..core.url_guard import UnsafeURLError, ensure_public_url
 from ..services.generation_handler import GenerationHandler, MODEL_CONFIG
+from ..services.job_executor import JobExecutor
+from ..services.batch_runner import BatchRunner
+from ..services.media_spool import FileField, MediaFile, MediaTooLargeError, MultipartError, spool_multipart
 
 router = APIRouter()
 
+# Bytes read from a batch upload at a time
+BATCH_READ_CHUNK = 64 * 1024
+# Seconds between keepalive chunks while a job stream waits on the task row
+JOB_KEEPALIVE_INTERVAL = 10
+
 # Dependency injection will be set up in main.py
 generation_handler: GenerationHandler = None
 
+job_executor: JobExecutor = None
+
+batch_runner: BatchRunner = None
+
 def set_generation_handler(handler: GenerationHandler):
     """Set generation handler instance"""
     global generation_handler
     generation_handler = handler
 
+def set_job_executor(executor: JobExecutor):
+    """Set job executor instance"""
+    global job_executor
+    job_executor = executor
+
+def set_batch_runner(runner: BatchRunner):
+    """Set batch runner instance"""
+    global batch_runner
+    batch_runner = runner
+
 def _extract_remix_id(text: str) -> str:
     """Extract remix ID from text
 
@@ -42,6 +71,80 @@ def _extract_remix_id(text: str) -> str:
 
     return ""
 
+def _parse_chat_messages(request: ChatCompletionRequest) -> Tuple[str, Optional[str], Optional[str], str]:
+    """Extract prompt, image, video and remix ID from the last chat message
+
+    Returns:
+        (prompt, image_data, video_data, remix_target_id)
+    """
+    # Extract prompt from messages
+    if not request.messages:
+        raise HTTPException(status_code=400, detail="Messages cannot be empty")
+
+    last_message = request.messages[-1]
+    content = last_message.content
+
+    # Handle both string and array format (OpenAI multimodal)
+    prompt = ""
+    image_data = request.image  # Default to request.image if provided
+    video_data = request.video  # Video parameter
+    remix_target_id = request.remix_target_id  # Remix target ID
+
+    if isinstance(content, str):
+        # Simple string format
+        prompt = content
+        # Extract remix_target_id from prompt if not already provided
+        if not remix_target_id:
+            remix_target_id = _extract_remix_id(prompt)
+    elif isinstance(content, list):
+        # Array format (OpenAI multimodal)
+        for item in content:
+            if isinstance(item, dict):
+                if item.get("type") == "text":
+                    prompt = item.get("text", "")
+                    # Extract remix_target_id from prompt if not already provided
+                    if not remix_target_id:
+                        remix_target_id = _extract_remix_id(prompt)
+                elif item.get("type") == "image_url":
+                    # Extract base64 image from data URI
+                    image_url = item.get("image_url", {})
+                    url = image_url.get("url", "")
+                    if url.startswith("data:image"):
+                        # Extract base64 data from data URI
+                        if "base64," in url:
+                            image_data = url.split("base64,", 1)[1]
+                        else:
+                            image_data = url
+                    elif url.startswith(("http://", "https://")):
+                        # Remote image, fetched by generation_handler
+                        image_data = url
+                elif item.get("type") == "video_url":
+                    # Extract video from video_url
+                    video_url = item.get("video_url", {})
+                    url = video_url.get("url", "")
+                    if url.startswith("data:video") or url.startswith("data:application"):
+                        # Extract base64 data from data URI
+                        if "base64," in url:
+                            video_data = url.split("base64,", 1)[1]
+                        else:
+                            video_data = url
+                    else:
+                        # It's a URL, pass it as-is (will be downloaded in generation_handler)
+                        video_data = url
+    else:
+        raise HTTPException(status_code=400, detail="Invalid content format")
+
+    return prompt, image_data, video_data, remix_target_id
+
+async def _check_webhook_url(webhook_url: Optional[str]):
+    """Reject a webhook_url that is not http(s) or does not resolve to a public address"""
+    if not webhook_url:
+        return
+    try:
+        await ensure_public_url(webhook_url)
+    except UnsafeURLError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid webhook_url: {e}")
+
 @router.get("/v1/models")
 async def list_models(api_key: str = Depends(verify_api_key_header)):
     """List available models"""
@@ -71,72 +174,59 @@ async def list_models(api_key: str = Depends(verify_api_key_header)):
 @router.post("/v1/chat/completions")
 async def create_chat_completion(
     request: ChatCompletionRequest,
-    api_key: str = Depends(verify_api_key_header)
+    api_key: str = Depends(verify_api_key_header),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
-    """Create chat completion (unified endpoint for image and video generation)"""
+    """Create chat completion (unified endpoint for image and video generation)
+
+    Streaming image/video requests with an Idempotency-Key header run as a job, so a
+    retry with the same key attaches to the original generation instead of submitting again.
+    """
     try:
-        # Extract prompt from messages
-        if not request.messages:
-            raise HTTPException(status_code=400, detail="Messages cannot be empty")
-
-        last_message = request.messages[-1]
-        content = last_message.content
-
-        # Handle both string and array format (OpenAI multimodal)
-        prompt = ""
-        image_data = request.image  # Default to request.image if provided
-        video_data = request.video  # Video parameter
-        remix_target_id = request.remix_target_id  # Remix target ID
-
-        if isinstance(content, str):
-            # Simple string format
-            prompt = content
-            # Extract remix_target_id from prompt if not already provided
-            if not remix_target_id:
-                remix_target_id = _extract_remix_id(prompt)
-        elif isinstance(content, list):
-            # Array format (OpenAI multimodal)
-            for item in content:
-                if isinstance(item, dict):
-                    if item.get("type") == "text":
-                        prompt = item.get("text", "")
-                        # Extract remix_target_id from prompt if not already provided
-                        if not remix_target_id:
-                            remix_target_id = _extract_remix_id(prompt)
-                    elif item.get("type") == "image_url":
-                        # Extract base64 image from data URI
-                        image_url = item.get("image_url", {})
-                        url = image_url.get("url", "")
-                        if url.startswith("data:image"):
-                            # Extract base64 data from data URI
-                            if "base64," in url:
-                                image_data = url.split("base64,", 1)[1]
-                            else:
-                                image_data = url
-                    elif item.get("type") == "video_url":
-                        # Extract video from video_url
-                        video_url = item.get("video_url", {})
-                        url = video_url.get("url", "")
-                        if url.startswith("data:video") or url.startswith("data:application"):
-                            # Extract base64 data from data URI
-                            if "base64," in url:
-                                video_data = url.split("base64,", 1)[1]
-                            else:
-                                video_data = url
-                        else:
-                            # It's a URL, pass it as-is (will be downloaded in generation_handler)
-                            video_data = url
-        else:
-            raise HTTPException(status_code=400, detail="Invalid content format")
+        prompt, image_data, video_data, remix_target_id = _parse_chat_messages(request)
 
         # Validate model
         if request.model not in MODEL_CONFIG:
             raise HTTPException(status_code=400, detail=f"Invalid model: {request.model}")
+        await _check_webhook_url(request.webhook_url)
 
         # Check if this is a video model
         model_config = MODEL_CONFIG[request.model]
         is_video_model = model_config["type"] == "video"
 
+        if idempotency_key and request.stream and model_config["type"] in ("image", "video"):
+            job_id = job_executor.new_job_id()
+            try:
+                existing_job_id = await _claim_idempotency_key(idempotency_key, request, job_id)
+            except HTTPException as e:
+                return JSONResponse(
+                    status_code=e.status_code,
+                    content={
+                        "error": {
+                            "message": e.detail,
+                            "type": "invalid_request_error",
+                            "param": None,
+                            "code": "idempotency_key_reused"
+                        }
+                    }
+                )
+            if not existing_job_id:
+                try:
+                    await job_executor.submit(request.model, prompt, image_data, request.webhook_url,
+                                              video=video_data, remix_target_id=remix_target_id, job_id=job_id)
+                except Exception:
+                    await generation_handler.db.release_idempotency_key(idempotency_key)
+                    raise
+            return StreamingResponse(
+                _job_chat_events(existing_job_id or job_id),
+                media_type="text/event-stream",
+                headers={
+                    "Cache-Control": "no-cache",
+                    "Connection": "keep-alive",
+                    "X-Accel-Buffering": "no"
+                }
+            )
+
         # For video models with video parameter, we need streaming
         if is_video_model and (video_data or remix_target_id):
             if not request.stream:
@@ -171,14 +261,25 @@ async def create_chat_completion(
         if request.stream:
             async def generate():
                 try:
-                    async for chunk in generation_handler.handle_generation(
-                        model=request.model,
-                        prompt=prompt,
-                        image=image_data,
-                        video=video_data,
-                        remix_target_id=remix_target_id,
-                        stream=True
-                    ):
+                    if config.dedup_enabled and not video_data and model_config["type"] in ("image", "video"):
+                        chunks = generation_handler.handle_generation_deduplicated(
+                            model=request.model,
+                            prompt=prompt,
+                            image=image_data,
+                            remix_target_id=remix_target_id,
+                            webhook_url=request.webhook_url
+                        )
+                    else:
+                        chunks = generation_handler.handle_generation(
+                            model=request.model,
+                            prompt=prompt,
+                            image=image_data,
+                            video=video_data,
+                            remix_target_id=remix_target_id,
+                            stream=True,
+                            webhook_url=request.webhook_url
+                        )
+                    async for chunk in chunks:
                         yield chunk
                 except Exception as e:
                     # Try to parse structured error (JSON format)
@@ -202,9 +303,8 @@ async def create_chat_completion(
                                 "code": None
                             }
                         }
-                    error_chunk = f'data: {json.dumps(error_response)}\n\n'
-                    yield error_chunk
-                    yield 'data: [DONE]\n\n'
+                    yield format_event(error_response)
+                    yield SSE_DONE
 
             return StreamingResponse(
                 generate(),
@@ -257,3 +357,431 @@ async def create_chat_completion(
                 }
             }
         )
+
+@router.post("/v1/generations")
+async def create_generation_upload(request: Request, api_key: str = Depends(verify_api_key_header)):
+    """Streaming generation from a multipart/form-data upload
+
+    Form fields: model, prompt, optional image and video files, remix_target_id, webhook_url.
+    Files are streamed from the request body to disk and uploaded upstream by path, so large reference
+    images and character videos are never held in memory. Responds with the same SSE
+    stream as /v1/chat/completions.
+    """
+    # Reject oversized bodies before anything is read, the limit is enforced again while streaming
+    max_body = config.upload_max_image_size + config.upload_max_video_size + 1024 * 1024
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_body:
+        raise HTTPException(status_code=413, detail="Request body too large")
+
+    try:
+        form, uploads = await spool_multipart(request, {
+            "image": FileField(config.upload_max_image_size, "image/png"),
+            "video": FileField(config.upload_max_video_size, "video/mp4")
+        }, max_body=max_body)
+    except MediaTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except MultipartError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    media_files: List[MediaFile] = list(uploads.values())
+    image = uploads.get("image")
+    video = uploads.get("video")
+    handed_off = False
+    try:
+        model = form.get("model")
+        prompt = form.get("prompt") or ""
+        remix_target_id = form.get("remix_target_id") or None
+        webhook_url = form.get("webhook_url") or None
+        if model not in MODEL_CONFIG:
+            raise HTTPException(status_code=400, detail=f"Invalid model: {model}")
+        model_config = MODEL_CONFIG[model]
+        if model_config["type"] not in ("image", "video"):
+            raise HTTPException(status_code=400, detail=f"Model {model} does not support uploads")
+        if video is not None and model_config["type"] != "video":
+            raise HTTPException(status_code=400, detail="Video uploads require a video model")
+        if not prompt and not video:
+            raise HTTPException(status_code=400, detail="Prompt is required")
+        await _check_webhook_url(webhook_url)
+        handed_off = True
+    finally:
+        # Until the stream takes ownership, every spooled file is removed here
+        if not handed_off:
+            for media in media_files:
+                media.remove()
+
+    async def generate():
+        try:
+            async for chunk in generation_handler.handle_generation(
+                model=model,
+                prompt=prompt,
+                image=image,
+                video=video,
+                remix_target_id=remix_target_id,
+                stream=True,
+                webhook_url=webhook_url
+            ):
+                yield chunk
+        except Exception as e:
+            try:
+                error_response = json.loads(str(e))
+            except Exception:
+                error_response = None
+            if not (isinstance(error_response, dict) and "error" in error_response):
+                error_response = {
+                    "error": {
+                        "message": str(e),
+                        "type": "server_error",
+                        "param": None,
+                        "code": None
+                    }
+                }
+            yield format_event(error_response)
+            yield SSE_DONE
+        finally:
+            for media in media_files:
+                media.remove()
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+def _job_response(task: Task) -> dict:
+    """Build the job API view of a task row"""
+    result_urls = None
+    if task.result_urls:
+        try:
+            result_urls = json.loads(task.result_urls)
+        except (json.JSONDecodeError, TypeError):
+            result_urls = [task.result_urls]
+    return {
+        "id": task.job_id,
+        "object": "job",
+        "model": task.model,
+        "status": task.status,
+        "progress": task.progress,
+        "task_id": task.task_id if task.task_id != task.job_id else None,
+        "result_urls": result_urls,
+        "error": task.error_message,
+        "created_at": int(task.created_at.timestamp()) if task.created_at else None,
+        "completed_at": int(task.completed_at.timestamp()) if task.completed_at else None
+    }
+
+async def _claim_idempotency_key(idempotency_key: str, request, job_id: str) -> Optional[str]:
+    """Bind an Idempotency-Key to job_id, or return the job it is already bound to
+
+    Raises 422 when the key was used for a different request body.
+    """
+    request_hash = hashlib.sha256(dumps(request.model_dump(mode="json"))).hexdigest()
+    existing = await generation_handler.db.claim_idempotency_key(
+        idempotency_key, request_hash, job_id, config.idempotency_ttl
+    )
+    if not existing:
+        return None
+    if existing["request_hash"] != request_hash:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+    debug_logger.log_info(f"Idempotency-Key replay, attaching to job {existing['job_id']}")
+    return existing["job_id"]
+
+async def _job_chat_events(job_id: str):
+    """Stream a job as chat completion chunks
+
+    Follows the live stream while the job runs in this process; otherwise waits for the
+    task row to finish and sends its result (or error) as a single final chunk. While
+    waiting, a keepalive chunk is sent every JOB_KEEPALIVE_INTERVAL seconds, and the wait
+    gives up once the job could no longer finish within its queue and generation timeouts.
+    """
+    broadcast = job_executor.get_broadcast(job_id)
+    if broadcast:
+        async for chunk in broadcast.subscribe():
+            yield chunk
+        return
+
+    task = await generation_handler.db.get_task_by_job_id(job_id)
+    is_video = bool(task) and MODEL_CONFIG.get(task.model, {}).get("type") == "video"
+    timeout = config.job_queue_timeout + (config.video_timeout if is_video else config.image_timeout)
+    start_time = time.time()
+    last_keepalive = start_time
+    is_first = True
+    timed_out = False
+    while task and task.status not in ("completed", "failed", "cancelled"):
+        current_time = time.time()
+        if current_time - start_time >= timeout:
+            timed_out = True
+            break
+        if current_time - last_keepalive >= JOB_KEEPALIVE_INTERVAL:
+            last_keepalive = current_time
+            yield format_chunk(
+                reasoning_content=f"Job {task.status}... ({int(current_time - start_time)}s elapsed)\n",
+                is_first=is_first
+            )
+            is_first = False
+        await asyncio.sleep(config.poll_interval)
+        task = await generation_handler.db.get_task_by_job_id(job_id)
+
+    if task and task.status == "completed":
+        result_urls = _job_response(task)["result_urls"] or []
+        if is_video:
+            content = "\n".join(f"```html\n<video src='{url}' controls></video>\n```" for url in result_urls)
+        else:
+            content = "\n".join(f"![Generated Image]({url})" for url in result_urls)
+        yield format_chunk(content=content, finish_reason="STOP", is_first=is_first)
+    else:
+        if timed_out:
+            message = f"Job {job_id} did not finish within {timeout}s, still {task.status}"
+        else:
+            message = (task.error_message if task else None) or f"Job {job_id} {task.status if task else 'not found'}"
+        yield format_event({
+            "error": {
+                "message": message,
+                "type": "server_error",
+                "param": None,
+                "code": None
+            }
+        })
+    yield SSE_DONE
+
+async def _submit_job(request: JobCreateRequest, model_type: str,
+                      idempotency_key: Optional[str] = None) -> JSONResponse:
+    """Validate and queue a job API submission
+
+    With an Idempotency-Key that is already bound, the original job is returned (200) instead.
+    """
+    model_config = MODEL_CONFIG.get(request.model)
+    if not model_config or model_config["type"] != model_type:
+        raise HTTPException(status_code=400, detail=f"Invalid {model_type} model: {request.model}")
+    if not request.prompt:
+        raise HTTPException(status_code=400, detail="Prompt is required")
+    await _check_webhook_url(request.webhook_url)
+
+    image = request.image
+    if image and "base64," in image:
+        image = image.split("base64,", 1)[1]
+
+    job_id = job_executor.new_job_id()
+    if idempotency_key:
+        existing_job_id = await _claim_idempotency_key(idempotency_key, request, job_id)
+        if existing_job_id:
+            task = await generation_handler.db.get_task_by_job_id(existing_job_id)
+            if task:
+                return JSONResponse(status_code=200, content=_job_response(task))
+
+    try:
+        await job_executor.submit(request.model, request.prompt, image, request.webhook_url, job_id=job_id)
+    except Exception:
+        if idempotency_key:
+            await generation_handler.db.release_idempotency_key(idempotency_key)
+        raise
+    task = await generation_handler.db.get_task_by_job_id(job_id)
+    return JSONResponse(status_code=202, content=_job_response(task))
+
+@router.post("/v1/videos")
+async def create_video_job(
+    request: JobCreateRequest,
+    api_key: str = Depends(verify_api_key_header),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Queue a video generation job, poll GET /v1/jobs/{id} or stream /v1/jobs/{id}/events for the result"""
+    return await _submit_job(request, "video", idempotency_key)
+
+@router.post("/v1/images")
+async def create_image_job(
+    request: JobCreateRequest,
+    api_key: str = Depends(verify_api_key_header),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Queue an image generation job, poll GET /v1/jobs/{id} or stream /v1/jobs/{id}/events for the result"""
+    return await _submit_job(request, "image", idempotency_key)
+
+@router.get("/v1/jobs/{job_id}")
+async def get_job(job_id: str, api_key: str = Depends(verify_api_key_header)):
+    """Get job status and result"""
+    task = await generation_handler.db.get_task_by_job_id(job_id)
+    if not task:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return _job_response(task)
+
+@router.get("/v1/jobs/{job_id}/events")
+async def get_job_events(job_id: str, api_key: str = Depends(verify_api_key_header)):
+    """Stream job progress as chat completion chunks
+
+    A running job replays its chunks so far and then follows live; a finished job
+    (or one from before a restart) gets a single event with its final state.
+    """
+    task = await generation_handler.db.get_task_by_job_id(job_id)
+    if not task:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+
+    broadcast = job_executor.get_broadcast(job_id)
+
+    async def events():
+        if broadcast:
+            async for chunk in broadcast.subscribe():
+                yield chunk
+        else:
+            yield format_event(_job_response(task))
+            yield SSE_DONE
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+def _parse_batch_line(batch_id: str, line_index: int, line: str) -> BatchItem:
+    """Parse one JSONL line of a batch into an item, invalid lines become failed items
+
+    A line is either a chat completion request body or {"custom_id": ..., "body": {...}}.
+    """
+    item = BatchItem(batch_id=batch_id, line_index=line_index)
+    try:
+        data = json.loads(line)
+        if not isinstance(data, dict):
+            raise ValueError("Line must be a JSON object")
+        if data.get("custom_id") is not None:
+            item.custom_id = str(data["custom_id"])
+        request = ChatCompletionRequest(**data.get("body", data))
+        item.model = request.model
+
+        model_config = MODEL_CONFIG.get(request.model)
+        if not model_config or model_config["type"] not in ("image", "video"):
+            raise ValueError(f"Invalid model: {request.model}")
+
+        prompt, image_data, video_data, remix_target_id = _parse_chat_messages(request)
+        if video_data or remix_target_id:
+            raise ValueError("Video input and remix are not supported in batches")
+        if not prompt:
+            raise ValueError("Prompt cannot be empty")
+
+        item.prompt = prompt
+        item.image = image_data
+    except Exception as e:
+        item.status = "failed"
+        item.error = str(e)[:500]
+    return item
+
+async def _read_batch_lines(file: UploadFile):
+    """Yield the lines of an uploaded JSONL file, reading it in chunks instead of whole"""
+    buffer = b""
+    while True:
+        chunk = await file.read(BATCH_READ_CHUNK)
+        if not chunk:
+            break
+        *lines, buffer = (buffer + chunk).split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+async def _parse_batch_upload(file: UploadFile):
+    """Parse an uploaded JSONL file into batch items line by line, skipping blank lines"""
+    index = 0
+    async for raw_line in _read_batch_lines(file):
+        line = raw_line.decode("utf-8", errors="replace")
+        if not line.strip():
+            continue
+        yield _parse_batch_line("", index, line)
+        index += 1
+
+def _batch_response(batch: Batch) -> dict:
+    """Build the API view of a batch row"""
+    return {
+        "id": batch.batch_id,
+        "object": "batch",
+        "status": batch.status,
+        "concurrency": batch.concurrency,
+        "request_counts": {
+            "total": batch.total_count,
+            "completed": batch.completed_count,
+            "failed": batch.failed_count
+        },
+        "created_at": int(batch.created_at.timestamp()) if batch.created_at else None,
+        "completed_at": int(batch.completed_at.timestamp()) if batch.completed_at else None
+    }
+
+@router.post("/v1/batches")
+async def create_batch(
+    file: UploadFile = File(...),
+    concurrency: Optional[int] = Form(None),
+    api_key: str = Depends(verify_api_key_header)
+):
+    """Upload a JSONL file of image/video chat requests to run on idle capacity
+
+    Check progress with GET /v1/batches/{id} and download GET /v1/batches/{id}/results.
+    """
+    concurrency = concurrency or config.batch_default_concurrency
+    if concurrency < 1:
+        raise HTTPException(status_code=400, detail="Concurrency must be at least 1")
+
+    try:
+        batch_id = await batch_runner.create(_parse_batch_upload(file), concurrency)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    batch = await generation_handler.db.get_batch(batch_id)
+    return _batch_response(batch)
+
+@router.get("/v1/batches/{batch_id}")
+async def get_batch(batch_id: str, api_key: str = Depends(verify_api_key_header)):
+    """Get batch status and counters"""
+    batch = await generation_handler.db.get_batch(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail=f"Batch not found: {batch_id}")
+    return _batch_response(batch)
+
+@router.get("/v1/batches/{batch_id}/results")
+async def get_batch_results(batch_id: str, api_key: str = Depends(verify_api_key_header)):
+    """Download batch results as JSONL, one line per input line in input order
+
+    Built from the database on every request, so it also works for unfinished batches.
+    """
+    batch = await generation_handler.db.get_batch(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail=f"Batch not found: {batch_id}")
+    rows = await generation_handler.db.get_batch_results(batch_id)
+
+    def lines():
+        for row in rows:
+            result_urls = None
+            if row["result_urls"]:
+                try:
+                    result_urls = json.loads(row["result_urls"])
+                except (json.JSONDecodeError, TypeError):
+                    result_urls = [row["result_urls"]]
+            yield dumps({
+                "line": row["line_index"],
+                "custom_id": row["custom_id"],
+                "model": row["model"],
+                "status": row["status"],
+                "job_id": row["job_id"],
+                "task_id": row["task_id"] if row["task_id"] != row["job_id"] else None,
+                "result_urls": result_urls,
+                "error": row["error"],
+                "started_at": row["started_at"],
+                "completed_at": row["completed_at"]
+            }) + b"\n"
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{batch_id}_results.jsonl"'}
+    )
+
+@router.post("/v1/batches/{batch_id}/cancel")
+async def cancel_batch(batch_id: str, api_key: str = Depends(verify_api_key_header)):
+    """Cancel a batch: pending items are dropped, running items finish normally before it turns cancelled"""
+    batch = await generation_handler.db.get_batch(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail=f"Batch not found: {batch_id}")
+    if batch.status == "in_progress":
+        await batch_runner.cancel(batch_id)
+        batch = await generation_handler.db.get_batch(batch_id)
+    return _batch_response(batch)
@@ -149,6 +149,16 @@ class Config:
             self._config["cache"] = {}
         self._config["cache"]["enabled"] = enabled
 
+    @property
+    def cache_max_parallel_downloads(self) -> int:
+        """Get max generated images downloaded into the cache at once per task"""
+        return self._config.get("cache", {}).get("max_parallel_downloads", 4)
+
+    @property
+    def cache_stream_wait(self) -> float:
+        """Get seconds to wait for images to be cached before falling back to upstream URLs"""
+        return self._config.get("cache", {}).get("stream_wait", 15.0)
+
     @property
     def image_timeout(self) -> int:
         """Get image generation timeout in seconds"""
@@ -171,6 +181,196 @@ class Config:
             self._config["generation"] = {}
         self._config["generation"]["video_timeout"] = timeout
 
+    @property
+    def on_client_disconnect(self) -> str:
+        """Get policy for generations whose client disconnected: release or collect"""
+        return self._config.get("generation", {}).get("on_client_disconnect", "release")
+
+    @property
+    def job_max_workers(self) -> int:
+        """Get number of job API workers running generations concurrently"""
+        return self._config.get("jobs", {}).get("max_workers", 8)
+
+    @property
+    def job_queue_timeout(self) -> int:
+        """Get seconds a job may wait for a token with free capacity before failing"""
+        return self._config.get("jobs", {}).get("queue_timeout", 600)
+
+    @property
+    def job_retry_delay(self) -> float:
+        """Get seconds before a job that found no free token is retried"""
+        return self._config.get("jobs", {}).get("retry_delay", 5.0)
+
+    @property
+    def upload_spool_dir(self) -> str:
+        """Get directory where multipart uploads and remote media are spooled, must not be served"""
+        return self._config.get("uploads", {}).get("spool_dir", "data/spool")
+
+    @property
+    def upload_max_image_size(self) -> int:
+        """Get max size in bytes of an uploaded reference image"""
+        return int(self._config.get("uploads", {}).get("max_image_size_mb", 20) * 1024 * 1024)
+
+    @property
+    def upload_max_video_size(self) -> int:
+        """Get max size in bytes of an uploaded character video"""
+        return int(self._config.get("uploads", {}).get("max_video_size_mb", 100) * 1024 * 1024)
+
+    @property
+    def remote_media_timeout(self) -> int:
+        """Get timeout in seconds for downloading a remote image or video input"""
+        return self._config.get("remote_media", {}).get("timeout", 120)
+
+    @property
+    def remote_media_cache_ttl(self) -> float:
+        """Get seconds a downloaded remote input is reused for the same URL"""
+        return self._config.get("remote_media", {}).get("cache_ttl", 300.0)
+
+    @property
+    def remote_media_cache_size(self) -> int:
+        """Get max number of downloaded remote inputs kept"""
+        return self._config.get("remote_media", {}).get("cache_size", 32)
+
+    @property
+    def media_cache_enabled(self) -> bool:
+        """Get whether uploaded media IDs are reused for identical images"""
+        return self._config.get("media_cache", {}).get("enabled", True)
+
+    @property
+    def media_cache_ttl(self) -> int:
+        """Get seconds an uploaded media ID is reused"""
+        return self._config.get("media_cache", {}).get("ttl", 21600)
+
+    @property
+    def idempotency_ttl(self) -> int:
+        """Get seconds an Idempotency-Key stays bound to its job"""
+        return self._config.get("idempotency", {}).get("ttl", 86400)
+
+    @property
+    def dedup_enabled(self) -> bool:
+        """Get whether identical in-flight streaming generations are shared"""
+        return self._config.get("dedup", {}).get("enabled", False)
+
+    @property
+    def dedup_result_ttl(self) -> float:
+        """Get seconds a successful result is replayed to identical requests"""
+        return self._config.get("dedup", {}).get("result_ttl", 300.0)
+
+    @property
+    def dedup_max_results(self) -> int:
+        """Get max number of cached results"""
+        return self._config.get("dedup", {}).get("max_results", 256)
+
+    @property
+    def character_registry_enabled(self) -> bool:
+        """Get whether characters are reused for videos they were created from before"""
+        return self._config.get("character_registry", {}).get("enabled", True)
+
+    @property
+    def character_registry_ttl(self) -> float:
+        """Get seconds a private character is kept unused before it is deleted, 0 keeps it forever"""
+        return self._config.get("character_registry", {}).get("ttl", 604800.0)
+
+    @property
+    def character_registry_cleanup_interval(self) -> float:
+        """Get seconds between scans for expired private characters"""
+        return self._config.get("character_registry", {}).get("cleanup_interval", 3600.0)
+
+    @property
+    def prompt_enhance_cache_ttl(self) -> float:
+        """Get seconds an enhanced prompt is reused for identical requests"""
+        return self._config.get("prompt_enhance", {}).get("cache_ttl", 3600.0)
+
+    @property
+    def prompt_enhance_cache_size(self) -> int:
+        """Get maximum number of cached enhanced prompts"""
+        return self._config.get("prompt_enhance", {}).get("cache_size", 512)
+
+    @property
+    def batch_max_concurrency(self) -> int:
+        """Get max batch items running at once across all batches"""
+        return self._config.get("batch", {}).get("max_concurrency", 4)
+
+    @property
+    def batch_default_concurrency(self) -> int:
+        """Get max running items per batch when the upload does not specify one"""
+        return self._config.get("batch", {}).get("default_concurrency", 2)
+
+    @property
+    def batch_reserve_slots(self) -> int:
+        """Get free concurrency slots batches must leave for interactive requests"""
+        return self._config.get("batch", {}).get("reserve_slots", 1)
+
+    @property
+    def batch_tick_interval(self) -> float:
+        """Get seconds between batch dispatch passes"""
+        return self._config.get("batch", {}).get("tick_interval", 5.0)
+
+    @property
+    def webhook_default_url(self) -> str:
+        """Get webhook URL used when a request does not specify one"""
+        return self._config.get("webhook", {}).get("default_url", "")
+
+    @property
+    def webhook_secret(self) -> str:
+        """Get webhook signing secret, the API key is used when empty"""
+        return self._config.get("webhook", {}).get("secret", "")
+
+    @property
+    def webhook_timeout(self) -> int:
+        """Get webhook delivery request timeout in seconds"""
+        return self._config.get("webhook", {}).get("timeout", 10)
+
+    @property
+    def webhook_max_attempts(self) -> int:
+        """Get delivery attempts before a webhook is given up"""
+        return self._config.get("webhook", {}).get("max_attempts", 8)
+
+    @property
+    def webhook_base_backoff(self) -> float:
+        """Get backoff before the first webhook retry in seconds"""
+        return self._config.get("webhook", {}).get("base_backoff", 5.0)
+
+    @property
+    def webhook_max_backoff(self) -> float:
+        """Get longest webhook retry backoff in seconds"""
+        return self._config.get("webhook", {}).get("max_backoff", 600.0)
+
+    @property
+    def webhook_idle_interval(self) -> float:
+        """Get seconds between outbox scans when nothing is queued"""
+        return self._config.get("webhook", {}).get("idle_interval", 30.0)
+
+    @property
+    def webhook_max_concurrency(self) -> int:
+        """Get number of webhooks delivered at the same time"""
+        return self._config.get("webhook", {}).get("max_concurrency", 8)
+
+    @property
+    def post_cleanup_max_attempts(self) -> int:
+        """Get delete attempts before a published post is given up"""
+        return self._config.get("post_cleanup", {}).get("max_attempts", 6)
+
+    @property
+    def post_cleanup_base_backoff(self) -> float:
+        """Get backoff before the first post delete retry in seconds"""
+        return self._config.get("post_cleanup", {}).get("base_backoff", 30.0)
+
+    @property
+    def post_cleanup_max_backoff(self) -> float:
+        """Get longest post delete retry backoff in seconds"""
+        return self._config.get("post_cleanup", {}).get("max_backoff", 3600.0)
+
+    @property
+    def post_cleanup_idle_interval(self) -> float:
+        """Get seconds between post cleanup queue scans when nothing is queued"""
+        return self._config.get("post_cleanup", {}).get("idle_interval", 60.0)
+
+    @property
+    def post_cleanup_uncached_delay(self) -> float:
+        """Get seconds a post is kept when its watermark-free URL is served without caching"""
+        return self._config.get("post_cleanup", {}).get("uncached_delay", 86400.0)
+
     @property
     def watermark_free_enabled(self) -> bool:
         """Get watermark-free mode enabled status"""
@@ -197,6 +397,16 @@ class Config:
         """Get custom parse server access token"""
         return self._config.get("watermark_free", {}).get("custom_parse_token", "")
 
+    @property
+    def watermark_free_hedge_delay(self) -> float:
+        """Get seconds before the next watermark-free parser is started alongside a slow one"""
+        return self._config.get("watermark_free", {}).get("hedge_delay", 5.0)
+
+    @property
+    def watermark_free_url_cache_ttl(self) -> int:
+        """Get seconds a resolved watermark-free URL is cached per post"""
+        return self._config.get("watermark_free", {}).get("url_cache_ttl", 3600)
+
     @property
     def at_auto_refresh_enabled(self) -> bool:
         """Get AT auto refresh enabled status"""
@@ -218,5 +428,155 @@ class Config:
         """Get default Client ID for RT refresh"""
         return self._config.get("fingerprint", {}).get("default_client_id", "app_LlGpXReQgckcGGUo2JrYvtJK")
 
+    @property
+    def sentinel_pool_enabled(self) -> bool:
+        """Get sentinel token pool enabled status"""
+        return self._config.get("sentinel_pool", {}).get("enabled", True)
+
+    @property
+    def sentinel_pool_size(self) -> int:
+        """Get target number of ready sentinel tokens per egress"""
+        return self._config.get("sentinel_pool", {}).get("target_size", 2)
+
+    @property
+    def sentinel_token_ttl(self) -> int:
+        """Get sentinel token validity window in seconds"""
+        return self._config.get("sentinel_pool", {}).get("token_ttl", 300)
+
+    @property
+    def sentinel_refresh_margin(self) -> int:
+        """Get seconds before expiry at which pooled sentinel tokens are evicted"""
+        return self._config.get("sentinel_pool", {}).get("refresh_margin", 60)
+
+    @property
+    def sentinel_idle_timeout(self) -> int:
+        """Get seconds without use after which an egress stops being refilled"""
+        return self._config.get("sentinel_pool", {}).get("idle_timeout", 600)
+
+    @property
+    def poll_adaptive_enabled(self) -> bool:
+        """Get adaptive task polling enabled status"""
+        return self._config.get("polling", {}).get("adaptive_enabled", True)
+
+    @property
+    def poll_min_interval(self) -> float:
+        """Get shortest adaptive poll interval in seconds"""
+        return self._config.get("polling", {}).get("min_interval", 2.0)
+
+    @property
+    def poll_max_interval(self) -> float:
+        """Get longest adaptive poll interval in seconds"""
+        return self._config.get("polling", {}).get("max_interval", 20.0)
+
+    @property
+    def proxy_pool_policy(self) -> str:
+        """Get proxy pool selection policy: least_latency or sticky"""
+        return self._config.get("proxy_pool", {}).get("policy", "least_latency")
+
+    @property
+    def proxy_pool_probe_interval(self) -> int:
+        """Get seconds between proxy pool health probes"""
+        return self._config.get("proxy_pool", {}).get("probe_interval", 30)
+
+    @property
+    def proxy_pool_probe_url(self) -> str:
+        """Get URL requested through each proxy by the health probe"""
+        return self._config.get("proxy_pool", {}).get("probe_url", "https://sora.chatgpt.com/")
+
+    @property
+    def proxy_pool_probe_timeout(self) -> int:
+        """Get health probe timeout in seconds"""
+        return self._config.get("proxy_pool", {}).get("probe_timeout", 10)
+
+    @property
+    def proxy_pool_ewma_alpha(self) -> float:
+        """Get EWMA smoothing factor for proxy latency and error rate"""
+        return self._config.get("proxy_pool", {}).get("ewma_alpha", 0.3)
+
+    @property
+    def proxy_pool_eject_failures(self) -> int:
+        """Get consecutive failures after which a proxy is ejected"""
+        return self._config.get("proxy_pool", {}).get("eject_failures", 3)
+
+    @property
+    def proxy_pool_readmit_successes(self) -> int:
+        """Get consecutive successful probes after which an ejected proxy is re-admitted"""
+        return self._config.get("proxy_pool", {}).get("readmit_successes", 2)
+
+    @property
+    def rate_limit_enabled(self) -> bool:
+        """Get upstream rate limiting enabled status"""
+        return self._config.get("rate_limit", {}).get("enabled", True)
+
+    @property
+    def rate_limit_token_rate(self) -> float:
+        """Get sustained upstream requests per second per access token"""
+        return self._config.get("rate_limit", {}).get("token_rate", 1.0)
+
+    @property
+    def rate_limit_token_burst(self) -> float:
+        """Get burst size per access token"""
+        return self._config.get("rate_limit", {}).get("token_burst", 5)
+
+    @property
+    def rate_limit_egress_rate(self) -> float:
+        """Get sustained upstream requests per second per egress proxy"""
+        return self._config.get("rate_limit", {}).get("egress_rate", 4.0)
+
+    @property
+    def rate_limit_egress_burst(self) -> float:
+        """Get burst size per egress proxy"""
+        return self._config.get("rate_limit", {}).get("egress_burst", 10)
+
+    @property
+    def rate_limit_poll_qps(self) -> float:
+        """Get global cap on progress poll requests per second"""
+        return self._config.get("rate_limit", {}).get("poll_qps", 3.0)
+
+    @property
+    def rate_limit_poll_reserve(self) -> float:
+        """Get share of each bucket progress polls must leave for other requests"""
+        return self._config.get("rate_limit", {}).get("poll_reserve", 0.5)
+
+    @property
+    def rate_limit_429_backoff(self) -> float:
+        """Get seconds a token and egress are held back after a 429"""
+        return self._config.get("rate_limit", {}).get("backoff_429", 10)
+
+    @property
+    def retry_enabled(self) -> bool:
+        """Get upstream retry enabled status"""
+        return self._config.get("retry", {}).get("enabled", True)
+
+    @property
+    def retry_max_attempts(self) -> int:
+        """Get default maximum attempts per upstream call, first attempt included"""
+        return self._config.get("retry", {}).get("max_attempts", 3)
+
+    @property
+    def retry_base_delay(self) -> float:
+        """Get shortest retry backoff in seconds"""
+        return self._config.get("retry", {}).get("base_delay", 0.5)
+
+    @property
+    def retry_max_delay(self) -> float:
+        """Get longest retry backoff in seconds"""
+        return self._config.get("retry", {}).get("max_delay", 8.0)
+
+    @property
+    def retry_deadline(self) -> float:
+        """Get total seconds an upstream call may spend including retries"""
+        return self._config.get("retry", {}).get("deadline", 30.0)
+
+    @property
+    def retry_budget_ratio(self) -> float:
+        """Get retries allowed per upstream call across the process"""
+        return self._config.get("retry", {}).get("budget_ratio", 0.2)
+
+    @property
+    def retry_budget_min_per_second(self) -> float:
+        """Get retries per second always allowed regardless of call volume"""
+        return self._config.get("retry", {}).get("budget_min_per_second", 0.5)
+
 # Global config instance
 config = Config()
@@ -1,10 +1,11 @@
 """Database storage layer"""
 import aiosqlite
+import time
 import json
 from datetime import datetime
 from typing import Optional, List
 from pathlib import Path
-from .models import Token, TokenStats, Task, RequestLog, AdminConfig, ProxyConfig, WatermarkFreeConfig, CacheConfig, GenerationConfig, TokenRefreshConfig, CaptchaConfig
+from .models import Token, TokenStats, Task, RequestLog, AdminConfig, ProxyConfig, ProxyPoolEntry, Batch, BatchItem, WatermarkFreeConfig, CacheConfig, GenerationConfig, TokenRefreshConfig, CaptchaConfig
 
 class Database:
     """SQLite database manager"""
@@ -386,6 +387,8 @@ class Database:
                     error_message TEXT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     completed_at TIMESTAMP,
+                    job_id TEXT,
+                    webhook_url TEXT,
                     FOREIGN KEY (token_id) REFERENCES tokens(id)
                 )
             """)
@@ -397,6 +400,7 @@ class Database:
                     token_id INTEGER,
                     task_id TEXT,
                     operation TEXT NOT NULL,
+                    model TEXT,
                     request_body TEXT,
                     response_body TEXT,
                     status_code INTEGER NOT NULL,
@@ -430,6 +434,48 @@ class Database:
                 )
             """)
 
+            # Proxy pool table (egress proxies selected by health and latency)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS proxy_pool (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    proxy_url TEXT UNIQUE NOT NULL,
+                    enabled BOOLEAN DEFAULT 1,
+                    remark TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+            # Batch tables (offline JSONL batches, one item per input line)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS batches (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    batch_id TEXT UNIQUE NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'in_progress',
+                    concurrency INTEGER DEFAULT 2,
+                    total_count INTEGER DEFAULT 0,
+                    completed_count INTEGER DEFAULT 0,
+                    failed_count INTEGER DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    completed_at TIMESTAMP
+                )
+            """)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS batch_items (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    batch_id TEXT NOT NULL,
+                    line_index INTEGER NOT NULL,
+                    custom_id TEXT,
+                    model TEXT,
+                    prompt TEXT,
+                    image TEXT,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    job_id TEXT,
+                    error TEXT,
+                    completed_at TIMESTAMP
+                )
+            """)
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_batch_items_batch ON batch_items(batch_id, status)")
+
             # Watermark-free config table
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS watermark_free_config (
@@ -503,6 +549,101 @@ class Database:
             if not await self._column_exists(db, "token_stats", "today_date"):
                 await db.execute("ALTER TABLE token_stats ADD COLUMN today_date DATE")
 
+            # Migration: Link tasks to job API submissions
+            if not await self._column_exists(db, "tasks", "job_id"):
+                await db.execute("ALTER TABLE tasks ADD COLUMN job_id TEXT")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_task_job_id ON tasks(job_id)")
+
+            # Migration: Model of generation logs, looked up for poll scheduling
+            if not await self._column_exists(db, "request_logs", "model"):
+                await db.execute("ALTER TABLE request_logs ADD COLUMN model TEXT")
+                await db.execute("""
+                    UPDATE request_logs SET model = json_extract(request_body, '$.model')
+                    WHERE operation IN ('generate_video', 'generate_image') AND json_valid(request_body)
+                """)
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_request_logs_model ON request_logs(model, status_code)")
+
+            # Migration: Per-task completion webhook
+            if not await self._column_exists(db, "tasks", "webhook_url"):
+                await db.execute("ALTER TABLE tasks ADD COLUMN webhook_url TEXT")
+
+            # Webhook outbox, deliveries survive restarts until sent or out of attempts
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS webhook_outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    task_id TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    last_error TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    delivered_at TIMESTAMP
+                )
+            """)
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_webhook_outbox_due ON webhook_outbox(status, next_attempt_at)")
+
+            # Idempotency-Key -> job, so retried generation requests attach to the original job
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS idempotency_keys (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    idempotency_key TEXT UNIQUE NOT NULL,
+                    request_hash TEXT NOT NULL,
+                    job_id TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires ON idempotency_keys(expires_at)")
+
+            # Uploaded media per token, so a reused reference image is not uploaded again
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS media_cache (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    content_hash TEXT NOT NULL,
+                    token_id INTEGER NOT NULL,
+                    media_id TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    expires_at REAL NOT NULL,
+                    UNIQUE(content_hash, token_id)
+                )
+            """)
+
+            # Characters created per source video and token, reused instead of creating them again
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS characters (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    content_hash TEXT NOT NULL,
+                    token_id INTEGER NOT NULL,
+                    cameo_id TEXT NOT NULL,
+                    character_id TEXT,
+                    username TEXT NOT NULL,
+                    display_name TEXT,
+                    is_public BOOLEAN DEFAULT 0,
+                    use_count INTEGER DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_used_at TIMESTAMP,
+                    UNIQUE(content_hash, token_id)
+                )
+            """)
+
+            # Posts published for watermark-free mode, deleted in the background once delivered
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS post_cleanup_queue (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    post_id TEXT UNIQUE NOT NULL,
+                    token_id INTEGER NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    last_error TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    deleted_at TIMESTAMP
+                )
+            """)
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_post_cleanup_queue_due ON post_cleanup_queue(status, next_attempt_at)")
+
             await db.commit()
 
     async def init_config_from_toml(self, config_dict: dict, is_first_startup: bool = True):
@@ -909,9 +1050,9 @@ class Database:
         """Create a new task"""
         async with aiosqlite.connect(self.db_path) as db:
             cursor = await db.execute("""
-                INSERT INTO tasks (task_id, token_id, model, prompt, status, progress)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (task.task_id, task.token_id, task.model, task.prompt, task.status, task.progress))
+                INSERT INTO tasks (task_id, token_id, model, prompt, status, progress, webhook_url)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (task.task_id, task.token_id, task.model, task.prompt, task.status, task.progress, task.webhook_url))
             await db.commit()
             return cursor.lastrowid
     
@@ -919,7 +1060,7 @@ class Database:
                          result_urls: Optional[str] = None, error_message: Optional[str] = None):
         """Update task status"""
         async with aiosqlite.connect(self.db_path) as db:
-            completed_at = datetime.now() if status in ["completed", "failed"] else None
+            completed_at = datetime.now() if status in ["completed", "failed", "cancelled"] else None
             await db.execute("""
                 UPDATE tasks 
                 SET status = ?, progress = ?, result_urls = ?, error_message = ?, completed_at = ?
@@ -936,15 +1077,58 @@ class Database:
             if row:
                 return Task(**dict(row))
             return None
+
+    async def get_unfinished_tasks(self) -> List[Task]:
+        """Get tasks that are queued or still processing"""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("""
+                SELECT * FROM tasks WHERE status IN ('queued', 'processing') ORDER BY created_at
+            """)
+            rows = await cursor.fetchall()
+            return [Task(**dict(row)) for row in rows]
+
+    async def create_job_task(self, job_id: str, model: str, prompt: str, webhook_url: Optional[str] = None) -> int:
+        """Create a queued task for a job API submission
+
+        The row is keyed by the job ID until the job is submitted upstream, see bind_job_task.
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("""
+                INSERT INTO tasks (task_id, token_id, model, prompt, status, progress, job_id, webhook_url)
+                VALUES (?, 0, ?, ?, 'queued', 0, ?, ?)
+            """, (job_id, model, prompt, job_id, webhook_url))
+            await db.commit()
+            return cursor.lastrowid
+
+    async def bind_job_task(self, job_id: str, task_id: str, token_id: int):
+        """Attach the upstream task ID and token to a queued job once it was submitted"""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("""
+                UPDATE tasks SET task_id = ?, token_id = ?, status = 'processing'
+                WHERE job_id = ?
+            """, (task_id, token_id, job_id))
+            await db.commit()
+
+    async def get_task_by_job_id(self, job_id: str) -> Optional[Task]:
+        """Get task by job ID"""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("SELECT * FROM tasks WHERE job_id = ?", (job_id,))
+            row = await cursor.fetchone()
+            if row:
+                return Task(**dict(row))
+            return None
     
     # Request log operations
     async def log_request(self, log: RequestLog) -> int:
         """Log a request and return log ID"""
         async with aiosqlite.connect(self.db_path) as db:
             cursor = await db.execute("""
-                INSERT INTO request_logs (token_id, task_id, operation, request_body, response_body, status_code, duration)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (log.token_id, log.task_id, log.operation, log.request_body, log.response_body,
+                INSERT INTO request_logs (token_id, task_id, operation, model, request_body, response_body,
+                                          status_code, duration)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (log.token_id, log.task_id, log.operation, log.model, log.request_body, log.response_body,
                   log.status_code, log.duration))
             await db.commit()
             return cursor.lastrowid
@@ -983,6 +1167,268 @@ class Database:
             """, (task_id, log_id))
             await db.commit()
 
+    # Idempotency key operations
+    async def claim_idempotency_key(self, idempotency_key: str, request_hash: str, job_id: str,
+                                    ttl: float) -> Optional[dict]:
+        """Bind an idempotency key to a job unless it is already bound
+
+        Returns:
+            None if the key was claimed for job_id, otherwise the existing binding
+            (dict with request_hash and job_id)
+        """
+        now = time.time()
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            await db.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (now,))
+            cursor = await db.execute("""
+                INSERT OR IGNORE INTO idempotency_keys (idempotency_key, request_hash, job_id, expires_at)
+                VALUES (?, ?, ?, ?)
+            """, (idempotency_key, request_hash, job_id, now + ttl))
+            await db.commit()
+            if cursor.rowcount:
+                return None
+            cursor = await db.execute("""
+                SELECT request_hash, job_id FROM idempotency_keys WHERE idempotency_key = ?
+            """, (idempotency_key,))
+            row = await cursor.fetchone()
+            return dict(row) if row else None
+
+    async def release_idempotency_key(self, idempotency_key: str):
+        """Forget an idempotency key whose request was not submitted"""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("DELETE FROM idempotency_keys WHERE idempotency_key = ?", (idempotency_key,))
+            await db.commit()
+
+    # Media cache operations
+    async def get_cached_media(self, content_hash: str, token_id: int) -> Optional[str]:
+        """Get the unexpired media_id of content uploaded with a token"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("""
+                SELECT media_id FROM media_cache WHERE content_hash = ? AND token_id = ? AND expires_at > ?
+            """, (content_hash, token_id, time.time()))
+            row = await cursor.fetchone()
+            return row[0] if row else None
+
+    async def save_cached_media(self, content_hash: str, token_id: int, media_id: str, ttl: float):
+        """Remember the media_id of uploaded content, dropping expired entries"""
+        now = time.time()
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("DELETE FROM media_cache WHERE expires_at <= ?", (now,))
+            await db.execute("""
+                INSERT OR REPLACE INTO media_cache (content_hash, token_id, media_id, expires_at)
+                VALUES (?, ?, ?, ?)
+            """, (content_hash, token_id, media_id, now + ttl))
+            await db.commit()
+
+    # Character registry operations
+    async def get_registered_characters(self, content_hash: str, ttl: float = 0) -> List[dict]:
+        """Get the characters created from a video, most recently used first
+
+        Private characters unused for more than ttl seconds are left out, ttl <= 0 keeps all.
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("""
+                SELECT * FROM characters
+                WHERE content_hash = ?
+                  AND (? <= 0 OR is_public = 1 OR COALESCE(last_used_at, created_at) > datetime('now', ?))
+                ORDER BY COALESCE(last_used_at, created_at) DESC
+            """, (content_hash, ttl, f"-{int(ttl)} seconds"))
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+
+    async def get_registered_character(self, entry_id: int) -> Optional[dict]:
+        """Get a registered character by registry ID"""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("SELECT * FROM characters WHERE id = ?", (entry_id,))
+            row = await cursor.fetchone()
+            return dict(row) if row else None
+
+    async def get_expired_registered_characters(self, ttl: float, limit: int = 50) -> List[dict]:
+        """Get private characters unused for more than ttl seconds, least recently used first"""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("""
+                SELECT * FROM characters
+                WHERE is_public = 0 AND COALESCE(last_used_at, created_at) <= datetime('now', ?)
+                ORDER BY COALESCE(last_used_at, created_at)
+                LIMIT ?
+            """, (f"-{int(ttl)} seconds", limit))
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+
+    async def save_registered_character(self, content_hash: str, token_id: int, cameo_id: str,
+                                        character_id: Optional[str], username: str,
+                                        display_name: Optional[str], is_public: bool) -> int:
+        """Register a character created from a video with a token"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("""
+                INSERT OR REPLACE INTO characters (content_hash, token_id, cameo_id, character_id, username,
+                                                   display_name, is_public)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (content_hash, token_id, cameo_id, character_id, username, display_name, is_public))
+            await db.commit()
+            return cursor.lastrowid
+
+    async def mark_registered_character_used(self, entry_id: int):
+        """Count a reuse of a registered character"""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("""
+                UPDATE characters SET use_count = use_count + 1, last_used_at = CURRENT_TIMESTAMP WHERE id = ?
+            """, (entry_id,))
+            await db.commit()
+
+    async def delete_registered_character(self, entry_id: int) -> bool:
+        """Remove a character from the registry"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("DELETE FROM characters WHERE id = ?", (entry_id,))
+            await db.commit()
+            return cursor.rowcount > 0
+
+    async def get_all_registered_characters(self, limit: int = 100) -> List[dict]:
+        """Get registered characters with the owning token's email"""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("""
+                SELECT c.*, t.email as token_email
+                FROM characters c
+                LEFT JOIN tokens t ON c.token_id = t.id
+                ORDER BY c.created_at DESC
+                LIMIT ?
+            """, (limit,))
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+
+    # Webhook outbox operations
+    async def enqueue_webhook(self, task_id: str, url: str, payload: str) -> int:
+        """Add a webhook delivery to the outbox, due immediately"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("""
+                INSERT INTO webhook_outbox (task_id, url, payload, next_attempt_at)
+                VALUES (?, ?, ?, ?)
+            """, (task_id, url, payload, time.time()))
+            await db.commit()
+            return cursor.lastrowid
+
+    async def get_due_webhooks(self, limit: int = 50) -> List[dict]:
+        """Get pending webhook deliveries whose next attempt is due"""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("""
+                SELECT * FROM webhook_outbox
+                WHERE status = 'pending' AND next_attempt_at <= ?
+                ORDER BY next_attempt_at LIMIT ?
+            """, (time.time(), limit))
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+
+    async def get_next_webhook_due_at(self) -> Optional[float]:
+        """Get the earliest next attempt time among pending deliveries"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("SELECT MIN(next_attempt_at) FROM webhook_outbox WHERE status = 'pending'")
+            row = await cursor.fetchone()
+            return row[0] if row else None
+
+    async def mark_webhook_delivered(self, outbox_id: int, attempts: int):
+        """Mark a webhook delivery as delivered"""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("""
+                UPDATE webhook_outbox SET status = 'delivered', attempts = ?, last_error = NULL,
+                    delivered_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (attempts, outbox_id))
+            await db.commit()
+
+    async def reschedule_webhook(self, outbox_id: int, attempts: int, next_attempt_at: Optional[float], error: str):
+        """Record a failed webhook attempt, next_attempt_at None gives up on the delivery"""
+        async with aiosqlite.connect(self.db_path) as db:
+            if next_attempt_at is None:
+                await db.execute("""
+                    UPDATE webhook_outbox SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?
+                """, (attempts, error, outbox_id))
+            else:
+                await db.execute("""
+                    UPDATE webhook_outbox SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?
+                """, (attempts, next_attempt_at, error, outbox_id))
+            await db.commit()
+
+    async def get_webhook_outbox_stats(self) -> dict:
+        """Get webhook delivery counts by status"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("SELECT status, COUNT(*) FROM webhook_outbox GROUP BY status")
+            rows = await cursor.fetchall()
+            return {row[0]: row[1] for row in rows}
+
+    # Post cleanup queue operations
+    async def enqueue_post_cleanup(self, post_id: str, token_id: int, next_attempt_at: float) -> int:
+        """Queue a published post for deletion, a post already queued keeps its entry"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("""
+                INSERT OR IGNORE INTO post_cleanup_queue (post_id, token_id, next_attempt_at)
+                VALUES (?, ?, ?)
+            """, (post_id, token_id, next_attempt_at))
+            await db.commit()
+            return cursor.lastrowid
+
+    async def get_due_post_cleanups(self, limit: int = 50) -> List[dict]:
+        """Get pending post deletes whose next attempt is due"""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("""
+                SELECT * FROM post_cleanup_queue
+                WHERE status = 'pending' AND next_attempt_at <= ?
+                ORDER BY next_attempt_at LIMIT ?
+            """, (time.time(), limit))
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+
+    async def get_next_post_cleanup_due_at(self) -> Optional[float]:
+        """Get the earliest next attempt time among pending post deletes"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("SELECT MIN(next_attempt_at) FROM post_cleanup_queue WHERE status = 'pending'")
+            row = await cursor.fetchone()
+            return row[0] if row else None
+
+    async def mark_post_deleted(self, entry_id: int, attempts: int):
+        """Mark a queued post as deleted"""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("""
+                UPDATE post_cleanup_queue SET status = 'deleted', attempts = ?, last_error = NULL,
+                    deleted_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (attempts, entry_id))
+            await db.commit()
+
+    async def reschedule_post_cleanup(self, entry_id: int, attempts: int, next_attempt_at: Optional[float], error: str):
+        """Record a failed delete attempt, next_attempt_at None gives up on the post"""
+        async with aiosqlite.connect(self.db_path) as db:
+            if next_attempt_at is None:
+                await db.execute("""
+                    UPDATE post_cleanup_queue SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?
+                """, (attempts, error, entry_id))
+            else:
+                await db.execute("""
+                    UPDATE post_cleanup_queue SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?
+                """, (attempts, next_attempt_at, error, entry_id))
+            await db.commit()
+
+    async def get_post_cleanup_stats(self) -> dict:
+        """Get queued post counts by status"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("SELECT status, COUNT(*) FROM post_cleanup_queue GROUP BY status")
+            rows = await cursor.fetchall()
+            return {row[0]: row[1] for row in rows}
+
+    async def get_log_id_by_task_id(self, task_id: str) -> Optional[int]:
+        """Get the ID of the request log linked to a task"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                "SELECT id FROM request_logs WHERE task_id = ? ORDER BY id DESC LIMIT 1", (task_id,)
+            )
+            row = await cursor.fetchone()
+            return row[0] if row else None
+
     async def get_recent_logs(self, limit: int = 100) -> List[dict]:
         """Get recent logs with token email"""
         async with aiosqlite.connect(self.db_path) as db:
@@ -1008,6 +1454,18 @@ class Database:
             rows = await cursor.fetchall()
             return [dict(row) for row in rows]
 
+    async def get_recent_generation_durations(self, model: str, limit: int = 20) -> List[float]:
+        """Get durations of the most recent successful generations of a model"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("""
+                SELECT duration FROM request_logs
+                WHERE model = ? AND status_code = 200 AND duration > 0
+                ORDER BY id DESC
+                LIMIT ?
+            """, (model, limit))
+            rows = await cursor.fetchall()
+            return [row[0] for row in rows]
+
     async def clear_all_logs(self):
         """Clear all request logs"""
         async with aiosqlite.connect(self.db_path) as db:
@@ -1060,6 +1518,181 @@ class Database:
             """, (enabled, proxy_url))
             await db.commit()
 
+    # Proxy pool operations
+    async def get_proxy_pool(self) -> List[ProxyPoolEntry]:
+        """Get all proxy pool entries"""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("SELECT * FROM proxy_pool ORDER BY id")
+            rows = await cursor.fetchall()
+            return [ProxyPoolEntry(**dict(row)) for row in rows]
+
+    async def add_proxy_pool_entry(self, proxy_url: str, remark: Optional[str] = None) -> int:
+        """Add a proxy to the pool and return its ID"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("""
+                INSERT INTO proxy_pool (proxy_url, remark) VALUES (?, ?)
+            """, (proxy_url, remark))
+            await db.commit()
+            return cursor.lastrowid
+
+    async def update_proxy_pool_entry(self, entry_id: int, enabled: Optional[bool] = None,
+                                      remark: Optional[str] = None):
+        """Update a proxy pool entry"""
+        async with aiosqlite.connect(self.db_path) as db:
+            updates = []
+            params = []
+            if enabled is not None:
+                updates.append("enabled = ?")
+                params.append(enabled)
+            if remark is not None:
+                updates.append("remark = ?")
+                params.append(remark)
+            if updates:
+                params.append(entry_id)
+                await db.execute(f"UPDATE proxy_pool SET {', '.join(updates)} WHERE id = ?", params)
+                await db.commit()
+
+    async def delete_proxy_pool_entry(self, entry_id: int):
+        """Delete a proxy pool entry"""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("DELETE FROM proxy_pool WHERE id = ?", (entry_id,))
+            await db.commit()
+
+    # Batch operations
+    async def create_batch(self, batch_id: str, concurrency: int):
+        """Create an empty batch in validating status, the dispatcher ignores it until opened"""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("""
+                INSERT INTO batches (batch_id, status, concurrency) VALUES (?, 'validating', ?)
+            """, (batch_id, concurrency))
+            await db.commit()
+
+    async def add_batch_items(self, batch_id: str, items: List[BatchItem]):
+        """Append items to a batch; items that are already failed (invalid input) count immediately"""
+        failed = sum(1 for item in items if item.status == "failed")
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany("""
+                INSERT INTO batch_items (batch_id, line_index, custom_id, model, prompt, image, status, error, completed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, CASE WHEN ? = 'failed' THEN CURRENT_TIMESTAMP END)
+            """, [(batch_id, item.line_index, item.custom_id, item.model, item.prompt, item.image,
+                   item.status, item.error, item.status) for item in items])
+            await db.execute("""
+                UPDATE batches SET total_count = total_count + ?, failed_count = failed_count + ? WHERE batch_id = ?
+            """, (len(items), failed, batch_id))
+            await db.commit()
+
+    async def open_batch(self, batch_id: str):
+        """Hand a fully stored batch to the dispatcher, or complete it if every item already failed"""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("""
+                UPDATE batches
+                SET status = CASE WHEN failed_count < total_count THEN 'in_progress' ELSE 'completed' END,
+                    completed_at = CASE WHEN failed_count < total_count THEN NULL ELSE CURRENT_TIMESTAMP END
+                WHERE batch_id = ?
+            """, (batch_id,))
+            await db.commit()
+
+    async def delete_batch(self, batch_id: str):
+        """Delete a batch and its items"""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("DELETE FROM batch_items WHERE batch_id = ?", (batch_id,))
+            await db.execute("DELETE FROM batches WHERE batch_id = ?", (batch_id,))
+            await db.commit()
+
+    async def get_batch(self, batch_id: str) -> Optional[Batch]:
+        """Get batch by ID"""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("SELECT * FROM batches WHERE batch_id = ?", (batch_id,))
+            row = await cursor.fetchone()
+            return Batch(**dict(row)) if row else None
+
+    async def get_batches_by_status(self, *statuses: str) -> List[Batch]:
+        """Get batches in any of the given statuses, oldest first"""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            placeholders = ",".join("?" * len(statuses))
+            cursor = await db.execute(f"SELECT * FROM batches WHERE status IN ({placeholders}) ORDER BY id", statuses)
+            rows = await cursor.fetchall()
+            return [Batch(**dict(row)) for row in rows]
+
+    async def get_batch_items(self, batch_id: str, status: Optional[str] = None,
+                              limit: Optional[int] = None) -> List[BatchItem]:
+        """Get items of a batch in input order, optionally filtered by status"""
+        query = "SELECT * FROM batch_items WHERE batch_id = ?"
+        params: list = [batch_id]
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        query += " ORDER BY line_index"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(query, params)
+            rows = await cursor.fetchall()
+            return [BatchItem(**dict(row)) for row in rows]
+
+    async def get_batch_results(self, batch_id: str) -> List[dict]:
+        """Get batch items joined with the task of their job, in input order"""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("""
+                SELECT i.line_index, i.custom_id, i.model, i.status, i.job_id, i.error,
+                       t.task_id, t.result_urls, t.created_at AS started_at,
+                       COALESCE(t.completed_at, i.completed_at) AS completed_at
+                FROM batch_items i LEFT JOIN tasks t ON t.job_id = i.job_id
+                WHERE i.batch_id = ?
+                ORDER BY i.line_index
+            """, (batch_id,))
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+
+    async def start_batch_item(self, item_id: int, job_id: str):
+        """Mark a batch item as running under a job"""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("UPDATE batch_items SET status = 'running', job_id = ? WHERE id = ?", (job_id, item_id))
+            await db.commit()
+
+    async def reset_batch_item(self, item_id: int):
+        """Put a running batch item back to pending"""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("UPDATE batch_items SET status = 'pending', job_id = NULL WHERE id = ?", (item_id,))
+            await db.commit()
+
+    async def finish_batch_item(self, batch_id: str, item_id: int, success: bool, error: Optional[str] = None):
+        """Record the outcome of a batch item and bump the batch counters"""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("""
+                UPDATE batch_items SET status = ?, error = ?, completed_at = CURRENT_TIMESTAMP WHERE id = ?
+            """, ("completed" if success else "failed", error, item_id))
+            counter = "completed_count" if success else "failed_count"
+            await db.execute(f"UPDATE batches SET {counter} = {counter} + 1 WHERE batch_id = ?", (batch_id,))
+            await db.commit()
+
+    async def update_batch_status(self, batch_id: str, status: str):
+        """Update batch status, completed/cancelled also set completed_at"""
+        async with aiosqlite.connect(self.db_path) as db:
+            if status in ("completed", "cancelled"):
+                await db.execute("""
+                    UPDATE batches SET status = ?, completed_at = CURRENT_TIMESTAMP WHERE batch_id = ?
+                """, (status, batch_id))
+            else:
+                await db.execute("UPDATE batches SET status = ? WHERE batch_id = ?", (status, batch_id))
+            await db.commit()
+
+    async def cancel_pending_batch_items(self, batch_id: str) -> int:
+        """Cancel items of a batch that were not started yet"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("""
+                UPDATE batch_items SET status = 'cancelled', completed_at = CURRENT_TIMESTAMP
+                WHERE batch_id = ? AND status = 'pending'
+            """, (batch_id,))
+            await db.commit()
+            return cursor.rowcount
+
     # Watermark-free config operations
     async def get_watermark_free_config(self) -> WatermarkFreeConfig:
         """Get watermark-free configuration"""
@@ -64,12 +64,14 @@ class Task(BaseModel):
     token_id: int
     model: str
     prompt: str
-    status: str = "processing"  # processing/completed/failed
+    status: str = "processing"  # queued/processing/completed/failed/cancelled
     progress: float = 0.0
     result_urls: Optional[str] = None  # JSON array
     error_message: Optional[str] = None
     created_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
+    job_id: Optional[str] = None  # Set for tasks submitted through the job API
+    webhook_url: Optional[str] = None  # Completion webhook requested with the task
 
 class RequestLog(BaseModel):
     """Request log model"""
@@ -77,6 +79,7 @@ class RequestLog(BaseModel):
     token_id: Optional[int] = None
     task_id: Optional[str] = None  # Link to task for progress tracking
     operation: str
+    model: Optional[str] = None  # Generation model, set for generate_image / generate_video
     request_body: Optional[str] = None
     response_body: Optional[str] = None
     status_code: int  # -1 for in-progress
@@ -101,6 +104,40 @@ class ProxyConfig(BaseModel):
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
+class ProxyPoolEntry(BaseModel):
+    """Egress proxy in the proxy pool"""
+    id: Optional[int] = None
+    proxy_url: str
+    enabled: bool = True
+    remark: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+class Batch(BaseModel):
+    """Offline batch of generation requests"""
+    id: Optional[int] = None
+    batch_id: str
+    status: str = "in_progress"  # validating/in_progress/cancelling/completed/cancelled
+    concurrency: int = 2
+    total_count: int = 0
+    completed_count: int = 0
+    failed_count: int = 0
+    created_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+class BatchItem(BaseModel):
+    """One input line of a batch"""
+    id: Optional[int] = None
+    batch_id: str
+    line_index: int
+    custom_id: Optional[str] = None
+    model: Optional[str] = None
+    prompt: Optional[str] = None
+    image: Optional[str] = None
+    status: str = "pending"  # pending/running/completed/failed/cancelled
+    job_id: Optional[str] = None
+    error: Optional[str] = None
+    completed_at: Optional[datetime] = None
+
 class WatermarkFreeConfig(BaseModel):
     """Watermark-free mode configuration"""
     id: int = 1
@@ -157,6 +194,14 @@ class ChatCompletionRequest(BaseModel):
     remix_target_id: Optional[str] = None  # Sora share link video ID for remix
     stream: bool = False
     max_tokens: Optional[int] = None
+    webhook_url: Optional[str] = None  # Notified when the generation finishes
+
+class JobCreateRequest(BaseModel):
+    """Job API submission (POST /v1/videos, POST /v1/images)"""
+    model: str
+    prompt: str
+    image: Optional[str] = None  # Base64 encoded image for image-to-image / image-to-video
+    webhook_url: Optional[str] = None  # Notified when the job finishes
 
 class ChatCompletionChoice(BaseModel):
     index: int
@@ -0,0 +1,87 @@
+"""Serialization helpers for SSE chunks and upstream JSON
+
+Uses orjson or msgspec when installed, otherwise the standard library json module.
+"""
+import json
+import time
+from typing import Any, Optional, Union
+
+try:
+    import orjson
+
+    BACKEND = "orjson"
+
+    def dumps(obj: Any) -> bytes:
+        """Serialize to compact JSON bytes"""
+        return orjson.dumps(obj)
+
+    def loads(data: Union[bytes, str]) -> Any:
+        """Parse JSON from bytes or str"""
+        return orjson.loads(data)
+except ImportError:
+    try:
+        import msgspec
+
+        BACKEND = "msgspec"
+        _encoder = msgspec.json.Encoder()
+        _decoder = msgspec.json.Decoder()
+
+        def dumps(obj: Any) -> bytes:
+            """Serialize to compact JSON bytes"""
+            return _encoder.encode(obj)
+
+        def loads(data: Union[bytes, str]) -> Any:
+            """Parse JSON from bytes or str"""
+            return _decoder.decode(data)
+    except ImportError:
+        BACKEND = "json"
+        _encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+        def dumps(obj: Any) -> bytes:
+            """Serialize to compact JSON bytes"""
+            return _encoder.encode(obj).encode()
+
+        def loads(data: Union[bytes, str]) -> Any:
+            """Parse JSON from bytes or str"""
+            return json.loads(data)
+
+
+SSE_DONE = b"data: [DONE]\n\n"
+
+# chat.completion.chunk envelope, split around the parts that change per chunk
+_CHUNK_ID = b'data: {"id":"chatcmpl-'
+_CHUNK_CREATED = b'","object":"chat.completion.chunk","created":'
+_CHUNK_DELTA = b',"model":"sora","choices":[{"index":0,"delta":{'
+_CHUNK_ROLE = b'"role":"assistant",'
+_CHUNK_CONTENT = b'"content":'
+_CHUNK_REASONING = b',"reasoning_content":'
+_CHUNK_FINISH = b',"tool_calls":null},"finish_reason":'
+_CHUNK_NATIVE_FINISH = b',"native_finish_reason":'
+_CHUNK_USAGE = b'}],"usage":{"prompt_tokens":0}}\n\n'
+_CHUNK_USAGE_FINAL = b'}],"usage":{"prompt_tokens":0,"completion_tokens":1,"total_tokens":1}}\n\n'
+_NULL = b"null"
+
+
+def format_chunk(content: Optional[str] = None, reasoning_content: Optional[str] = None,
+                 finish_reason: Optional[str] = None, is_first: bool = False) -> bytes:
+    """Build an SSE chat.completion.chunk line
+
+    Only the strings are serialized, the envelope is joined from pre-built bytes.
+    """
+    now = time.time()
+    finish = dumps(finish_reason) if finish_reason is not None else _NULL
+    return b"".join((
+        _CHUNK_ID, b"%d" % int(now * 1000),
+        _CHUNK_CREATED, b"%d" % int(now),
+        _CHUNK_DELTA, _CHUNK_ROLE if is_first else b"",
+        _CHUNK_CONTENT, dumps(content) if content is not None else _NULL,
+        _CHUNK_REASONING, dumps(reasoning_content) if reasoning_content is not None else _NULL,
+        _CHUNK_FINISH, finish,
+        _CHUNK_NATIVE_FINISH, finish,
+        _CHUNK_USAGE_FINAL if finish_reason else _CHUNK_USAGE,
+    ))
+
+
+def format_event(obj: Any) -> bytes:
+    """Build an SSE data line for an arbitrary JSON payload"""
+    return b"data: " + dumps(obj) + b"\n\n"
@@ -0,0 +1,60 @@
+"""In-memory LRU cache with per-entry expiry"""
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire after a fixed time to live
+
+    Not thread-safe; meant for use from the event loop only.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a live entry and mark it recently used, None when missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        """Store an entry, evicting the least recently used ones beyond maxsize"""
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        """Drop an entry if present"""
+        self._entries.pop(key, None)
+
+    def clear(self) -> int:
+        """Drop all entries, return how many were dropped"""
+        count = len(self._entries)
+        self._entries.clear()
+        return count
+
+    def get_stats(self) -> dict:
+        """Get cache statistics"""
+        now = time.monotonic()
+        return {
+            "size": sum(1 for expires_at, _ in self._entries.values() if expires_at > now),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses
+        }
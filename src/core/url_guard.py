@@ -0,0 +1,97 @@
+"""Destination checks for URLs supplied by clients"""
+import asyncio
+import ipaddress
+import socket
+from typing import List
+from urllib.parse import urlsplit
+from curl_cffi import CurlOpt
+
+ALLOWED_SCHEMES = ("http", "https")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+class UnsafeURLError(Exception):
+    """URL is not an http(s) URL or points at a non-public address"""
+
+
+def _is_public_address(address: str) -> bool:
+    """Check that an IP address is globally routable"""
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def check_url_syntax(url: str) -> str:
+    """Check scheme and host of a URL without resolving it
+
+    Returns:
+        Host name of the URL
+    """
+    try:
+        parts = urlsplit(url)
+        host = parts.hostname
+        parts.port  # Raises on a malformed port
+    except ValueError as e:
+        raise UnsafeURLError(f"Invalid URL: {e}")
+    if parts.scheme.lower() not in ALLOWED_SCHEMES:
+        raise UnsafeURLError(f"URL scheme must be http or https: {url}")
+    if not host:
+        raise UnsafeURLError(f"URL has no host: {url}")
+    return host
+
+
+async def resolve_public_host(host: str) -> List[str]:
+    """Resolve a host and require every address it resolves to to be public
+
+    Returns:
+        Resolved addresses
+    """
+    try:
+        # A literal address needs no lookup
+        addresses = [str(ipaddress.ip_address(host.strip("[]")))]
+    except ValueError:
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await loop.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise UnsafeURLError(f"Cannot resolve host {host}: {e}")
+        addresses = sorted({info[4][0] for info in infos})
+
+    if not addresses:
+        raise UnsafeURLError(f"Host {host} did not resolve")
+    for address in addresses:
+        if not _is_public_address(address):
+            raise UnsafeURLError(f"Host {host} resolves to non-public address {address}")
+    return addresses
+
+
+async def ensure_public_url(url: str) -> List[str]:
+    """Reject URLs that are not http(s) or whose host resolves to a loopback, private,
+    link-local or otherwise non-public address
+
+    Must be applied to every hop of a redirect chain, not only to the first URL. The checked
+    addresses are only safe to connect to if curl does not look the host up again (a rebinding
+    DNS server can answer the second lookup with an internal address), so connect with
+    pinned_options() of the returned entries. A proxy resolves the host itself, pinning and
+    therefore this check do not protect requests sent through one.
+
+    Returns:
+        curl RESOLVE entries pinning the host to the checked addresses, empty for a literal IP
+    """
+    host = check_url_syntax(url)
+    addresses = await resolve_public_host(host)
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+        return []
+    except ValueError:
+        pass
+    parts = urlsplit(url)
+    port = parts.port or DEFAULT_PORTS[parts.scheme.lower()]
+    pinned = ",".join(f"[{address}]" if ":" in address else address for address in addresses)
+    return [f"{host}:{port}:{pinned}"]
+
+
+def pinned_options(resolve: List[str]) -> dict:
+    """curl options that connect to the addresses checked by ensure_public_url()"""
+    return {CurlOpt.RESOLVE: resolve} if resolve else {}
@@ -18,6 +18,9 @@ from .services.load_balancer import LoadBalancer
 from .services.sora_client import SoraClient
 from .services.generation_handler import GenerationHandler
 from .services.concurrency_manager import ConcurrencyManager
+from .services.job_executor import JobExecutor
+from .services.batch_runner import BatchRunner
+from .services.media_spool import clear_spool_dir
 from .api import routes as api_routes
 from .api import admin as admin_routes
 
@@ -42,15 +45,19 @@ app.add_middleware(
 
 # Initialize components
 db = Database()
-token_manager = TokenManager(db)
 proxy_manager = ProxyManager(db)
+token_manager = TokenManager(db, proxy_manager)
 concurrency_manager = ConcurrencyManager()
 load_balancer = LoadBalancer(token_manager, concurrency_manager)
 sora_client = SoraClient(proxy_manager, db)
 generation_handler = GenerationHandler(sora_client, token_manager, load_balancer, db, proxy_manager, concurrency_manager)
+job_executor = JobExecutor(generation_handler, db)
+batch_runner = BatchRunner(job_executor, load_balancer, db, concurrency_manager)
 
 # Set dependencies for route modules
 api_routes.set_generation_handler(generation_handler)
+api_routes.set_job_executor(job_executor)
+api_routes.set_batch_runner(batch_runner)
 admin_routes.set_dependencies(token_manager, proxy_manager, db, generation_handler, concurrency_manager, scheduler)
 
 # Include routers
@@ -144,9 +151,41 @@ async def startup_event():
     await concurrency_manager.initialize(all_tokens)
     print(f"✓ Concurrency manager initialized with {len(all_tokens)} tokens")
 
+    # Requeue batch items that never reached upstream (before task recovery fails their jobs)
+    await batch_runner.resume()
+
+    # Resume tasks left unfinished by the previous process
+    recovered = await generation_handler.recover_unfinished_tasks()
+    if recovered:
+        print(f"✓ Recovered {recovered} unfinished tasks")
+
+    # Drop multipart uploads spooled by the previous process
+    clear_spool_dir()
+
     # Start file cache cleanup task
     await generation_handler.file_cache.start_cleanup_task()
 
+    # Start sentinel token pool maintenance
+    await sora_client.sentinel_pool.start()
+
+    # Load proxy pool and start health probes
+    await proxy_manager.start()
+
+    # Start webhook delivery from the outbox
+    await generation_handler.webhook_dispatcher.start()
+
+    # Start deleting published posts queued for cleanup
+    await generation_handler.post_cleanup.start()
+
+    # Start expiring registered private characters
+    await generation_handler.character_cleanup.start()
+
+    # Start job API workers
+    await job_executor.start()
+
+    # Start dispatching batch items
+    await batch_runner.start()
+
     # Start token refresh scheduler if enabled
     if token_refresh_config.at_auto_refresh_enabled:
         scheduler.add_job(
@@ -164,7 +203,16 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
+    generation_handler.shutting_down = True
+    await batch_runner.stop()
+    await job_executor.stop()
+    await generation_handler.webhook_dispatcher.stop()
+    await generation_handler.post_cleanup.stop()
+    await generation_handler.character_cleanup.stop()
     await generation_handler.file_cache.stop_cleanup_task()
+    await generation_handler.media_fetcher.close()
+    await sora_client.sentinel_pool.stop()
+    await proxy_manager.stop()
     if scheduler.running:
         scheduler.shutdown()
 
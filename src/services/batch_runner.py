@@ -0,0 +1,211 @@
+"""Offline batch processing module"""
+import asyncio
+from typing import AsyncIterable, Dict, Optional
+from uuid import uuid4
+from ..core.config import config
+from ..core.database import Database
+from ..core.models import BatchItem
+from ..core.logger import debug_logger
+from .job_executor import JobExecutor
+from .load_balancer import LoadBalancer
+from .concurrency_manager import ConcurrencyManager
+from .generation_handler import MODEL_CONFIG
+
+FINAL_TASK_STATUSES = ("completed", "failed", "cancelled")
+# Items written to the database per insert while an upload is read
+INSERT_CHUNK_SIZE = 500
+
+
+class BatchRunner:
+    """Feeds batch items to the job executor using idle token capacity only
+
+    Every item is persisted, and an item is bound to a job when it starts, so the batch
+    picks up where it stopped after a restart. Items are only started while more than
+    reserve_slots concurrency slots are free for the model type, leaving room for
+    interactive requests.
+    """
+
+    def __init__(self, job_executor: JobExecutor, load_balancer: LoadBalancer, db: Database,
+                 concurrency_manager: Optional[ConcurrencyManager] = None):
+        self.job_executor = job_executor
+        self.load_balancer = load_balancer
+        self.db = db
+        self.concurrency_manager = concurrency_manager
+        self._task = None
+
+    async def create(self, items: AsyncIterable[BatchItem], concurrency: int) -> str:
+        """Store a new batch while its items are parsed
+
+        Items are written in chunks as they arrive, the batch is only dispatched once all of
+        them are stored.
+
+        Args:
+            items: Parsed input lines, invalid ones already marked failed
+            concurrency: Max items of this batch running at once
+
+        Returns:
+            Batch ID
+
+        Raises:
+            ValueError: If there are no items
+        """
+        batch_id = f"batch_{uuid4().hex}"
+        await self.db.create_batch(batch_id, concurrency)
+        count = 0
+        try:
+            chunk = []
+            async for item in items:
+                item.batch_id = batch_id
+                chunk.append(item)
+                if len(chunk) >= INSERT_CHUNK_SIZE:
+                    await self.db.add_batch_items(batch_id, chunk)
+                    count += len(chunk)
+                    chunk = []
+            if chunk:
+                await self.db.add_batch_items(batch_id, chunk)
+                count += len(chunk)
+            if not count:
+                raise ValueError("Batch file is empty")
+        except BaseException:
+            await self.db.delete_batch(batch_id)
+            raise
+        await self.db.open_batch(batch_id)
+        debug_logger.log_info(f"Batch {batch_id} created with {count} items (concurrency={concurrency})")
+        return batch_id
+
+    async def cancel(self, batch_id: str):
+        """Stop starting new items of a batch
+
+        Running items finish normally; the batch stays cancelling until they are collected.
+        """
+        cancelled = await self.db.cancel_pending_batch_items(batch_id)
+        await self.db.update_batch_status(batch_id, "cancelling")
+        debug_logger.log_info(f"Batch {batch_id} cancelled, {cancelled} pending items dropped")
+
+    async def start(self):
+        """Start the dispatch loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the dispatch loop"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def resume(self):
+        """Requeue items whose job never reached upstream before the last shutdown
+
+        Must run before task recovery, which fails queued jobs it cannot resume. Jobs that were
+        submitted are resumed by task recovery and collected by the loop as usual. Batches whose
+        upload was interrupted were never returned to a client and are deleted.
+        """
+        for batch in await self.db.get_batches_by_status("validating"):
+            await self.db.delete_batch(batch.batch_id)
+        for batch in await self.db.get_batches_by_status("in_progress", "cancelling"):
+            for item in await self.db.get_batch_items(batch.batch_id, status="running"):
+                task = await self.db.get_task_by_job_id(item.job_id) if item.job_id else None
+                if task is None or task.status == "queued":
+                    if task:
+                        await self.db.update_task(task.task_id, "cancelled", 0,
+                                                  error_message="Requeued by batch after restart")
+                    if batch.status == "cancelling":
+                        await self.db.finish_batch_item(batch.batch_id, item.id, False, "Batch cancelled")
+                    else:
+                        await self.db.reset_batch_item(item.id)
+
+    async def _run(self):
+        """Collect finished items and start new ones every tick"""
+        while True:
+            try:
+                await self._tick()
+                await asyncio.sleep(config.batch_tick_interval)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                debug_logger.log_error(
+                    error_message=f"Batch runner error: {str(e)}",
+                    status_code=500,
+                    response_text=str(e)
+                )
+                await asyncio.sleep(config.batch_tick_interval)
+
+    async def _tick(self):
+        """One pass over active batches, oldest first"""
+        running = {}
+        for batch in await self.db.get_batches_by_status("cancelling"):
+            if await self._collect(batch.batch_id) == 0:
+                await self.db.update_batch_status(batch.batch_id, "cancelled")
+                debug_logger.log_info(f"Batch {batch.batch_id} cancelled")
+
+        batches = await self.db.get_batches_by_status("in_progress")
+        for batch in batches:
+            running[batch.batch_id] = await self._collect(batch.batch_id)
+
+        total_running = sum(running.values())
+        saturated = set()  # Model types without idle capacity this tick
+        started: Dict[str, int] = {}  # Model type -> items started this tick, not holding a slot yet
+        for batch in batches:
+            while total_running < config.batch_max_concurrency and running[batch.batch_id] < batch.concurrency:
+                pending = await self.db.get_batch_items(batch.batch_id, status="pending", limit=1)
+                if not pending:
+                    if running[batch.batch_id] == 0:
+                        await self.db.update_batch_status(batch.batch_id, "completed")
+                        debug_logger.log_info(f"Batch {batch.batch_id} completed")
+                    break
+
+                item = pending[0]
+                model_type = MODEL_CONFIG[item.model]["type"]
+                if model_type in saturated or not await self._has_idle_capacity(model_type, started.get(model_type, 0)):
+                    saturated.add(model_type)
+                    break
+
+                job_id = await self.job_executor.submit(item.model, item.prompt, item.image)
+                await self.db.start_batch_item(item.id, job_id)
+                running[batch.batch_id] += 1
+                total_running += 1
+                started[model_type] = started.get(model_type, 0) + 1
+
+    async def _collect(self, batch_id: str) -> int:
+        """Record items whose job finished, return how many are still running"""
+        still_running = 0
+        for item in await self.db.get_batch_items(batch_id, status="running"):
+            task = await self.db.get_task_by_job_id(item.job_id)
+            if task and task.status in FINAL_TASK_STATUSES:
+                await self.db.finish_batch_item(batch_id, item.id, task.status == "completed", task.error_message)
+            else:
+                still_running += 1
+        return still_running
+
+    async def _has_idle_capacity(self, model_type: str, pending: int = 0) -> bool:
+        """Check that starting one more item still leaves reserve_slots concurrency slots free
+
+        Args:
+            pending: Items already started this tick whose jobs have not taken a slot yet
+        """
+        return await self._free_slots(model_type) - pending > config.batch_reserve_slots
+
+    async def _free_slots(self, model_type: str) -> int:
+        """Remaining concurrency slots of the tokens that can take the model type right now
+
+        A token without a concurrency limit counts as one slot.
+        """
+        is_image = model_type == "image"
+        available = await self.load_balancer.get_available_tokens(
+            for_image_generation=is_image,
+            for_video_generation=not is_image
+        )
+        if not self.concurrency_manager:
+            return len(available)
+        free = 0
+        for token in available:
+            if is_image:
+                remaining = await self.concurrency_manager.get_image_remaining(token.id)
+            else:
+                remaining = await self.concurrency_manager.get_video_remaining(token.id)
+            free += 1 if remaining is None else max(0, remaining)
+        return free
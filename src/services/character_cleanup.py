@@ -0,0 +1,121 @@
+"""Registered character cleanup module"""
+import asyncio
+import re
+from ..core.config import config
+from ..core.database import Database
+from ..core.logger import debug_logger
+from .sora_client import SoraClient
+
+# Raised by SoraClient.delete_character() when the character does not exist upstream
+CHARACTER_MISSING = re.compile(r"^Failed to delete character: 404$")
+
+
+class CharacterCleanup:
+    """Deletes registered private characters that were dropped from the registry or expired
+
+    Private characters are kept after their video so the next request for the same video can
+    reuse them. Entries unused for longer than [character_registry] ttl are deleted upstream by a
+    background loop and then removed; an entry whose delete fails stays (no longer reusable) and
+    is retried on the next scan. Public characters were handed to the client and are never
+    deleted upstream, dropping them only removes the registry entry.
+    """
+
+    def __init__(self, db: Database, sora_client: SoraClient):
+        self.db = db
+        self.sora_client = sora_client
+        self._task = None
+
+    async def start(self):
+        """Start the expiry loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the expiry loop"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def drop(self, entry: dict) -> bool:
+        """Remove a registry entry, deleting its character upstream if it is private
+
+        An entry whose upstream delete fails is kept (and retried once it expires), so a
+        character is never forgotten while it still exists upstream.
+
+        Returns:
+            True if the entry was removed
+        """
+        if not await self._delete_upstream(entry):
+            return False
+        await self.db.delete_registered_character(entry["id"])
+        return True
+
+    async def forget(self, entry: dict):
+        """Remove a registry entry whose character upstream reported missing, nothing is deleted"""
+        await self.db.delete_registered_character(entry["id"])
+
+    async def expire(self) -> int:
+        """Delete private characters unused for longer than the configured ttl
+
+        Returns:
+            Number of characters removed
+        """
+        ttl = config.character_registry_ttl
+        if ttl <= 0:
+            return 0
+        removed = 0
+        for entry in await self.db.get_expired_registered_characters(ttl):
+            if await self._delete_upstream(entry):
+                await self.db.delete_registered_character(entry["id"])
+                removed += 1
+        if removed:
+            debug_logger.log_info(f"Expired {removed} registered characters")
+        return removed
+
+    async def _run(self):
+        """Expire characters, then sleep until the next scan"""
+        while True:
+            try:
+                await self.expire()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                debug_logger.log_error(
+                    error_message=f"Character cleanup error: {str(e)}",
+                    status_code=0,
+                    response_text=""
+                )
+            try:
+                await asyncio.sleep(config.character_registry_cleanup_interval)
+            except asyncio.CancelledError:
+                break
+
+    async def _delete_upstream(self, entry: dict) -> bool:
+        """Delete the character of a private entry with the token that created it
+
+        Returns:
+            True if nothing is left upstream (deleted, already gone, or nothing to delete)
+        """
+        if entry["is_public"] or not entry["character_id"]:
+            return True
+        try:
+            token_obj = await self.db.get_token(entry["token_id"])
+            if not token_obj:
+                # No account left to delete with, retrying cannot help
+                return True
+            await self.sora_client.delete_character(entry["character_id"], token_obj.token)
+            debug_logger.log_info(f"Registered character deleted: @{entry['username']} ({entry['character_id']})")
+            return True
+        except Exception as e:
+            if CHARACTER_MISSING.match(str(e)):
+                return True
+            debug_logger.log_error(
+                error_message=f"Failed to delete registered character @{entry['username']}: {str(e)}",
+                status_code=0,
+                response_text=str(e)
+            )
+            return False
@@ -2,20 +2,31 @@
 import json
 import asyncio
 import base64
+import hashlib
 import time
 import random
 import re
-from typing import Optional, AsyncGenerator, Dict, Any
-from datetime import datetime
+from typing import Optional, AsyncGenerator, Dict, Any, Union
+from datetime import datetime, timezone
 from .sora_client import SoraClient
 from .token_manager import TokenManager
 from .load_balancer import LoadBalancer
 from .file_cache import FileCache
 from .concurrency_manager import ConcurrencyManager
+from .task_poller import TaskPoller
+from .webhook_dispatcher import WebhookDispatcher
+from .single_flight import Flight, SingleFlight
+from .media_spool import MediaFile
+from .media_fetcher import RemoteMediaFetcher, is_remote_url
+from .watermark_resolver import WatermarkFreeResolver
+from .post_cleanup import PostCleanupQueue
+from .character_cleanup import CharacterCleanup
 from ..core.database import Database
 from ..core.models import Task, RequestLog
 from ..core.config import config
 from ..core.logger import debug_logger
+from ..core.serialization import SSE_DONE, format_chunk
+from ..core.ttl_cache import TTLCache
 
 # Model configuration
 MODEL_CONFIG = {
@@ -219,6 +230,16 @@ class GenerationHandler:
             default_timeout=config.cache_timeout,
             proxy_manager=proxy_manager
         )
+        self.task_poller = TaskPoller(sora_client, db)
+        self.webhook_dispatcher = WebhookDispatcher(db)
+        self.single_flight = SingleFlight()
+        self.media_fetcher = RemoteMediaFetcher(proxy_manager)
+        self.watermark_resolver = WatermarkFreeResolver(sora_client)
+        self.post_cleanup = PostCleanupQueue(db, sora_client)
+        self.character_cleanup = CharacterCleanup(db, sora_client)
+        self.enhance_cache = TTLCache(config.prompt_enhance_cache_size, config.prompt_enhance_cache_ttl)
+        self._background_tasks = set()  # Strong refs to cleanup/collector tasks running detached from a request
+        self.shutting_down = False  # Set on shutdown so torn-down streams leave their tasks for recovery
 
     def _get_base_url(self) -> str:
         """Get base URL for cache files"""
@@ -336,33 +357,6 @@ class GenerationHandler:
 
         return prompt, None
 
-    async def _download_file(self, url: str) -> bytes:
-        """Download file from URL
-
-        Args:
-            url: File URL
-
-        Returns:
-            File bytes
-        """
-        from curl_cffi.requests import AsyncSession
-
-        proxy_url = await self.load_balancer.proxy_manager.get_proxy_url()
-
-        kwargs = {
-            "timeout": 30,
-            "impersonate": config.impersonate_browser
-        }
-
-        if proxy_url:
-            kwargs["proxy"] = proxy_url
-
-        async with AsyncSession() as session:
-            response = await session.get(url, **kwargs)
-            if response.status_code != 200:
-                raise Exception(f"Failed to download file: {response.status_code}")
-            return response.content
-    
     async def check_token_availability(self, is_image: bool, is_video: bool) -> bool:
         """Check if tokens are available for the given model type
 
@@ -376,20 +370,60 @@ class GenerationHandler:
         token_obj = await self.load_balancer.select_token(for_image_generation=is_image, for_video_generation=is_video)
         return token_obj is not None
 
+    def _dedup_key(self, model: str, prompt: str, image: Optional[Union[str, MediaFile]],
+                   remix_target_id: Optional[str], webhook_url: Optional[str]) -> str:
+        """Key identical generations by model, normalized prompt, style, image hash and remix ID"""
+        clean_prompt, style_id = self._extract_style(prompt)
+        parts = [
+            model,
+            " ".join(clean_prompt.split()),
+            style_id or "",
+            (image.sha256 if isinstance(image, MediaFile) else hashlib.sha256(image.encode()).hexdigest()) if image else "",
+            remix_target_id or "",
+            webhook_url or ""
+        ]
+        return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+    def handle_generation_deduplicated(self, model: str, prompt: str,
+                                       image: Optional[Union[str, MediaFile]] = None,
+                                       remix_target_id: Optional[str] = None,
+                                       webhook_url: Optional[str] = None) -> AsyncGenerator[bytes, None]:
+        """Stream a generation, sharing it with identical requests that are in flight
+
+        Identical requests attach to the running generation's stream, and successful results
+        are replayed for dedup.result_ttl seconds. Only for streaming requests without video input.
+        """
+        key = self._dedup_key(model, prompt, image, remix_target_id, webhook_url)
+        return self.single_flight.stream(key, lambda flight: self.handle_generation(
+            model=model,
+            prompt=prompt,
+            image=image,
+            remix_target_id=remix_target_id,
+            stream=True,
+            webhook_url=webhook_url,
+            flight=flight
+        ))
+
     async def handle_generation(self, model: str, prompt: str,
-                               image: Optional[str] = None,
-                               video: Optional[str] = None,
+                               image: Optional[Union[str, MediaFile]] = None,
+                               video: Optional[Union[str, MediaFile]] = None,
                                remix_target_id: Optional[str] = None,
-                               stream: bool = True) -> AsyncGenerator[str, None]:
+                               stream: bool = True,
+                               job_id: Optional[str] = None,
+                               webhook_url: Optional[str] = None,
+                               flight: Optional[Flight] = None) -> AsyncGenerator[Union[str, bytes], None]:
         """Handle generation request
 
         Args:
             model: Model name
             prompt: Generation prompt
-            image: Base64 encoded image
-            video: Base64 encoded video or video URL
+            image: Base64 encoded image, image URL, or an uploaded file spooled to disk
+            video: Base64 encoded video, video URL, or an uploaded file spooled to disk
             remix_target_id: Sora share link video ID for remix
             stream: Whether to stream response
+            job_id: Job API ID whose queued task row receives the upstream task ID
+            webhook_url: URL notified when the task finishes (job rows carry their own)
+            flight: Deduplication flight running this generation, marked cacheable on success
         """
         start_time = time.time()
         log_id = None  # Initialize log_id to avoid reference before assignment
@@ -437,8 +471,11 @@ class GenerationHandler:
 
             # Character creation flow: video provided
             if video:
-                # Decode video if it's base64
-                video_data = self._decode_base64_video(video) if video.startswith("data:") or not video.startswith("http") else video
+                # Decode video if it's base64 (URLs are fetched, spooled files are streamed from disk)
+                if isinstance(video, MediaFile) or is_remote_url(video):
+                    video_data = video
+                else:
+                    video_data = self._decode_base64_video(video)
 
                 # If no prompt, just create character and return
                 if not prompt:
@@ -452,6 +489,10 @@ class GenerationHandler:
                     return
 
         # Streaming mode: proceed with actual generation
+        # Start fetching a remote reference image while the token is selected
+        if is_remote_url(image):
+            self.media_fetcher.prefetch(image, "image")
+
         # Check if model requires Pro subscription
         require_pro = model_config.get("require_pro", False)
 
@@ -492,11 +533,16 @@ class GenerationHandler:
         task_id = None
         is_first_chunk = True  # Track if this is the first chunk
         log_id = None  # Initialize log_id
+        log_task = None
+        sentinel_task = None
+        slots_held = True  # Lock/slot still to be released here, cleared once released or handed off
 
         try:
             # Create initial log entry BEFORE submitting task to upstream
             # This ensures the log is created even if upstream fails
-            log_id = await self._log_request(
+            # The log insert, image upload and sentinel acquisition are independent: they run
+            # concurrently and are joined before the task is submitted
+            log_task = asyncio.create_task(self._log_request(
                 token_obj.id,
                 f"generate_{model_config['type']}",
                 {"model": model, "prompt": prompt, "has_image": image is not None},
@@ -504,7 +550,11 @@ class GenerationHandler:
                 -1,  # -1 means in-progress
                 -1.0,  # -1.0 means in-progress
                 task_id=None  # Will be updated after task submission
-            )
+            ))
+
+            # Sentinel token (sentinel round-trip and PoW) for the /nf/create submission
+            if is_video and not self.sora_client.is_storyboard_prompt(self._extract_style(prompt)[0]):
+                sentinel_task = asyncio.create_task(self.sora_client.acquire_sentinel_token(token_obj.token, token_obj.id))
 
             # Upload image if provided
             media_id = None
@@ -516,14 +566,28 @@ class GenerationHandler:
                     )
                     is_first_chunk = False
 
-                image_data = self._decode_base64_image(image)
-                media_id = await self.sora_client.upload_image(image_data, token_obj.token, token_id=token_obj.id)
+                fetched_image = None
+                if is_remote_url(image):
+                    fetched_image = await self.media_fetcher.fetch(image, "image")
+                    image_data = fetched_image
+                elif isinstance(image, MediaFile):
+                    image_data = image
+                else:
+                    image_data = self._decode_base64_image(image)
+                try:
+                    media_id = await self.sora_client.upload_image(image_data, token_obj.token, token_id=token_obj.id)
+                finally:
+                    if fetched_image:
+                        fetched_image.remove()
 
                 if stream:
                     yield self._format_stream_chunk(
                         reasoning_content="Image uploaded successfully. Proceeding to generation...\n"
                     )
 
+            # Shielded: a disconnect while waiting must not cancel the insert, the cleanup needs its ID
+            log_id = await asyncio.shield(log_task)
+
             # Generate
             if stream:
                 if is_first_chunk:
@@ -576,7 +640,8 @@ class GenerationHandler:
                         style_id=style_id,
                         model=sora_model,
                         size=video_size,
-                        token_id=token_obj.id
+                        token_id=token_obj.id,
+                        sentinel=await sentinel_task
                     )
             else:
                 task_id = await self.sora_client.generate_image(
@@ -588,15 +653,19 @@ class GenerationHandler:
                 )
 
             # Save task to database
-            task = Task(
-                task_id=task_id,
-                token_id=token_obj.id,
-                model=model,
-                prompt=prompt,
-                status="processing",
-                progress=0.0
-            )
-            await self.db.create_task(task)
+            if job_id:
+                await self.db.bind_job_task(job_id, task_id, token_obj.id)
+            else:
+                task = Task(
+                    task_id=task_id,
+                    token_id=token_obj.id,
+                    model=model,
+                    prompt=prompt,
+                    status="processing",
+                    progress=0.0,
+                    webhook_url=webhook_url
+                )
+                await self.db.create_task(task)
 
             # Update log entry with task_id now that we have it
             if log_id:
@@ -606,23 +675,13 @@ class GenerationHandler:
             await self.token_manager.record_usage(token_obj.id, is_video=is_video)
             
             # Poll for results with timeout
-            async for chunk in self._poll_task_result(task_id, token_obj.token, is_video, stream, prompt, token_obj.id, log_id, start_time):
+            async for chunk in self._poll_task_result(task_id, token_obj.token, is_video, stream, prompt, token_obj.id, log_id, start_time,
+                                                      model=model, model_config=model_config):
                 yield chunk
             
             # Record success
             await self.token_manager.record_success(token_obj.id, is_video=is_video)
 
-            # Release lock for image generation
-            if is_image:
-                await self.load_balancer.token_lock.release_lock(token_obj.id)
-                # Release concurrency slot for image generation
-                if self.concurrency_manager:
-                    await self.concurrency_manager.release_image(token_obj.id)
-
-            # Release concurrency slot for video generation
-            if is_video and self.concurrency_manager:
-                await self.concurrency_manager.release_video(token_obj.id)
-
             # Log successful request with complete task info
             duration = time.time() - start_time
 
@@ -635,6 +694,9 @@ class GenerationHandler:
                 "model": model
             }
 
+            if flight and task_info and task_info.status == "completed":
+                flight.cacheable = True
+
             # Add result_urls if available
             if task_info and task_info.result_urls:
                 try:
@@ -652,17 +714,23 @@ class GenerationHandler:
                     duration=duration
                 )
 
-        except Exception as e:
-            # Release lock for image generation on error
-            if is_image and token_obj:
-                await self.load_balancer.token_lock.release_lock(token_obj.id)
-                # Release concurrency slot for image generation
-                if self.concurrency_manager:
-                    await self.concurrency_manager.release_image(token_obj.id)
+            await self.notify_task_finished(task_id)
+
+        except (asyncio.CancelledError, GeneratorExit):
+            # Client disconnected: the stream is being torn down and this scope may be cancelled
+            # again at any await, so cleanup runs in a detached task, which takes over the lock and slot
+            self._discard_task(sentinel_task)
+            slots_held = False
+            self._spawn(self._handle_client_disconnect(
+                task_id, token_obj, is_image, is_video, log_id, start_time, prompt, model, model_config,
+                log_task=log_task
+            ))
+            raise
 
-            # Release concurrency slot for video generation on error
-            if is_video and token_obj and self.concurrency_manager:
-                await self.concurrency_manager.release_video(token_obj.id)
+        except Exception as e:
+            self._discard_task(sentinel_task)
+            if log_id is None and log_task:
+                log_id = await log_task
 
             # Parse error message to check if it's a structured error (JSON)
             error_response = None
@@ -732,20 +800,261 @@ class GenerationHandler:
                         status_code=500,
                         duration=duration
                     )
+
+            if task_id:
+                await self._finalize_failed_task(task_id, str(e))
             
             # Re-raise with formatted error if it's a structured error
             if error_response and isinstance(error_response, dict) and "error" in error_response:
-                import json
                 raise Exception(json.dumps(error_response))
             raise e
+
+        finally:
+            # The single release point for the lock and slot taken above
+            if slots_held:
+                slots_held = False
+                await self._release_generation_slots(token_obj.id, is_image, is_video)
     
+    async def _release_generation_slots(self, token_id: int, is_image: bool, is_video: bool):
+        """Release the token lock and concurrency slot held by a generation"""
+        if is_image:
+            await self.load_balancer.token_lock.release_lock(token_id)
+            if self.concurrency_manager:
+                await self.concurrency_manager.release_image(token_id)
+        if is_video and self.concurrency_manager:
+            await self.concurrency_manager.release_video(token_id)
+
+    async def _reacquire_generation_slots(self, token_id: int, is_image: bool, is_video: bool) -> bool:
+        """Take the token lock and concurrency slot of a generation, all or nothing
+
+        Returns:
+            True if everything _release_generation_slots frees is now held
+        """
+        if is_image:
+            if not await self.load_balancer.token_lock.acquire_lock(token_id):
+                return False
+            if self.concurrency_manager and not await self.concurrency_manager.acquire_image(token_id):
+                await self.load_balancer.token_lock.release_lock(token_id)
+                return False
+        if is_video and self.concurrency_manager:
+            return await self.concurrency_manager.acquire_video(token_id)
+        return True
+
+    @staticmethod
+    def _discard_task(task: Optional[asyncio.Task]):
+        """Drop a helper task whose result is no longer needed, retrieving its error if it failed"""
+        if task is None:
+            return
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            task.exception()
+
+    def _spawn(self, coro):
+        """Run a coroutine detached from the current request"""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def notify_task_finished(self, task_id: str):
+        """Queue the completion webhook of a task that reached a final state"""
+        try:
+            task = await self.db.get_task(task_id)
+            if task:
+                await self.webhook_dispatcher.enqueue(task)
+        except Exception as e:
+            debug_logger.log_error(
+                error_message=f"Failed to queue webhook for task {task_id}: {str(e)}",
+                status_code=500,
+                response_text=str(e)
+            )
+
+    async def _queue_post_cleanup(self, post_id: str, token_id: Optional[int], delay: float = 0.0):
+        """Queue a post published for watermark-free mode for background deletion"""
+        if token_id is None:
+            debug_logger.log_info(f"No token ID for published post {post_id}, leaving it in place")
+            return
+        try:
+            await self.post_cleanup.enqueue(post_id, token_id, delay)
+            debug_logger.log_info(f"Published post {post_id} queued for deletion in {delay:.0f}s")
+        except Exception as e:
+            debug_logger.log_error(
+                error_message=f"Failed to queue published post {post_id} for deletion: {str(e)}",
+                status_code=500,
+                response_text=str(e)
+            )
+
+    async def _finalize_failed_task(self, task_id: str, error_message: str):
+        """Mark a task failed if the error left it unfinished, then notify"""
+        task = await self.db.get_task(task_id)
+        if task and task.status in ("queued", "processing"):
+            await self.db.update_task(task_id, "failed", task.progress, error_message=error_message)
+        await self.notify_task_finished(task_id)
+
+    async def _collect_task_result(self, task_id: str, token_obj, is_image: bool, is_video: bool,
+                                   log_id: Optional[int], start_time: float, prompt: str, model: str,
+                                   model_config: Dict, reason: str):
+        """Poll a submitted task to its end without a client, then release its slot and close its log
+
+        Completion, caching and failure are recorded on the task exactly as for a streamed request.
+        """
+        try:
+            async for _ in self._poll_task_result(task_id, token_obj.token, is_video, False, prompt,
+                                                  token_obj.id, log_id, start_time,
+                                                  model=model, model_config=model_config):
+                pass
+            await self.token_manager.record_success(token_obj.id, is_video=is_video)
+            status_code, response_body = 200, {"task_id": task_id, "status": "success",
+                                               "prompt": prompt, "model": model, reason: True}
+            await self.notify_task_finished(task_id)
+        except Exception as e:
+            status_code, response_body = 500, {"error": str(e), reason: True}
+            await self._finalize_failed_task(task_id, str(e))
+        await self._release_generation_slots(token_obj.id, is_image, is_video)
+        if log_id:
+            await self.db.update_request_log(
+                log_id,
+                response_body=json.dumps(response_body),
+                status_code=status_code,
+                duration=time.time() - start_time
+            )
+
+    async def _handle_client_disconnect(self, task_id: Optional[str], token_obj, is_image: bool, is_video: bool,
+                                        log_id: Optional[int], start_time: float, prompt: str, model: str,
+                                        model_config: Dict, log_task: Optional[asyncio.Task] = None):
+        """Clean up a generation whose client went away
+
+        With on_client_disconnect = "release" the task is abandoned: its lock and slot are freed and
+        the task and log are marked cancelled. With "collect" an already submitted task keeps being
+        polled in the background (holding its slot) so the result still lands in the task record.
+        During shutdown nothing is touched, the task is picked up by recovery on the next start.
+        A log insert still in flight (log_task) is awaited so its entry is closed as well.
+        """
+        if self.shutting_down:
+            return
+        try:
+            if log_id is None and log_task:
+                log_id = await log_task
+            if task_id and config.on_client_disconnect == "collect":
+                debug_logger.log_info(f"Client disconnected, collecting task {task_id} in background")
+                await self._collect_task_result(task_id, token_obj, is_image, is_video, log_id, start_time,
+                                                prompt, model, model_config, reason="client_disconnected")
+                return
+
+            debug_logger.log_info(f"Client disconnected, releasing generation (task_id={task_id})")
+            if token_obj:
+                await self._release_generation_slots(token_obj.id, is_image, is_video)
+            if task_id:
+                await self.db.update_task(task_id, "cancelled", 0, error_message="Client disconnected")
+                await self.notify_task_finished(task_id)
+            if log_id:
+                await self.db.update_request_log(
+                    log_id,
+                    response_body=json.dumps({"error": "Client disconnected", "task_id": task_id}),
+                    status_code=499,
+                    duration=time.time() - start_time
+                )
+        except Exception as e:
+            debug_logger.log_error(
+                error_message=f"Client disconnect cleanup failed for task {task_id}: {str(e)}",
+                status_code=500,
+                response_text=str(e)
+            )
+
+    async def recover_unfinished_tasks(self) -> int:
+        """Resume tasks left unfinished by a previous process
+
+        Submitted tasks get their concurrency slot (and image lock) back and are collected in the
+        background like a disconnected request in "collect" mode; a task whose slot is no longer
+        free is failed. Job API submissions that never reached upstream cannot be resumed (their
+        input was only held in memory) and are failed.
+
+        Returns:
+            Number of tasks re-attached to a poller
+        """
+        recovered = 0
+        for task in await self.db.get_unfinished_tasks():
+            held = False
+            try:
+                if task.status == "queued":
+                    await self.db.update_task(task.task_id, "failed", 0,
+                                              error_message="Interrupted by restart before submission")
+                    await self.notify_task_finished(task.task_id)
+                    continue
+
+                token_obj = await self.db.get_token(task.token_id)
+                if not token_obj:
+                    await self.db.update_task(task.task_id, "failed", task.progress,
+                                              error_message="Token no longer exists, task could not be recovered")
+                    await self.notify_task_finished(task.task_id)
+                    continue
+
+                model_config = MODEL_CONFIG.get(task.model)
+                if model_config:
+                    is_video = model_config["type"] == "video"
+                else:
+                    # Character/remix flows record a synthetic "sora2-video-*" model name
+                    is_video = task.model.startswith("sora")
+                is_image = not is_video
+
+                # Collection releases the lock and slot when the task ends, so it only runs once both
+                # are held again. A task that cannot get them back is failed instead of over-releasing.
+                if not await self._reacquire_generation_slots(task.token_id, is_image, is_video):
+                    debug_logger.log_info(f"Recovered task {task.task_id} could not reacquire a slot on token {task.token_id}")
+                    await self.db.update_task(task.task_id, "failed", task.progress,
+                                              error_message="Token concurrency limit reached, task could not be recovered")
+                    await self.notify_task_finished(task.task_id)
+                    continue
+                held = True
+
+                created_at = task.created_at.replace(tzinfo=timezone.utc).timestamp() if task.created_at else time.time()
+                log_id = await self.db.get_log_id_by_task_id(task.task_id)
+                self._spawn(self._collect_task_result(
+                    task.task_id, token_obj, is_image, is_video, log_id, created_at, task.prompt,
+                    task.model, model_config, reason="recovered"
+                ))
+                held = False  # Owned by the collector now
+                recovered += 1
+                debug_logger.log_info(f"Recovered task {task.task_id} (token {task.token_id}, progress {task.progress}%)")
+            except Exception as e:
+                if held:
+                    await self._release_generation_slots(task.token_id, is_image, is_video)
+                debug_logger.log_error(
+                    error_message=f"Failed to recover task {task.task_id}: {str(e)}",
+                    status_code=500,
+                    response_text=str(e)
+                )
+        return recovered
+
     async def _poll_task_result(self, task_id: str, token: str, is_video: bool,
                                 stream: bool, prompt: str, token_id: int = None,
-                                log_id: int = None, start_time: float = None) -> AsyncGenerator[str, None]:
-        """Poll for task result with timeout"""
+                                log_id: int = None, start_time: float = None, model: str = None,
+                                model_config: Dict = None) -> AsyncGenerator[bytes, None]:
+        """Poll for task result with timeout
+
+        Status lists are fetched by the token's shared poller, this task only consumes its own updates.
+        model / model_config feed the adaptive poll schedule.
+        """
+        updates = await self.task_poller.subscribe(task_id, token, is_video, token_id=token_id,
+                                                   model=model, model_config=model_config)
+        try:
+            async for chunk in self._consume_task_updates(updates, task_id, token, is_video, stream,
+                                                          prompt, token_id, log_id, start_time):
+                yield chunk
+        finally:
+            self.task_poller.unsubscribe(task_id, token, is_video)
+
+    async def _consume_task_updates(self, updates: asyncio.Queue, task_id: str, token: str, is_video: bool,
+                                    stream: bool, prompt: str, token_id: int = None,
+                                    log_id: int = None, start_time: float = None) -> AsyncGenerator[bytes, None]:
+        """Process poller updates for one task until it completes, fails or times out
+
+        The token lock and concurrency slot stay with the caller that acquired them.
+        """
         # Get timeout from config
         timeout = config.video_timeout if is_video else config.image_timeout
-        poll_interval = config.poll_interval
+        # Updates arrive at most every min poll interval, so this bound never ends polling before the timeout
+        poll_interval = min(config.poll_interval, config.poll_min_interval)
         max_attempts = int(timeout / poll_interval)  # Calculate max attempts based on timeout
         last_progress = 0
         start_time = time.time()
@@ -772,20 +1081,6 @@ class GenerationHandler:
                     status_code=408,
                     response_text=f"Task {task_id} timed out after {elapsed_time:.1f} seconds"
                 )
-                # Release lock if this is an image generation task
-                if not is_video and token_id:
-                    await self.load_balancer.token_lock.release_lock(token_id)
-                    debug_logger.log_info(f"Released lock for token {token_id} due to timeout")
-                    # Release concurrency slot for image generation
-                    if self.concurrency_manager:
-                        await self.concurrency_manager.release_image(token_id)
-                        debug_logger.log_info(f"Released concurrency slot for token {token_id} due to timeout")
-
-                # Release concurrency slot for video generation
-                if is_video and token_id and self.concurrency_manager:
-                    await self.concurrency_manager.release_video(token_id)
-                    debug_logger.log_info(f"Released concurrency slot for token {token_id} due to timeout")
-
                 # Update task status to failed
                 await self.db.update_task(task_id, "failed", 0, error_message=f"Generation timeout after {elapsed_time:.1f} seconds")
 
@@ -802,12 +1097,21 @@ class GenerationHandler:
                 raise Exception(f"Upstream API timeout: Generation exceeded {timeout} seconds limit")
 
 
-            await asyncio.sleep(poll_interval)
+            # Wait for the next poller tick, at most until the task times out
+            try:
+                kind, payload = await asyncio.wait_for(updates.get(), timeout=max(0.0, timeout - elapsed_time))
+            except asyncio.TimeoutError:
+                continue
+            if kind == "closed":
+                raise payload
 
             try:
+                if kind == "error":
+                    raise payload
+
                 if is_video:
-                    # Get pending tasks to check progress
-                    pending_tasks = await self.sora_client.get_pending_tasks(token, token_id=token_id)
+                    # Pending entry for this task, if still in progress
+                    pending_tasks = [payload] if kind == "pending" else []
 
                     # Find matching task in pending tasks
                     task_found = False
@@ -862,9 +1166,8 @@ class GenerationHandler:
 
                     # If task not found in pending tasks, it's completed - fetch from drafts
                     if not task_found:
-                        debug_logger.log_info(f"Task {task_id} not found in pending tasks, fetching from drafts...")
-                        result = await self.sora_client.get_video_drafts(token, token_id=token_id)
-                        items = result.get("items", [])
+                        debug_logger.log_info(f"Task {task_id} not found in pending tasks, checking drafts...")
+                        items = [payload] if kind == "draft" else []
 
                         # Find matching task in drafts
                         for item in items:
@@ -895,11 +1198,6 @@ class GenerationHandler:
                                     # Update task status
                                     await self.db.update_task(task_id, "failed", 0, error_message=error_message)
 
-                                    # Release resources
-                                    if token_id and self.concurrency_manager:
-                                        await self.concurrency_manager.release_video(token_id)
-                                        debug_logger.log_info(f"Released concurrency slot for token {token_id} due to content violation")
-
                                     # Return error in stream format
                                     if stream:
                                         yield self._format_stream_chunk(
@@ -909,7 +1207,7 @@ class GenerationHandler:
                                             content=f"❌ 生成失败: {reason_str}",
                                             finish_reason="STOP"
                                         )
-                                        yield "data: [DONE]\n\n"
+                                        yield SSE_DONE
 
                                     # Stop polling immediately
                                     return
@@ -948,57 +1246,15 @@ class GenerationHandler:
                                         if not post_id:
                                             raise Exception("Failed to get post ID from publish API")
 
-                                        # Get watermark-free video URL based on parse method
-                                        if parse_method == "sora_downloader":
-                                            # Use built-in parser (no external server needed)
-                                            if stream:
-                                                yield self._format_stream_chunk(
-                                                    reasoning_content=f"Video published successfully. Post ID: {post_id}\nParsing share page to get watermark-free URL...\n"
-                                                )
-
-                                            debug_logger.log_info(f"Using built-in parser for post_id: {post_id}")
-                                            watermark_free_url = await self.sora_client.get_watermark_free_url_builtin(
-                                                post_id=post_id,
-                                                token=token_obj.token if token_obj else None,
-                                                token_id=token_obj.id if token_obj else None
-                                            )
-                                        elif parse_method == "sora_downloader_external":
-                                            # Use external sora-downloader server (legacy option)
-                                            if not watermark_config.custom_parse_url:
-                                                raise Exception("Sora-downloader server URL not configured")
-
-                                            if stream:
-                                                yield self._format_stream_chunk(
-                                                    reasoning_content=f"Video published successfully. Post ID: {post_id}\nUsing external sora-downloader server to get watermark-free URL...\n"
-                                                )
-
-                                            debug_logger.log_info(f"Using external sora-downloader: {watermark_config.custom_parse_url}")
-                                            watermark_free_url = await self.sora_client.get_watermark_free_url_sora_downloader(
-                                                parse_url=watermark_config.custom_parse_url,
-                                                parse_token=watermark_config.custom_parse_token or "",
-                                                post_id=post_id
-                                            )
-                                        elif parse_method == "custom":
-                                            # Use custom parse server
-                                            if not watermark_config.custom_parse_url or not watermark_config.custom_parse_token:
-                                                raise Exception("Custom parse server URL or token not configured")
-
-                                            if stream:
-                                                yield self._format_stream_chunk(
-                                                    reasoning_content=f"Video published successfully. Post ID: {post_id}\nUsing custom parse server to get watermark-free URL...\n"
-                                                )
-
-                                            debug_logger.log_info(f"Using custom parse server: {watermark_config.custom_parse_url}")
-                                            watermark_free_url = await self.sora_client.get_watermark_free_url_custom(
-                                                parse_url=watermark_config.custom_parse_url,
-                                                parse_token=watermark_config.custom_parse_token,
-                                                post_id=post_id
+                                        # Get watermark-free video URL, hedging across the usable parse methods
+                                        if stream and parse_method != "third_party":
+                                            yield self._format_stream_chunk(
+                                                reasoning_content=f"Video published successfully. Post ID: {post_id}\nResolving watermark-free URL ({parse_method})...\n"
                                             )
-                                        else:
-                                            # Use third-party parse (default)
-                                            watermark_free_url = f"https://oscdn2.dyysy.com/MP4/{post_id}.mp4"
-                                            debug_logger.log_info(f"Using third-party parse server")
-
+                                        watermark_free_url, used_method = await self.watermark_resolver.resolve(
+                                            post_id, watermark_config, token, token_id
+                                        )
+                                        debug_logger.log_info(f"Watermark-free URL resolved by {used_method}")
                                         debug_logger.log_info(f"Watermark-free URL: {watermark_free_url}")
 
                                         if stream:
@@ -1016,25 +1272,8 @@ class GenerationHandler:
                                                         reasoning_content="Watermark-free video cached successfully. Preparing final response...\n"
                                                     )
 
-                                                # Delete the published post after caching
-                                                try:
-                                                    debug_logger.log_info(f"Deleting published post: {post_id}")
-                                                    await self.sora_client.delete_post(post_id, token)
-                                                    debug_logger.log_info(f"Published post deleted successfully: {post_id}")
-                                                    if stream:
-                                                        yield self._format_stream_chunk(
-                                                            reasoning_content="Published post deleted successfully.\n"
-                                                        )
-                                                except Exception as delete_error:
-                                                    debug_logger.log_error(
-                                                        error_message=f"Failed to delete published post {post_id}: {str(delete_error)}",
-                                                        status_code=500,
-                                                        response_text=str(delete_error)
-                                                    )
-                                                    if stream:
-                                                        yield self._format_stream_chunk(
-                                                            reasoning_content=f"Warning: Failed to delete published post - {str(delete_error)}\n"
-                                                        )
+                                                # The published post is deleted in the background once cached
+                                                await self._queue_post_cleanup(post_id, token_id)
                                             except Exception as cache_error:
                                                 # Fallback to watermark-free URL if caching fails
                                                 local_url = watermark_free_url
@@ -1042,6 +1281,8 @@ class GenerationHandler:
                                                     yield self._format_stream_chunk(
                                                         reasoning_content=f"Warning: Failed to cache file - {str(cache_error)}\nUsing original watermark-free URL instead...\n"
                                                     )
+                                                # Keep the post while the client may still be fetching from it
+                                                await self._queue_post_cleanup(post_id, token_id, config.post_cleanup_uncached_delay)
                                         else:
                                             # Cache disabled: use watermark-free URL directly
                                             local_url = watermark_free_url
@@ -1118,11 +1359,10 @@ class GenerationHandler:
                                         content=f"```html\n<video src='{local_url}' controls></video>\n```",
                                         finish_reason="STOP"
                                     )
-                                    yield "data: [DONE]\n\n"
+                                    yield SSE_DONE
                                 return
                 else:
-                    result = await self.sora_client.get_image_tasks(token, token_id=token_id)
-                    task_responses = result.get("task_responses", [])
+                    task_responses = [payload] if kind == "task" else []
 
                     # Find matching task
                     task_found = False
@@ -1145,38 +1385,75 @@ class GenerationHandler:
                                         )
 
                                     base_url = self._get_base_url()
-                                    local_urls = []
 
                                     # Check if cache is enabled
                                     if config.cache_enabled:
-                                        for idx, url in enumerate(urls):
-                                            try:
+                                        # Cache all images concurrently, streaming each one as soon as it is ready
+                                        semaphore = asyncio.Semaphore(config.cache_max_parallel_downloads)
+
+                                        async def cache_image(url: str) -> str:
+                                            async with semaphore:
                                                 cached_filename = await self.file_cache.download_and_cache(url, "image", token_id=token_id)
-                                                local_url = f"{base_url}/tmp/{cached_filename}"
-                                                local_urls.append(local_url)
-                                                if stream and len(urls) > 1:
-                                                    yield self._format_stream_chunk(
-                                                        reasoning_content=f"Cached image {idx + 1}/{len(urls)}...\n"
-                                                    )
-                                            except Exception as cache_error:
-                                                # Fallback to original URL if caching fails
-                                                local_urls.append(url)
-                                                if stream:
-                                                    yield self._format_stream_chunk(
-                                                        reasoning_content=f"Warning: Failed to cache image {idx + 1} - {str(cache_error)}\nUsing original URL instead...\n"
-                                                    )
+                                                return f"{base_url}/tmp/{cached_filename}"
+
+                                        local_urls = list(urls)  # Upstream URL until its cached copy is ready
+                                        pending = {asyncio.create_task(cache_image(url)): idx for idx, url in enumerate(urls)}
+                                        deadline = time.monotonic() + config.cache_stream_wait
+                                        streamed = 0
+                                        try:
+                                            while pending:
+                                                done, _ = await asyncio.wait(
+                                                    pending, timeout=max(0.0, deadline - time.monotonic()),
+                                                    return_when=asyncio.FIRST_COMPLETED
+                                                )
+                                                if not done:
+                                                    break
+                                                for download in done:
+                                                    idx = pending.pop(download)
+                                                    try:
+                                                        local_urls[idx] = download.result()
+                                                    except Exception as cache_error:
+                                                        # Fallback to original URL if caching fails
+                                                        if stream:
+                                                            yield self._format_stream_chunk(
+                                                                reasoning_content=f"Warning: Failed to cache image {idx + 1} - {str(cache_error)}\nUsing original URL instead...\n"
+                                                            )
+                                                    if stream:
+                                                        yield self._format_stream_chunk(
+                                                            content=("\n" if streamed else "") + f"![Generated Image]({local_urls[idx]})"
+                                                        )
+                                                        streamed += 1
+                                        finally:
+                                            for download in pending:
+                                                download.cancel()
+
+                                        # Caching too slow: hand out the upstream URLs that are still pending
+                                        for idx in sorted(pending.values()):
+                                            if stream:
+                                                yield self._format_stream_chunk(
+                                                    reasoning_content=f"Warning: Caching image {idx + 1} is taking too long\nUsing original URL instead...\n"
+                                                )
+                                                yield self._format_stream_chunk(
+                                                    content=("\n" if streamed else "") + f"![Generated Image]({local_urls[idx]})"
+                                                )
+                                                streamed += 1
+
+                                        await self.db.update_task(
+                                            task_id, "completed", 100.0,
+                                            result_urls=json.dumps(local_urls)
+                                        )
 
-                                        if stream and all(u.startswith(base_url) for u in local_urls):
-                                            yield self._format_stream_chunk(
-                                                reasoning_content="All images cached successfully. Preparing final response...\n"
-                                            )
-                                    else:
-                                        # Cache disabled: use original URLs directly
-                                        local_urls = urls
                                         if stream:
-                                            yield self._format_stream_chunk(
-                                                reasoning_content="Cache is disabled. Using original URLs directly...\n"
-                                            )
+                                            yield self._format_stream_chunk(finish_reason="STOP")
+                                            yield SSE_DONE
+                                        return
+
+                                    # Cache disabled: use original URLs directly
+                                    local_urls = urls
+                                    if stream:
+                                        yield self._format_stream_chunk(
+                                            reasoning_content="Cache is disabled. Using original URLs directly...\n"
+                                        )
 
                                     await self.db.update_task(
                                         task_id, "completed", 100.0,
@@ -1190,7 +1467,7 @@ class GenerationHandler:
                                             content=content_markdown,
                                             finish_reason="STOP"
                                         )
-                                        yield "data: [DONE]\n\n"
+                                        yield SSE_DONE
                                     return
 
                             elif status == "failed":
@@ -1231,7 +1508,7 @@ class GenerationHandler:
 
                 # Progress update for stream mode (fallback if no status from API)
                 if stream and attempt % 10 == 0:  # Update every 10 attempts (roughly 20% intervals)
-                    estimated_progress = min(90, (attempt / max_attempts) * 100)
+                    estimated_progress = min(90, (time.time() - start_time) / timeout * 100)
                     if estimated_progress > last_progress + 20:  # Update every 20%
                         last_progress = estimated_progress
                         yield self._format_stream_chunk(
@@ -1271,14 +1548,6 @@ class GenerationHandler:
                             duration=duration
                         )
 
-                    # Release resources
-                    if not is_video and token_id:
-                        await self.load_balancer.token_lock.release_lock(token_id)
-                        if self.concurrency_manager:
-                            await self.concurrency_manager.release_image(token_id)
-                    if is_video and token_id and self.concurrency_manager:
-                        await self.concurrency_manager.release_video(token_id)
-
                     # Send error message to client if streaming
                     if stream:
                         yield self._format_stream_chunk(
@@ -1288,7 +1557,7 @@ class GenerationHandler:
                             content="❌ Generation failed: Cloudflare challenge or rate limit (429) triggered. Please change proxy or reduce request frequency.",
                             finish_reason="STOP"
                         )
-                        yield "data: [DONE]\\n\\n"
+                        yield SSE_DONE
 
                     # Exit polling immediately
                     return
@@ -1298,25 +1567,11 @@ class GenerationHandler:
                     raise e
                 continue
 
-        # Timeout - release lock if image generation
-        if not is_video and token_id:
-            await self.load_balancer.token_lock.release_lock(token_id)
-            debug_logger.log_info(f"Released lock for token {token_id} due to max attempts reached")
-            # Release concurrency slot for image generation
-            if self.concurrency_manager:
-                await self.concurrency_manager.release_image(token_id)
-                debug_logger.log_info(f"Released concurrency slot for token {token_id} due to max attempts reached")
-
-        # Release concurrency slot for video generation
-        if is_video and token_id and self.concurrency_manager:
-            await self.concurrency_manager.release_video(token_id)
-            debug_logger.log_info(f"Released concurrency slot for token {token_id} due to max attempts reached")
-
         await self.db.update_task(task_id, "failed", 0, error_message=f"Generation timeout after {timeout} seconds")
         raise Exception(f"Upstream API timeout: Generation exceeded {timeout} seconds limit")
     
     def _format_stream_chunk(self, content: str = None, reasoning_content: str = None,
-                            finish_reason: str = None, is_first: bool = False) -> str:
+                            finish_reason: str = None, is_first: bool = False) -> bytes:
         """Format streaming response chunk
 
         Args:
@@ -1325,50 +1580,8 @@ class GenerationHandler:
             finish_reason: Finish reason (e.g., "STOP")
             is_first: Whether this is the first chunk (includes role)
         """
-        chunk_id = f"chatcmpl-{int(datetime.now().timestamp() * 1000)}"
-
-        delta = {}
-
-        # Add role for first chunk
-        if is_first:
-            delta["role"] = "assistant"
-
-        # Add content fields
-        if content is not None:
-            delta["content"] = content
-        else:
-            delta["content"] = None
-
-        if reasoning_content is not None:
-            delta["reasoning_content"] = reasoning_content
-        else:
-            delta["reasoning_content"] = None
-
-        delta["tool_calls"] = None
-
-        response = {
-            "id": chunk_id,
-            "object": "chat.completion.chunk",
-            "created": int(datetime.now().timestamp()),
-            "model": "sora",
-            "choices": [{
-                "index": 0,
-                "delta": delta,
-                "finish_reason": finish_reason,
-                "native_finish_reason": finish_reason
-            }],
-            "usage": {
-                "prompt_tokens": 0
-            }
-        }
-
-        # Add completion tokens for final chunk
-        if finish_reason:
-            response["usage"]["completion_tokens"] = 1
-            response["usage"]["total_tokens"] = 1
+        return format_chunk(content, reasoning_content, finish_reason, is_first)
 
-        return f'data: {json.dumps(response)}\n\n'
-    
     def _format_non_stream_response(self, content: str, media_type: str = None, is_availability_check: bool = False) -> str:
         """Format non-streaming response
 
@@ -1409,6 +1622,7 @@ class GenerationHandler:
                 token_id=token_id,
                 task_id=task_id,
                 operation=operation,
+                model=request_data.get("model") if operation in ("generate_image", "generate_video") else None,
                 request_body=json.dumps(request_data),
                 response_body=json.dumps(response_data),
                 status_code=status_code,
@@ -1422,7 +1636,7 @@ class GenerationHandler:
 
     # ==================== Prompt Enhancement Handler ====================
 
-    async def _handle_prompt_enhance(self, prompt: str, model_config: Dict, stream: bool) -> AsyncGenerator[str, None]:
+    async def _handle_prompt_enhance(self, prompt: str, model_config: Dict, stream: bool) -> AsyncGenerator[Union[str, bytes], None]:
         """Handle prompt enhancement request
 
         Args:
@@ -1433,6 +1647,18 @@ class GenerationHandler:
         expansion_level = model_config["expansion_level"]
         duration_s = model_config["duration_s"]
 
+        # Repeated prompts are answered from the cache without using a token
+        cache_key = (" ".join(prompt.split()), expansion_level, duration_s)
+        enhanced_prompt = self.enhance_cache.get(cache_key)
+        if enhanced_prompt is not None:
+            debug_logger.log_info(f"Prompt enhancement cache hit ({expansion_level}, {duration_s}s)")
+            if stream:
+                yield self._format_stream_chunk(content=enhanced_prompt, is_first=True)
+                yield self._format_stream_chunk(finish_reason="STOP")
+            else:
+                yield self._format_non_stream_response(enhanced_prompt)
+            return
+
         # Select token
         token_obj = await self.load_balancer.select_token(for_video_generation=True)
         if not token_obj:
@@ -1453,6 +1679,8 @@ class GenerationHandler:
                 duration_s=duration_s,
                 token_id=token_obj.id
             )
+            if enhanced_prompt:
+                self.enhance_cache.set(cache_key, enhanced_prompt)
 
             if stream:
                 # Stream response
@@ -1476,24 +1704,183 @@ class GenerationHandler:
 
     # ==================== Character Creation and Remix Handlers ====================
 
-    async def _handle_character_creation_only(self, video_data, model_config: Dict) -> AsyncGenerator[str, None]:
+    @staticmethod
+    def _video_content_hash(video) -> str:
+        """Hash of a character source video, spooled or in memory"""
+        return video.sha256 if isinstance(video, MediaFile) else hashlib.sha256(video).hexdigest()
+
+    async def _find_registered_character(self, content_hash: str, public_only: bool = False):
+        """Find a character created earlier from the same video
+
+        Private characters can only be used by the token that created them, so those are only
+        returned while their token can take a video.
+
+        Returns:
+            (registry entry, owning token or None), (None, None) when nothing is reusable
+        """
+        if not config.character_registry_enabled:
+            return None, None
+        entries = await self.db.get_registered_characters(content_hash, config.character_registry_ttl)
+        if public_only:
+            entries = [entry for entry in entries if entry["is_public"]]
+            return (entries[0], None) if entries else (None, None)
+        if not entries:
+            return None, None
+        available = {token.id: token for token in await self.load_balancer.get_available_tokens(for_video_generation=True)}
+        for entry in entries:
+            if entry["token_id"] in available:
+                return entry, available[entry["token_id"]]
+        return None, None
+
+    @staticmethod
+    def _is_character_gone(error: Exception, entry: Dict) -> bool:
+        """Check whether a failed submission is upstream reporting the mentioned character missing
+
+        Only an upstream API error that is a 404 or carries a not-found code and names the
+        character counts, token, proxy and upload failures never match.
+        """
+        match = re.search(r"API request failed: (4\d\d) - (.*)", str(error), re.S)
+        if not match:
+            return False
+        status, body = match.group(1), match.group(2).lower()
+        if status != "404" and "not_found" not in body:
+            return False
+        identifiers = [entry.get(key) for key in ("username", "character_id", "cameo_id")]
+        return any(identifier and identifier.lower() in body for identifier in identifiers)
+
+    async def _timed_step(self, timings: Dict[str, float], step: str, awaitable):
+        """Await one character pipeline step, recording and logging how long it took"""
+        step_start = time.time()
+        try:
+            return await awaitable
+        finally:
+            timings[step] = round(time.time() - step_start, 3)
+            debug_logger.log_info(f"Character step {step} took {timings[step]:.2f}s")
+
+    async def _register_character(self, content_hash: str, token_id: int, character: Dict, is_public: bool):
+        """Record a created character for reuse, a failure only costs the reuse"""
+        if not config.character_registry_enabled:
+            return
+        try:
+            await self.db.save_registered_character(content_hash, token_id, character["cameo_id"],
+                                                    character["character_id"], character["username"],
+                                                    character["display_name"], is_public=is_public)
+        except Exception as e:
+            debug_logger.log_error(
+                error_message=f"Failed to register character @{character['username']}: {str(e)}",
+                status_code=500,
+                response_text=str(e)
+            )
+
+    async def _create_character(self, video_bytes, fetched_video: Optional[MediaFile], token_obj,
+                                character: Dict) -> AsyncGenerator[bytes, None]:
+        """Upload a video and turn it into a finalized character, streaming progress
+
+        Fills character with cameo_id, username, display_name and character_id as they
+        become known, so callers can report partial progress on failure, and with the
+        duration of each step under timings. Each step needs the result of the previous one.
+        """
+        timings = character.setdefault("timings", {})
+
+        # Step 1: Upload video
+        yield self._format_stream_chunk(
+            reasoning_content="Uploading video file...\n"
+        )
+        try:
+            cameo_id = await self._timed_step(
+                timings, "upload_video", self.sora_client.upload_character_video(video_bytes, token_obj.token)
+            )
+        finally:
+            if fetched_video:
+                fetched_video.remove()
+        character["cameo_id"] = cameo_id
+        debug_logger.log_info(f"Video uploaded, cameo_id: {cameo_id}")
+
+        # Step 2: Poll for character processing
+        yield self._format_stream_chunk(
+            reasoning_content="Processing video to extract character...\n"
+        )
+        cameo_status = await self._timed_step(timings, "cameo_processing", self._poll_cameo_status(cameo_id, token_obj.token))
+        debug_logger.log_info(f"Cameo status: {cameo_status}")
+
+        # Extract character info immediately after polling completes
+        username_hint = cameo_status.get("username_hint", "character")
+        display_name = cameo_status.get("display_name_hint", "Character")
+
+        # Process username: remove prefix and add 3 random digits
+        username = self._process_character_username(username_hint)
+        character["username"] = username
+        character["display_name"] = display_name
+
+        # Output character name immediately
+        yield self._format_stream_chunk(
+            reasoning_content=f"✨ 角色已识别: {display_name} (@{username})\n"
+        )
+
+        # Step 3: Download and cache avatar
+        yield self._format_stream_chunk(
+            reasoning_content="Downloading character avatar...\n"
+        )
+        profile_asset_url = cameo_status.get("profile_asset_url")
+        if not profile_asset_url:
+            raise Exception("Profile asset URL not found in cameo status")
+
+        avatar_data = await self._timed_step(
+            timings, "avatar_download", self.sora_client.download_character_image(profile_asset_url)
+        )
+        debug_logger.log_info(f"Avatar downloaded, size: {len(avatar_data)} bytes")
+
+        # Step 4: Upload avatar
+        yield self._format_stream_chunk(
+            reasoning_content="Uploading character avatar...\n"
+        )
+        asset_pointer = await self._timed_step(
+            timings, "avatar_upload",
+            self.sora_client.upload_character_image(avatar_data, token_obj.token, token_id=token_obj.id)
+        )
+        debug_logger.log_info(f"Avatar uploaded, asset_pointer: {asset_pointer}")
+
+        # Step 5: Finalize character
+        yield self._format_stream_chunk(
+            reasoning_content="Finalizing character creation...\n"
+        )
+        # instruction_set_hint is a string, but instruction_set in cameo_status might be an array
+        instruction_set = cameo_status.get("instruction_set_hint") or cameo_status.get("instruction_set")
+
+        character_id = await self._timed_step(timings, "finalize", self.sora_client.finalize_character(
+            cameo_id=cameo_id,
+            username=username,
+            display_name=display_name,
+            profile_asset_pointer=asset_pointer,
+            instruction_set=instruction_set,
+            token=token_obj.token
+        ))
+        character["character_id"] = character_id
+        debug_logger.log_info(f"Character finalized, character_id: {character_id}")
+
+    async def _handle_character_creation_only(self, video_data, model_config: Dict) -> AsyncGenerator[bytes, None]:
         """Handle character creation only (no video generation)
 
         Flow:
         1. Download video if URL, or use bytes directly
-        2. Upload video to create character
-        3. Poll for character processing
-        4. Download and cache avatar
-        5. Upload avatar
-        6. Finalize character
-        7. Set character as public
-        8. Return success message
+        2. Reuse a public character registered for the same video, if any
+        3. Upload video to create character
+        4. Poll for character processing
+        5. Download and cache avatar
+        6. Upload avatar
+        7. Finalize character
+        8. Set character as public and register it
+        9. Return success message
         """
+        if is_remote_url(video_data):
+            self.media_fetcher.prefetch(video_data, "video")
+
         token_obj = await self.load_balancer.select_token(for_video_generation=True)
         if not token_obj:
             raise Exception("No available tokens for character creation")
 
         start_time = time.time()
+        fetched_video = None
         try:
             yield self._format_stream_chunk(
                 reasoning_content="**Character Creation Begins**\n\nInitializing character creation...\n",
@@ -1502,100 +1889,86 @@ class GenerationHandler:
 
             # Handle video URL or bytes
             if isinstance(video_data, str):
-                # It's a URL, download it
+                # It's a URL, fetch it (prefetched while the token was being selected)
                 yield self._format_stream_chunk(
                     reasoning_content="Downloading video file...\n"
                 )
-                video_bytes = await self._download_file(video_data)
+                fetched_video = await self.media_fetcher.fetch(video_data, "video")
+                video_bytes = fetched_video
             else:
                 video_bytes = video_data
 
-            # Step 1: Upload video
-            yield self._format_stream_chunk(
-                reasoning_content="Uploading video file...\n"
-            )
-            cameo_id = await self.sora_client.upload_character_video(video_bytes, token_obj.token)
-            debug_logger.log_info(f"Video uploaded, cameo_id: {cameo_id}")
-
-            # Step 2: Poll for character processing
-            yield self._format_stream_chunk(
-                reasoning_content="Processing video to extract character...\n"
-            )
-            cameo_status = await self._poll_cameo_status(cameo_id, token_obj.token)
-            debug_logger.log_info(f"Cameo status: {cameo_status}")
-
-            # Extract character info immediately after polling completes
-            username_hint = cameo_status.get("username_hint", "character")
-            display_name = cameo_status.get("display_name_hint", "Character")
-
-            # Process username: remove prefix and add 3 random digits
-            username = self._process_character_username(username_hint)
-
-            # Output character name immediately
-            yield self._format_stream_chunk(
-                reasoning_content=f"✨ 角色已识别: {display_name} (@{username})\n"
-            )
-
-            # Step 3: Download and cache avatar
-            yield self._format_stream_chunk(
-                reasoning_content="Downloading character avatar...\n"
-            )
-            profile_asset_url = cameo_status.get("profile_asset_url")
-            if not profile_asset_url:
-                raise Exception("Profile asset URL not found in cameo status")
-
-            avatar_data = await self.sora_client.download_character_image(profile_asset_url)
-            debug_logger.log_info(f"Avatar downloaded, size: {len(avatar_data)} bytes")
-
-            # Step 4: Upload avatar
-            yield self._format_stream_chunk(
-                reasoning_content="Uploading character avatar...\n"
-            )
-            asset_pointer = await self.sora_client.upload_character_image(avatar_data, token_obj.token, token_id=token_obj.id)
-            debug_logger.log_info(f"Avatar uploaded, asset_pointer: {asset_pointer}")
+            content_hash = self._video_content_hash(video_bytes)
+            registered, _ = await self._find_registered_character(content_hash, public_only=True)
+            if registered:
+                if fetched_video:
+                    fetched_video.remove()
+                await self.db.mark_registered_character_used(registered["id"])
+                debug_logger.log_info(f"Reusing registered character @{registered['username']} for video {content_hash[:12]}")
+                await self._log_request(
+                    token_id=registered["token_id"],
+                    operation="character_only",
+                    request_data={
+                        "type": "character_creation",
+                        "has_video": True
+                    },
+                    response_data={
+                        "success": True,
+                        "username": registered["username"],
+                        "display_name": registered["display_name"],
+                        "character_id": registered["character_id"],
+                        "cameo_id": registered["cameo_id"],
+                        "reused": True
+                    },
+                    status_code=200,
+                    duration=time.time() - start_time
+                )
+                yield self._format_stream_chunk(
+                    content=f"角色创建成功，角色名@{registered['username']}",
+                    finish_reason="STOP"
+                )
+                yield SSE_DONE
+                return
 
-            # Step 5: Finalize character
-            yield self._format_stream_chunk(
-                reasoning_content="Finalizing character creation...\n"
-            )
-            # instruction_set_hint is a string, but instruction_set in cameo_status might be an array
-            instruction_set = cameo_status.get("instruction_set_hint") or cameo_status.get("instruction_set")
-
-            character_id = await self.sora_client.finalize_character(
-                cameo_id=cameo_id,
-                username=username,
-                display_name=display_name,
-                profile_asset_pointer=asset_pointer,
-                instruction_set=instruction_set,
-                token=token_obj.token
-            )
-            debug_logger.log_info(f"Character finalized, character_id: {character_id}")
+            character = {}
+            async for chunk in self._create_character(video_bytes, fetched_video, token_obj, character):
+                yield chunk
+            cameo_id = character["cameo_id"]
+            username = character["username"]
+            display_name = character["display_name"]
+            character_id = character["character_id"]
 
             # Step 6: Set character as public
             yield self._format_stream_chunk(
                 reasoning_content="Setting character as public...\n"
             )
-            await self.sora_client.set_character_public(cameo_id, token_obj.token)
+            await self._timed_step(character["timings"], "set_public",
+                                   self.sora_client.set_character_public(cameo_id, token_obj.token))
             debug_logger.log_info(f"Character set as public")
 
-            # Log successful character creation
+            # Register and log successful character creation, both only write to the database
             duration = time.time() - start_time
-            await self._log_request(
-                token_id=token_obj.id,
-                operation="character_only",
-                request_data={
-                    "type": "character_creation",
-                    "has_video": True
-                },
-                response_data={
-                    "success": True,
-                    "username": username,
-                    "display_name": display_name,
-                    "character_id": character_id,
-                    "cameo_id": cameo_id
-                },
-                status_code=200,
-                duration=duration
+            debug_logger.log_info(f"Character @{username} created in {duration:.2f}s, steps: {character['timings']}")
+            await asyncio.gather(
+                self._register_character(content_hash, token_obj.id, character, is_public=True),
+                self._log_request(
+                    token_id=token_obj.id,
+                    operation="character_only",
+                    request_data={
+                        "type": "character_creation",
+                        "has_video": True
+                    },
+                    response_data={
+                        "success": True,
+                        "username": username,
+                        "display_name": display_name,
+                        "character_id": character_id,
+                        "cameo_id": cameo_id,
+                        "timings": character["timings"]
+                    },
+                    status_code=200,
+                    duration=duration
+                )
             )
 
             # Step 7: Return success message
@@ -1603,9 +1976,12 @@ class GenerationHandler:
                 content=f"角色创建成功，角色名@{username}",
                 finish_reason="STOP"
             )
-            yield "data: [DONE]\n\n"
+            yield SSE_DONE
 
         except Exception as e:
+            if fetched_video:
+                fetched_video.remove()
+
             # Parse error to check for CF shield/429
             error_response = None
             try:
@@ -1652,29 +2028,32 @@ class GenerationHandler:
             )
             raise
 
-    async def _handle_character_and_video_generation(self, video_data, prompt: str, model_config: Dict) -> AsyncGenerator[str, None]:
+    async def _handle_character_and_video_generation(self, video_data, prompt: str, model_config: Dict) -> AsyncGenerator[bytes, None]:
         """Handle character creation and video generation
 
         Flow:
         1. Download video if URL, or use bytes directly
-        2. Upload video to create character
-        3. Poll for character processing
-        4. Download and cache avatar
-        5. Upload avatar
-        6. Finalize character
-        7. Generate video with character (@username + prompt)
-        8. Delete character
-        9. Return video result
+        2. Reuse a character registered for the same video, switching to its token, if any
+        3. Upload video to create character
+        4. Poll for character processing
+        5. Download and cache avatar
+        6. Upload avatar
+        7. Finalize character and register it
+        8. Generate video with character (@username + prompt)
+        9. Delete character when the registry is disabled
+        10. Return video result
         """
+        if is_remote_url(video_data):
+            self.media_fetcher.prefetch(video_data, "video")
+
         token_obj = await self.load_balancer.select_token(for_video_generation=True)
         if not token_obj:
             raise Exception("No available tokens for video generation")
 
-        character_id = None
         start_time = time.time()
-        username = None
-        display_name = None
-        cameo_id = None
+        character = {}
+        registered = None
+        fetched_video = None
         try:
             yield self._format_stream_chunk(
                 reasoning_content="**Character Creation and Video Generation Begins**\n\nInitializing...\n",
@@ -1683,96 +2062,65 @@ class GenerationHandler:
 
             # Handle video URL or bytes
             if isinstance(video_data, str):
-                # It's a URL, download it
+                # It's a URL, fetch it (prefetched while the token was being selected)
                 yield self._format_stream_chunk(
                     reasoning_content="Downloading video file...\n"
                 )
-                video_bytes = await self._download_file(video_data)
+                fetched_video = await self.media_fetcher.fetch(video_data, "video")
+                video_bytes = fetched_video
             else:
                 video_bytes = video_data
 
-            # Step 1: Upload video
-            yield self._format_stream_chunk(
-                reasoning_content="Uploading video file...\n"
-            )
-            cameo_id = await self.sora_client.upload_character_video(video_bytes, token_obj.token)
-            debug_logger.log_info(f"Video uploaded, cameo_id: {cameo_id}")
-
-            # Step 2: Poll for character processing
-            yield self._format_stream_chunk(
-                reasoning_content="Processing video to extract character...\n"
-            )
-            cameo_status = await self._poll_cameo_status(cameo_id, token_obj.token)
-            debug_logger.log_info(f"Cameo status: {cameo_status}")
-
-            # Extract character info immediately after polling completes
-            username_hint = cameo_status.get("username_hint", "character")
-            display_name = cameo_status.get("display_name_hint", "Character")
-
-            # Process username: remove prefix and add 3 random digits
-            username = self._process_character_username(username_hint)
-
-            # Output character name immediately
-            yield self._format_stream_chunk(
-                reasoning_content=f"✨ 角色已识别: {display_name} (@{username})\n"
-            )
-
-            # Step 3: Download and cache avatar
-            yield self._format_stream_chunk(
-                reasoning_content="Downloading character avatar...\n"
-            )
-            profile_asset_url = cameo_status.get("profile_asset_url")
-            if not profile_asset_url:
-                raise Exception("Profile asset URL not found in cameo status")
-
-            avatar_data = await self.sora_client.download_character_image(profile_asset_url)
-            debug_logger.log_info(f"Avatar downloaded, size: {len(avatar_data)} bytes")
-
-            # Step 4: Upload avatar
-            yield self._format_stream_chunk(
-                reasoning_content="Uploading character avatar...\n"
-            )
-            asset_pointer = await self.sora_client.upload_character_image(avatar_data, token_obj.token, token_id=token_obj.id)
-            debug_logger.log_info(f"Avatar uploaded, asset_pointer: {asset_pointer}")
-
-            # Step 5: Finalize character
-            yield self._format_stream_chunk(
-                reasoning_content="Finalizing character creation...\n"
-            )
-            # instruction_set_hint is a string, but instruction_set in cameo_status might be an array
-            instruction_set = cameo_status.get("instruction_set_hint") or cameo_status.get("instruction_set")
-
-            character_id = await self.sora_client.finalize_character(
-                cameo_id=cameo_id,
-                username=username,
-                display_name=display_name,
-                profile_asset_pointer=asset_pointer,
-                instruction_set=instruction_set,
-                token=token_obj.token
-            )
-            debug_logger.log_info(f"Character finalized, character_id: {character_id}")
+            content_hash = self._video_content_hash(video_bytes)
+            registered, owner_token = await self._find_registered_character(content_hash)
+            if registered:
+                # The character belongs to its token's account, generate with that token
+                if fetched_video:
+                    fetched_video.remove()
+                token_obj = owner_token
+                character = {key: registered[key] for key in ("cameo_id", "username", "display_name", "character_id")}
+                await self.db.mark_registered_character_used(registered["id"])
+                debug_logger.log_info(f"Reusing registered character @{registered['username']} for video {content_hash[:12]}")
+                yield self._format_stream_chunk(
+                    reasoning_content=f"✨ 复用已有角色: {registered['display_name']} (@{registered['username']})\n"
+                )
+            else:
+                # The generation request's sentinel token is prepared while the cameo is processed
+                await self.sora_client.prepare_sentinel_token(token_obj.token, token_obj.id)
+                async for chunk in self._create_character(video_bytes, fetched_video, token_obj, character):
+                    yield chunk
+            username = character["username"]
 
-            # Log successful character creation (before video generation)
+            # Register and log successful character creation while the video is submitted
             character_creation_duration = time.time() - start_time
-            await self._log_request(
-                token_id=token_obj.id,
-                operation="character_with_video",
-                request_data={
-                    "type": "character_creation_with_video",
-                    "has_video": True,
-                    "prompt": prompt
-                },
-                response_data={
-                    "success": True,
-                    "username": username,
-                    "display_name": display_name,
-                    "character_id": character_id,
-                    "cameo_id": cameo_id,
-                    "stage": "character_created"
-                },
-                status_code=200,
-                duration=character_creation_duration
-            )
+            if not registered:
+                debug_logger.log_info(f"Character @{username} created in {character_creation_duration:.2f}s, "
+                                      f"steps: {character['timings']}")
+            bookkeeping = [
+                self._log_request(
+                    token_id=token_obj.id,
+                    operation="character_with_video",
+                    request_data={
+                        "type": "character_creation_with_video",
+                        "has_video": True,
+                        "prompt": prompt
+                    },
+                    response_data={
+                        "success": True,
+                        "username": username,
+                        "display_name": character["display_name"],
+                        "character_id": character["character_id"],
+                        "cameo_id": character["cameo_id"],
+                        "stage": "character_reused" if registered else "character_created",
+                        "timings": character.get("timings")
+                    },
+                    status_code=200,
+                    duration=character_creation_duration
+                )
+            ]
+            if not registered:
+                bookkeeping.append(self._register_character(content_hash, token_obj.id, character, is_public=False))
+            bookkeeping = asyncio.gather(*bookkeeping)
 
             # Step 6: Generate video with character
             yield self._format_stream_chunk(
@@ -1790,14 +2138,23 @@ class GenerationHandler:
             sora_model = model_config.get("model", "sy_8")
             video_size = model_config.get("size", "small")
 
-            task_id = await self.sora_client.generate_video(
-                full_prompt, token_obj.token,
-                orientation=model_config["orientation"],
-                n_frames=n_frames,
-                model=sora_model,
-                size=video_size,
-                token_id=token_obj.id
-            )
+            try:
+                task_id = await self.sora_client.generate_video(
+                    full_prompt, token_obj.token,
+                    orientation=model_config["orientation"],
+                    n_frames=n_frames,
+                    model=sora_model,
+                    size=video_size,
+                    token_id=token_obj.id
+                )
+            except Exception as e:
+                if registered and self._is_character_gone(e, registered):
+                    # The reused character no longer exists upstream, create a fresh one next time
+                    debug_logger.log_info(f"Registered character @{username} is gone upstream, forgetting it")
+                    await self.character_cleanup.forget(registered)
+                raise
+            finally:
+                await bookkeeping
             debug_logger.log_info(f"Video generation started, task_id: {task_id}")
 
             # Save task to database
@@ -1815,13 +2172,17 @@ class GenerationHandler:
             await self.token_manager.record_usage(token_obj.id, is_video=True)
 
             # Poll for results
-            async for chunk in self._poll_task_result(task_id, token_obj.token, True, True, full_prompt, token_obj.id):
+            async for chunk in self._poll_task_result(task_id, token_obj.token, True, True, full_prompt, token_obj.id,
+                                                      model_config=model_config):
                 yield chunk
 
             # Record success
             await self.token_manager.record_success(token_obj.id, is_video=True)
 
         except Exception as e:
+            if fetched_video:
+                fetched_video.remove()
+
             # Log failed character creation
             duration = time.time() - start_time
             await self._log_request(
@@ -1834,10 +2195,10 @@ class GenerationHandler:
                 },
                 response_data={
                     "success": False,
-                    "username": username,
-                    "display_name": display_name,
-                    "character_id": character_id,
-                    "cameo_id": cameo_id,
+                    "username": character.get("username"),
+                    "display_name": character.get("display_name"),
+                    "character_id": character.get("character_id"),
+                    "cameo_id": character.get("cameo_id"),
                     "error": str(e)
                 },
                 status_code=500,
@@ -1872,8 +2233,9 @@ class GenerationHandler:
             )
             raise
         finally:
-            # Step 7: Delete character
-            if character_id:
+            # Step 7: Delete character, registered characters are kept for reuse
+            character_id = character.get("character_id")
+            if character_id and not config.character_registry_enabled:
                 try:
                     yield self._format_stream_chunk(
                         reasoning_content="Cleaning up temporary character...\n"
@@ -1887,7 +2249,7 @@ class GenerationHandler:
                         response_text=str(e)
                     )
 
-    async def _handle_remix(self, remix_target_id: str, prompt: str, model_config: Dict) -> AsyncGenerator[str, None]:
+    async def _handle_remix(self, remix_target_id: str, prompt: str, model_config: Dict) -> AsyncGenerator[bytes, None]:
         """Handle remix video generation
 
         Flow:
@@ -1946,7 +2308,8 @@ class GenerationHandler:
             await self.token_manager.record_usage(token_obj.id, is_video=True)
 
             # Poll for results
-            async for chunk in self._poll_task_result(task_id, token_obj.token, True, True, clean_prompt, token_obj.id):
+            async for chunk in self._poll_task_result(task_id, token_obj.token, True, True, clean_prompt, token_obj.id,
+                                                      model_config=model_config):
                 yield chunk
 
             # Record success
@@ -2052,14 +2415,7 @@ class GenerationHandler:
                     response_text=error_msg
                 )
 
-                # Check if it's a TLS/connection error
-                is_tls_error = "TLS" in error_msg or "curl" in error_msg or "OPENSSL" in error_msg
-
-                if is_tls_error:
-                    # For TLS errors, use exponential backoff
-                    backoff_time = min(poll_interval * (2 ** (consecutive_errors - 1)), 30)
-                    debug_logger.log_info(f"TLS error detected, using exponential backoff: {backoff_time}s")
-                    await asyncio.sleep(backoff_time)
+                # TLS/connection errors were already retried with backoff by the GET retry policy
 
                 # Fail if too many consecutive errors
                 if consecutive_errors >= max_consecutive_errors:
@@ -0,0 +1,194 @@
+"""Background job execution module"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, Dict, List, Optional
+from uuid import uuid4
+from ..core.config import config
+from ..core.database import Database
+from ..core.logger import debug_logger
+from ..core.serialization import SSE_DONE, format_event, loads as json_loads
+
+# Errors raised before anything was submitted upstream because no token had capacity
+CAPACITY_ERRORS = ("No available", "Failed to acquire")
+
+
+@dataclass
+class Job:
+    """A queued job API submission"""
+    job_id: str
+    model: str
+    prompt: str
+    image: Optional[str] = None
+    video: Optional[str] = None
+    remix_target_id: Optional[str] = None
+    submitted_at: float = field(default_factory=time.time)
+
+
+class ChunkBroadcast:
+    """Replayable fan-out of one job's SSE chunks to any number of event subscribers"""
+
+    def __init__(self):
+        self.history: List[bytes] = []
+        self.subscribers: List[asyncio.Queue] = []
+
+    def publish(self, chunk: bytes):
+        """Record a chunk and hand it to every live subscriber"""
+        self.history.append(chunk)
+        for queue in self.subscribers:
+            queue.put_nowait(chunk)
+
+    def close(self):
+        """Signal the end of the stream to every live subscriber"""
+        for queue in self.subscribers:
+            queue.put_nowait(None)
+
+    async def subscribe(self) -> AsyncGenerator[bytes, None]:
+        """Replay chunks published so far, then follow the live stream until it closes"""
+        queue: asyncio.Queue = asyncio.Queue()
+        # No await between snapshot and registration, so no chunk is missed or duplicated
+        replay = list(self.history)
+        self.subscribers.append(queue)
+        try:
+            for chunk in replay:
+                yield chunk
+            while True:
+                chunk = await queue.get()
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            self.subscribers.remove(queue)
+
+
+class JobExecutor:
+    """Runs job API submissions through the generation pipeline on a fixed set of workers
+
+    Jobs are stored as queued rows in the tasks table and bound to the upstream task once
+    submitted, so their status is served from the database while workers only hold the queue.
+    """
+
+    def __init__(self, generation_handler, db: Database):
+        self.generation_handler = generation_handler
+        self.db = db
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._broadcasts: Dict[str, ChunkBroadcast] = {}  # job_id -> live stream of a running job
+        self._workers: List[asyncio.Task] = []
+
+    @staticmethod
+    def new_job_id() -> str:
+        """Generate a job ID"""
+        return f"job_{uuid4().hex}"
+
+    async def submit(self, model: str, prompt: str, image: Optional[str] = None,
+                     webhook_url: Optional[str] = None, video: Optional[str] = None,
+                     remix_target_id: Optional[str] = None, job_id: Optional[str] = None) -> str:
+        """Queue a generation job
+
+        Args:
+            job_id: ID reserved in advance (e.g. bound to an idempotency key), generated when omitted
+
+        Returns:
+            Job ID
+        """
+        job_id = job_id or self.new_job_id()
+        await self.db.create_job_task(job_id, model, prompt, webhook_url)
+        self._broadcasts[job_id] = ChunkBroadcast()
+        self._queue.put_nowait(Job(job_id=job_id, model=model, prompt=prompt, image=image,
+                                   video=video, remix_target_id=remix_target_id))
+        debug_logger.log_info(f"Job {job_id} queued (model={model}, queue size={self._queue.qsize()})")
+        return job_id
+
+    def get_broadcast(self, job_id: str) -> Optional[ChunkBroadcast]:
+        """Get the live chunk stream of a queued or running job"""
+        return self._broadcasts.get(job_id)
+
+    async def start(self):
+        """Start worker tasks"""
+        if self._workers:
+            return
+        for _ in range(config.job_max_workers):
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        """Stop worker tasks"""
+        for worker in self._workers:
+            worker.cancel()
+        for worker in self._workers:
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+        self._workers = []
+
+    async def _worker(self):
+        """Take jobs off the queue and run them to completion"""
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                debug_logger.log_error(
+                    error_message=f"Job worker error for {job.job_id}: {str(e)}",
+                    status_code=500,
+                    response_text=str(e)
+                )
+
+    async def _run(self, job: Job):
+        """Run one job through handle_generation, publishing its chunks"""
+        broadcast = self._broadcasts.setdefault(job.job_id, ChunkBroadcast())
+        try:
+            async for chunk in self.generation_handler.handle_generation(
+                model=job.model,
+                prompt=job.prompt,
+                image=job.image,
+                video=job.video,
+                remix_target_id=job.remix_target_id,
+                stream=True,
+                job_id=job.job_id
+            ):
+                broadcast.publish(chunk.encode() if isinstance(chunk, str) else chunk)
+        except Exception as e:
+            error_msg = str(e)
+            task = await self.db.get_task_by_job_id(job.job_id)
+            not_submitted = task is None or task.status == "queued"
+
+            # No token had capacity: wait for one instead of failing, until the queue timeout
+            if not_submitted and error_msg.startswith(CAPACITY_ERRORS) and \
+                    time.time() - job.submitted_at < config.job_queue_timeout:
+                asyncio.get_running_loop().call_later(config.job_retry_delay, self._queue.put_nowait, job)
+                return
+
+            if task and task.status not in ("completed", "failed", "cancelled"):
+                await self.db.update_task(task.task_id, "failed", task.progress, error_message=error_msg)
+                await self.generation_handler.notify_task_finished(task.task_id)
+
+            try:
+                error_response = json_loads(error_msg)
+            except Exception:
+                error_response = None
+            if not (isinstance(error_response, dict) and "error" in error_response):
+                error_response = {
+                    "error": {
+                        "message": error_msg,
+                        "type": "server_error",
+                        "param": None,
+                        "code": None
+                    }
+                }
+            broadcast.publish(format_event(error_response))
+            broadcast.publish(SSE_DONE)
+
+        # Finished one way or another, late subscribers are answered from the tasks table
+        broadcast.close()
+        self._broadcasts.pop(job.job_id, None)
+
+    def get_stats(self) -> dict:
+        """Get executor statistics"""
+        return {
+            "workers": len(self._workers),
+            "queued": self._queue.qsize(),
+            "running": len(self._broadcasts)
+        }
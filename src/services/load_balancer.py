@@ -1,6 +1,6 @@
 """Load balancing module"""
 import random
-from typing import Optional
+from typing import List, Optional
 from ..core.models import Token
 from ..core.config import config
 from .token_manager import TokenManager
@@ -29,16 +29,30 @@ class LoadBalancer:
         Returns:
             Selected token or None if no available tokens
         """
+        available_tokens = await self.get_available_tokens(for_image_generation, for_video_generation, require_pro)
+        if not available_tokens:
+            return None
+
+        # Random selection from available tokens
+        return random.choice(available_tokens)
+
+    async def get_available_tokens(self, for_image_generation: bool = False, for_video_generation: bool = False, require_pro: bool = False) -> List[Token]:
+        """
+        Get every token that could take a generation right now (same filters as select_token)
+
+        Returns:
+            List of available tokens, empty if none
+        """
         active_tokens = await self.token_manager.get_active_tokens()
 
         if not active_tokens:
-            return None
+            return []
 
         # Filter for Pro tokens if required
         if require_pro:
             pro_tokens = [token for token in active_tokens if token.plan_type == "chatgpt_pro"]
             if not pro_tokens:
-                return None
+                return []
             active_tokens = pro_tokens
 
         # If for video generation, filter out tokens with Sora2 quota exhausted and tokens without Sora2 support
@@ -68,7 +82,7 @@ class LoadBalancer:
                     available_tokens.append(token)
 
             if not available_tokens:
-                return None
+                return []
 
             active_tokens = available_tokens
 
@@ -86,11 +100,7 @@ class LoadBalancer:
                         continue
                     available_tokens.append(token)
 
-            if not available_tokens:
-                return None
-
-            # Random selection from available tokens
-            return random.choice(available_tokens)
+            return available_tokens
         else:
             # For video generation, check concurrency limit
             if for_video_generation and self.concurrency_manager:
@@ -98,9 +108,7 @@ class LoadBalancer:
                 for token in active_tokens:
                     if await self.concurrency_manager.can_use_video(token.id):
                         available_tokens.append(token)
-                if not available_tokens:
-                    return None
-                return random.choice(available_tokens)
+                return available_tokens
             else:
                 # For video generation without concurrency manager, no additional filtering
-                return random.choice(active_tokens)
+                return active_tokens
@@ -0,0 +1,230 @@
+"""Remote media fetching module"""
+import asyncio
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import urljoin
+from uuid import uuid4
+from curl_cffi.requests import AsyncSession
+from ..core.config import config
+from ..core.logger import debug_logger
+from ..core.url_guard import ensure_public_url, pinned_options
+from .media_spool import CHUNK_SIZE, MediaFile, MediaTooLargeError, get_spool_dir
+from .proxy_manager import ProxyManager
+
+# kind -> (default content type, default extension)
+MEDIA_KINDS = {
+    "image": ("image/png", ".png"),
+    "video": ("video/mp4", ".mp4")
+}
+
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+
+def sniff_media_type(head: bytes) -> Optional[Tuple[str, str]]:
+    """Detect the media type from the first bytes of a file
+
+    Returns:
+        (content type, extension), None when the format is not recognized
+    """
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png", ".png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg", ".jpg"
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif", ".gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp", ".webp"
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand in (b"heic", b"heix", b"mif1"):
+            return "image/heic", ".heic"
+        if brand == b"qt  ":
+            return "video/quicktime", ".mov"
+        return "video/mp4", ".mp4"
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "video/webm", ".webm"
+    return None
+
+
+def is_remote_url(value) -> bool:
+    """Check whether an input is an http(s) URL rather than inline data"""
+    return isinstance(value, str) and value.startswith(("http://", "https://"))
+
+
+class RemoteMediaFetcher:
+    """Streams http(s) image and video inputs to the spool directory
+
+    Keeps fetched files for a short time so the same URL in consecutive requests is fetched
+    once, and concurrent fetches of one URL share a single download. Each download uses its
+    own session pinned to the addresses checked for every hop, so a host cannot be rebound
+    to an internal address between the check and the connection. Downloads through a proxy
+    are resolved by the proxy and are not covered by the address check.
+
+    Every caller gets its own hard link to the cached file and removes it when done, so
+    evicting a cache entry never pulls a file from under an upload in progress.
+    """
+
+    def __init__(self, proxy_manager: ProxyManager):
+        self.proxy_manager = proxy_manager
+        self._cache: Dict[str, Tuple[float, MediaFile]] = {}  # url -> (expires_at, cached file)
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def close(self):
+        """Drop cached files"""
+        for _, media in self._cache.values():
+            media.remove()
+        self._cache.clear()
+
+    async def fetch(self, url: str, kind: str) -> MediaFile:
+        """Fetch a remote image or video
+
+        Args:
+            url: http(s) URL
+            kind: "image" or "video", selects the size limit
+
+        Returns:
+            Spooled file owned by the caller, who must remove() it when done
+        """
+        self._evict_expired()
+        entry = self._cache.get(url)
+        if entry is not None:
+            return self._link(entry[1])
+
+        # Shielded so one caller going away does not abort the download for the others
+        media = await asyncio.shield(self._start_download(url, kind))
+        try:
+            return self._link(media)
+        except FileNotFoundError:
+            # Evicted by a burst of other fetches before this caller resumed
+            return await self.fetch(url, kind)
+
+    def prefetch(self, url: str, kind: str):
+        """Start downloading in the background so a later fetch() finds it cached or in flight"""
+        self._evict_expired()
+        if url not in self._cache:
+            self._start_download(url, kind)
+
+    def _start_download(self, url: str, kind: str) -> asyncio.Task:
+        """Get the in-flight download of a URL, starting one if needed"""
+        task = self._inflight.get(url)
+        if task is None:
+            task = asyncio.create_task(self._download_to_cache(url, kind))
+            self._inflight[url] = task
+            task.add_done_callback(lambda t: self._on_download_done(url, t))
+        return task
+
+    def _on_download_done(self, url: str, task: asyncio.Task):
+        self._inflight.pop(url, None)
+        # Retrieve the error so an abandoned prefetch does not warn, fetch() callers re-raise it
+        if not task.cancelled() and task.exception():
+            debug_logger.log_info(f"Remote media download failed for {url}: {task.exception()}")
+
+    async def _download_to_cache(self, url: str, kind: str) -> MediaFile:
+        """Download a URL and keep it for remote_media.cache_ttl seconds"""
+        media = await self._download(url, kind)
+        self._cache[url] = (time.monotonic() + config.remote_media_cache_ttl, media)
+        self._evict_overflow()
+        return media
+
+    async def _download(self, url: str, kind: str) -> MediaFile:
+        """Stream one URL to the spool directory, enforcing the size limit of its kind
+
+        Redirects are followed by hand so every hop is checked to be a public http(s) URL and
+        connected to the addresses that were checked.
+        The file name is derived from the content hash and the sniffed type, never from the URL.
+        """
+        default_type, default_ext = MEDIA_KINDS[kind]
+        max_bytes = config.upload_max_video_size if kind == "video" else config.upload_max_image_size
+        proxy_url = await self.proxy_manager.get_proxy_url()
+        kwargs = {"timeout": config.remote_media_timeout, "stream": True, "allow_redirects": False}
+        if proxy_url:
+            kwargs["proxy"] = proxy_url
+
+        spool_dir = get_spool_dir()
+        spool_dir.mkdir(parents=True, exist_ok=True)
+        path = spool_dir / uuid4().hex
+
+        start_time = time.time()
+        session = AsyncSession(impersonate=config.impersonate_browser)
+        try:
+            current_url = url
+            for _ in range(MAX_REDIRECTS + 1):
+                # Hops run one after another, the session's options apply to the next request only
+                session.curl_options = pinned_options(await ensure_public_url(current_url))
+                response = await session.get(current_url, **kwargs)
+                location = response.headers.get("location")
+                if response.status_code not in REDIRECT_STATUSES or not location:
+                    break
+                await response.aclose()
+                current_url = urljoin(current_url, location)
+            else:
+                raise Exception(f"Too many redirects fetching {kind} from {url}")
+        except BaseException:
+            await session.close()
+            raise
+
+        head = b""
+        try:
+            if response.status_code != 200:
+                raise Exception(f"Failed to download {kind} from {url}: HTTP {response.status_code}")
+            content_length = response.headers.get("content-length")
+            if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+                raise MediaTooLargeError(f"Remote {kind} exceeds the {max_bytes // (1024 * 1024)} MB limit")
+
+            digest = hashlib.sha256()
+            size = 0
+            with open(path, "wb") as f:
+                async for chunk in response.aiter_content(chunk_size=CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise MediaTooLargeError(f"Remote {kind} exceeds the {max_bytes // (1024 * 1024)} MB limit")
+                    if len(head) < 16:
+                        head += chunk[:16 - len(head)]
+                    digest.update(chunk)
+                    await asyncio.to_thread(f.write, chunk)
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+        finally:
+            await response.aclose()
+            await session.close()
+
+        sniffed = sniff_media_type(head)
+        if sniffed:
+            content_type, ext = sniffed
+        else:
+            header_type = response.headers.get("content-type", "").split(";", 1)[0].strip()
+            content_type = header_type if header_type.startswith(kind + "/") else default_type
+            ext = default_ext
+        sha256 = digest.hexdigest()
+        debug_logger.log_info(f"Fetched remote {kind} {url} ({size} bytes in {time.time() - start_time:.2f}s)")
+        return MediaFile(
+            path=str(path),
+            filename=f"{sha256[:16]}{ext}",
+            content_type=content_type,
+            size=size,
+            sha256=sha256
+        )
+
+    def _link(self, media: MediaFile) -> MediaFile:
+        """Give a caller its own link to a cached file"""
+        link_path = str(Path(media.path).with_name(uuid4().hex))
+        os.link(media.path, link_path)
+        return MediaFile(path=link_path, filename=media.filename, content_type=media.content_type,
+                         size=media.size, sha256=media.sha256)
+
+    def _evict_expired(self):
+        """Drop cached files past their TTL"""
+        now = time.monotonic()
+        for url in [url for url, (expires_at, _) in self._cache.items() if expires_at <= now]:
+            self._cache.pop(url)[1].remove()
+
+    def _evict_overflow(self):
+        """Drop the entries closest to expiry beyond the cache size"""
+        while len(self._cache) > config.remote_media_cache_size:
+            oldest = min(self._cache, key=lambda url: self._cache[url][0])
+            self._cache.pop(oldest)[1].remove()
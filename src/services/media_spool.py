@@ -0,0 +1,238 @@
+"""Disk spooling of uploaded media"""
+import asyncio
+import hashlib
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from uuid import uuid4
+from python_multipart.multipart import MultipartParser, parse_options_header
+from ..core.config import config
+from ..core.logger import debug_logger
+
+CHUNK_SIZE = 1024 * 1024
+
+# Mounted at /tmp without authentication (file cache), client media must never be written there
+SERVED_DIRS = (Path(__file__).resolve().parents[2] / "tmp", Path("tmp").resolve())
+
+# Names given to spooled files: uuid4 hex, optionally followed by the upload's extension
+SPOOL_NAME = re.compile(r"^[0-9a-f]{32}(\.[0-9a-z]+)?$")
+
+
+class MediaTooLargeError(Exception):
+    """Uploaded file exceeds its size limit"""
+
+
+@dataclass
+class MediaFile:
+    """Uploaded media spooled to disk, passed to CurlMime by path instead of as bytes"""
+    path: str
+    filename: str
+    content_type: str
+    size: int
+    sha256: str
+
+    def remove(self):
+        """Delete the spooled file"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def get_spool_dir() -> Path:
+    """Resolve the configured spool directory
+
+    Raises:
+        ValueError: The directory is, or is inside, a publicly served directory
+    """
+    spool_dir = Path(config.upload_spool_dir).resolve()
+    for served_dir in SERVED_DIRS:
+        if spool_dir == served_dir or served_dir in spool_dir.parents:
+            raise ValueError(f"uploads.spool_dir {spool_dir} is inside the publicly served directory {served_dir}")
+    return spool_dir
+
+
+class MultipartError(Exception):
+    """Malformed or unexpected multipart/form-data body"""
+
+
+@dataclass
+class FileField:
+    """Limits of one file field accepted in a multipart body"""
+    max_bytes: int
+    default_content_type: str
+
+
+class _SpoolingPart:
+    """File part being written to the spool directory"""
+
+    def __init__(self, name: str, filename: str, content_type: str, limits: FileField):
+        self.name = name
+        self.filename = filename
+        self.content_type = content_type
+        self.limits = limits
+        self.path = get_spool_dir() / f"{uuid4().hex}{Path(filename).suffix.lower()}"
+        self.file = open(self.path, "wb")
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+
+async def spool_multipart(request, file_fields: Dict[str, FileField], max_body: int,
+                          max_fields: int = 16, max_field_size: int = 1024 * 1024) -> Tuple[Dict[str, str], Dict[str, MediaFile]]:
+    """Parse a multipart/form-data request straight from the body stream
+
+    File parts are hashed and written to the spool directory as their bytes arrive, so no
+    part of the body is buffered in memory or on disk twice. Sizes are counted while
+    streaming: the body and each file are cut off as soon as they exceed their limit,
+    whether or not the client sent a Content-Length.
+
+    Args:
+        request: Starlette request
+        file_fields: Accepted file field names and their limits, other file parts are rejected
+        max_body: Limit of the whole body in bytes
+        max_fields: Maximum number of text fields
+        max_field_size: Limit of one text field in bytes
+
+    Returns:
+        (text fields, spooled files by field name); the caller owns the files and must remove them
+
+    Raises:
+        MediaTooLargeError: A limit was exceeded
+        MultipartError: The body is not valid multipart/form-data or has unexpected parts
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or not params.get(b"boundary"):
+        raise MultipartError("Content-Type must be multipart/form-data with a boundary")
+
+    events: List[Tuple[str, bytes]] = []
+
+    def on_data(event: str):
+        return lambda data, start, end: events.append((event, bytes(data[start:end])))
+
+    def on_event(event: str):
+        return lambda: events.append((event, b""))
+
+    parser = MultipartParser(params[b"boundary"], callbacks={
+        "on_part_begin": on_event("part_begin"),
+        "on_part_data": on_data("part_data"),
+        "on_part_end": on_event("part_end"),
+        "on_header_field": on_data("header_field"),
+        "on_header_value": on_data("header_value"),
+        "on_header_end": on_event("header_end"),
+        "on_headers_finished": on_event("headers_finished")
+    })
+
+    get_spool_dir().mkdir(parents=True, exist_ok=True)
+    fields: Dict[str, str] = {}
+    files: Dict[str, MediaFile] = {}
+    headers: Dict[bytes, bytes] = {}
+    header_field = header_value = b""
+    field_name: Optional[str] = None
+    field_value = bytearray()
+    part: Optional[_SpoolingPart] = None
+    in_part = False
+    received = 0
+
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_body:
+                raise MediaTooLargeError("Request body too large")
+            try:
+                parser.write(chunk)
+            except Exception as e:
+                raise MultipartError(f"Malformed multipart body: {e}")
+
+            for event, data in events:
+                if event == "part_begin":
+                    headers, field_name, field_value, part = {}, None, bytearray(), None
+                    in_part = True
+                elif event == "header_field":
+                    header_field += data
+                elif event == "header_value":
+                    header_value += data
+                elif event == "header_end":
+                    headers[header_field.lower()] = header_value
+                    header_field = header_value = b""
+                elif event == "headers_finished":
+                    _, disposition = parse_options_header(headers.get(b"content-disposition", b""))
+                    name = disposition.get(b"name", b"").decode("utf-8", "replace")
+                    if not name:
+                        raise MultipartError("Form part without a name")
+                    if b"filename" in disposition:
+                        if name not in file_fields or name in files:
+                            raise MultipartError(f"Unexpected file field: {name}")
+                        filename = os.path.basename(disposition[b"filename"].decode("utf-8", "replace")) or "upload"
+                        part_type = headers.get(b"content-type", b"").decode("latin-1").strip()
+                        part = _SpoolingPart(name, filename, part_type or file_fields[name].default_content_type,
+                                             file_fields[name])
+                    else:
+                        if len(fields) >= max_fields:
+                            raise MultipartError(f"Too many form fields, at most {max_fields} allowed")
+                        field_name = name
+                elif event == "part_data":
+                    if part is not None:
+                        part.size += len(data)
+                        if part.size > part.limits.max_bytes:
+                            raise MediaTooLargeError(
+                                f"{part.filename} exceeds the {part.limits.max_bytes // (1024 * 1024)} MB upload limit"
+                            )
+                        part.digest.update(data)
+                        await asyncio.to_thread(part.file.write, data)
+                    else:
+                        field_value += data
+                        if len(field_value) > max_field_size:
+                            raise MediaTooLargeError(f"Form field {field_name} is too large")
+                elif event == "part_end":
+                    in_part = False
+                    if part is not None:
+                        part.file.close()
+                        files[part.name] = MediaFile(
+                            path=str(part.path),
+                            filename=part.filename,
+                            content_type=part.content_type,
+                            size=part.size,
+                            sha256=part.digest.hexdigest()
+                        )
+                        part = None
+                    elif field_name is not None:
+                        fields[field_name] = field_value.decode("utf-8", "replace")
+                        field_name = None
+            events.clear()
+
+        parser.finalize()
+        if in_part:
+            raise MultipartError("Multipart body ended in the middle of a part")
+    except BaseException:
+        # Nothing spooled by a rejected request may stay behind
+        if part is not None:
+            part.file.close()
+            part.path.unlink(missing_ok=True)
+        for media in files.values():
+            media.remove()
+        raise
+
+    return fields, files
+
+
+def clear_spool_dir():
+    """Remove files left in the spool directory by a previous process
+
+    Only files named like spooled files are removed, the directory itself and anything else
+    in it are left alone.
+
+    Raises:
+        ValueError: The spool directory is inside a publicly served directory
+    """
+    spool_dir = get_spool_dir()
+    if not spool_dir.is_dir():
+        return
+    removed = 0
+    for path in spool_dir.iterdir():
+        if SPOOL_NAME.match(path.name) and path.is_file():
+            path.unlink(missing_ok=True)
+            removed += 1
+    if removed:
+        debug_logger.log_info(f"Removed {removed} files left in upload spool directory {spool_dir}")
@@ -0,0 +1,124 @@
+"""Adaptive poll scheduling module"""
+import statistics
+import time
+from typing import Dict, List, Optional, Tuple
+from ..core.config import config
+from ..core.logger import debug_logger
+
+# Prior generation time per second of output video, before any history is available
+VIDEO_SECONDS_PER_CLIP_SECOND = 18.0
+# Multipliers on the prior for slower upstream models / sizes
+MODEL_FACTORS = {"sy_8": 1.0, "sy_ore": 1.5}
+SIZE_FACTORS = {"small": 1.0, "large": 2.0}
+# Prior for image generation in seconds
+IMAGE_PRIOR_DURATION = 25.0
+
+# Poll once this fraction of the estimated remaining time has passed
+REMAINING_FRACTION = 0.25
+# Successful runs needed before history replaces the prior
+MIN_HISTORY_SAMPLES = 3
+# Seconds to keep a per-model history estimate
+HISTORY_CACHE_TTL = 300
+
+
+class PollState:
+    """Progress observations of one task, used to place its next poll"""
+
+    def __init__(self, expected_duration: float, started_at: Optional[float] = None):
+        self.expected_duration = expected_duration
+        self.started_at = started_at or time.time()
+        self.samples: List[Tuple[float, float]] = []  # [(timestamp, progress 0-1)] with progress > 0
+        self.next_poll_at = self.started_at
+
+    def observe(self, progress: Optional[float], now: float):
+        """Record progress_pct reported upstream"""
+        if progress is None or progress <= 0:
+            return
+        if self.samples and progress <= self.samples[-1][1]:
+            return
+        self.samples.append((now, min(progress, 1.0)))
+
+    def estimated_finish(self) -> float:
+        """Estimate completion timestamp from the progress slope, falling back to the expected duration"""
+        if len(self.samples) >= 2:
+            (t0, p0), (t1, p1) = self.samples[0], self.samples[-1]
+            if t1 > t0:
+                rate = (p1 - p0) / (t1 - t0)
+                return t1 + (1.0 - p1) / rate
+        if self.samples:
+            # One sample: assume constant rate since submission (includes queue time, so errs late)
+            t1, p1 = self.samples[-1]
+            if t1 > self.started_at:
+                return t1 + (1.0 - p1) * (t1 - self.started_at) / p1
+        return self.started_at + self.expected_duration
+
+
+class AdaptivePollScheduler:
+    """Space polls by estimated time to completion
+
+    Polls are sparse while the task is far from its expected finish and tighten to
+    poll_min_interval as it approaches, so upstream QPS drops without delaying completion.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._history: Dict[str, Tuple[Optional[float], float]] = {}  # model -> (median duration, fetched_at)
+
+    async def create_state(self, model: Optional[str], model_config: Optional[dict]) -> PollState:
+        """Build the poll state for a newly submitted task"""
+        expected = self._prior_duration(model_config or {})
+        if model:
+            historical = await self._historical_duration(model)
+            if historical:
+                expected = historical
+        state = PollState(expected)
+        state.next_poll_at = state.started_at + self._interval(state, state.started_at)
+        return state
+
+    def schedule(self, state: PollState, now: float) -> float:
+        """Set and return the next poll timestamp for a task after a poll"""
+        state.next_poll_at = now + self._interval(state, now)
+        return state.next_poll_at
+
+    def _interval(self, state: PollState, now: float) -> float:
+        """Seconds until the next poll"""
+        if not config.poll_adaptive_enabled:
+            return config.poll_interval
+        min_interval = config.poll_min_interval
+        max_interval = max(config.poll_max_interval, min_interval)
+        remaining = state.estimated_finish() - now
+        if remaining <= 0:
+            # Overdue, check as often as allowed
+            return min_interval
+        return min(max(remaining * REMAINING_FRACTION, min_interval), max_interval)
+
+    @staticmethod
+    def _prior_duration(model_config: dict) -> float:
+        """Expected duration from the model configuration alone"""
+        if model_config.get("type") != "video":
+            return IMAGE_PRIOR_DURATION
+        clip_seconds = model_config.get("n_frames", 300) / 30
+        return (clip_seconds * VIDEO_SECONDS_PER_CLIP_SECOND
+                * MODEL_FACTORS.get(model_config.get("model", "sy_8"), 1.0)
+                * SIZE_FACTORS.get(model_config.get("size", "small"), 1.0))
+
+    async def _historical_duration(self, model: str) -> Optional[float]:
+        """Median duration of recent successful runs of the model, cached"""
+        cached = self._history.get(model)
+        now = time.time()
+        if cached and now - cached[1] < HISTORY_CACHE_TTL:
+            return cached[0]
+
+        median = None
+        try:
+            durations = await self.db.get_recent_generation_durations(model)
+            if len(durations) >= MIN_HISTORY_SAMPLES:
+                median = statistics.median(durations)
+        except Exception as e:
+            debug_logger.log_error(
+                error_message=f"Failed to load generation history for {model}: {str(e)}",
+                status_code=0,
+                response_text=str(e)
+            )
+        self._history[model] = (median, now)
+        return median
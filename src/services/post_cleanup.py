@@ -0,0 +1,115 @@
+"""Published post cleanup module"""
+import asyncio
+import random
+import time
+from ..core.config import config
+from ..core.database import Database
+from ..core.logger import debug_logger
+from .sora_client import SoraClient
+
+
+class PostCleanupQueue:
+    """Deletes posts published for watermark-free mode from a durable queue
+
+    Posts are recorded in the database when their video has been delivered and deleted by a
+    background loop, so the client is not kept waiting on the delete and failed or interrupted
+    deletes are retried with exponential backoff, also after a restart.
+    """
+
+    def __init__(self, db: Database, sora_client: SoraClient):
+        self.db = db
+        self.sora_client = sora_client
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    async def enqueue(self, post_id: str, token_id: int, delay: float = 0.0) -> int:
+        """Queue a published post for deletion
+
+        Args:
+            post_id: Published post ID
+            token_id: Token that published the post, deletes must use the same account
+            delay: Seconds to keep the post before deleting it
+
+        Returns:
+            Queue entry ID
+        """
+        entry_id = await self.db.enqueue_post_cleanup(post_id, token_id, time.time() + delay)
+        self._wakeup.set()
+        return entry_id
+
+    async def start(self):
+        """Start the cleanup loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the cleanup loop, pending deletes stay queued"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        """Delete due posts, then sleep until the next one is due or a new one is queued"""
+        while True:
+            try:
+                due = await self.db.get_due_post_cleanups()
+                if due:
+                    await asyncio.gather(*(self._delete(entry) for entry in due))
+                    continue
+
+                next_due = await self.db.get_next_post_cleanup_due_at()
+                timeout = config.post_cleanup_idle_interval if next_due is None else \
+                    max(0.0, min(next_due - time.time(), config.post_cleanup_idle_interval))
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                debug_logger.log_error(
+                    error_message=f"Post cleanup error: {str(e)}",
+                    status_code=0,
+                    response_text=""
+                )
+                await asyncio.sleep(config.post_cleanup_idle_interval)
+
+    async def _delete(self, entry: dict):
+        """Delete one post with the token that published it"""
+        attempts = entry["attempts"] + 1
+        try:
+            token_obj = await self.db.get_token(entry["token_id"])
+            if not token_obj:
+                # No account left to delete with, retrying cannot help
+                await self.db.reschedule_post_cleanup(entry["id"], attempts, None, "Token not found")
+                return
+            await self.sora_client.delete_post(entry["post_id"], token_obj.token)
+            await self.db.mark_post_deleted(entry["id"], attempts)
+            debug_logger.log_info(f"Published post deleted: {entry['post_id']} (attempt {attempts})")
+            return
+        except Exception as e:
+            error = str(e)[:500]
+
+        if attempts >= config.post_cleanup_max_attempts:
+            await self.db.reschedule_post_cleanup(entry["id"], attempts, None, error)
+            debug_logger.log_error(
+                error_message=f"Failed to delete published post {entry['post_id']} after {attempts} attempts: {error}",
+                status_code=0,
+                response_text=error
+            )
+            return
+
+        # Exponential backoff with full jitter on the upper half
+        backoff = min(config.post_cleanup_max_backoff, config.post_cleanup_base_backoff * (2 ** (attempts - 1)))
+        next_attempt_at = time.time() + random.uniform(backoff / 2, backoff)
+        await self.db.reschedule_post_cleanup(entry["id"], attempts, next_attempt_at, error)
+        debug_logger.log_info(f"Delete of post {entry['post_id']} failed ({error}), retry {attempts + 1} in {backoff:.0f}s")
+
+    async def get_stats(self) -> dict:
+        """Get queue statistics"""
+        return await self.db.get_post_cleanup_stats()
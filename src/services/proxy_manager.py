@@ -1,20 +1,92 @@
 """Proxy management module"""
-from typing import Optional
+import asyncio
+import time
+from typing import Dict, List, Optional
+from curl_cffi.requests import AsyncSession
+from ..core.config import config
 from ..core.database import Database
 from ..core.models import ProxyConfig
+from ..core.logger import debug_logger
+
+# Sentinel for "token proxy override not loaded yet"
+_UNSET = object()
+
+
+class ProxyHealth:
+    """Health state of one proxy pool member"""
+
+    def __init__(self, entry_id: int, proxy_url: str):
+        self.entry_id = entry_id
+        self.proxy_url = proxy_url
+        self.ewma_latency: Optional[float] = None  # seconds
+        self.ewma_error = 0.0  # 0-1
+        self.consecutive_failures = 0
+        self.consecutive_successes = 0
+        self.ejected = False
+        self.last_checked_at: Optional[float] = None
+
+    def record(self, success: bool, latency: Optional[float] = None):
+        """Fold one request or probe outcome into the EWMA and ejection state"""
+        alpha = config.proxy_pool_ewma_alpha
+        self.last_checked_at = time.time()
+        self.ewma_error = alpha * (0.0 if success else 1.0) + (1 - alpha) * self.ewma_error
+
+        if success:
+            if latency is not None:
+                self.ewma_latency = latency if self.ewma_latency is None else \
+                    alpha * latency + (1 - alpha) * self.ewma_latency
+            self.consecutive_failures = 0
+            self.consecutive_successes += 1
+            if self.ejected and self.consecutive_successes >= config.proxy_pool_readmit_successes:
+                self.ejected = False
+                debug_logger.log_info(f"Proxy re-admitted to pool: {self.proxy_url}")
+        else:
+            self.consecutive_successes = 0
+            self.consecutive_failures += 1
+            if not self.ejected and self.consecutive_failures >= config.proxy_pool_eject_failures:
+                self.ejected = True
+                debug_logger.log_info(f"Proxy ejected from pool after {self.consecutive_failures} failures: {self.proxy_url}")
+
+    def score(self) -> float:
+        """Lower is better: latency inflated by recent error rate, unknown latency sorts last"""
+        latency = self.ewma_latency if self.ewma_latency is not None else float(config.proxy_pool_probe_timeout)
+        return latency * (1 + 4 * self.ewma_error)
+
+    def to_dict(self) -> dict:
+        """Get health summary"""
+        return {
+            "id": self.entry_id,
+            "proxy_url": self.proxy_url,
+            "healthy": not self.ejected,
+            "ewma_latency_ms": round(self.ewma_latency * 1000, 1) if self.ewma_latency is not None else None,
+            "error_rate": round(self.ewma_error, 3),
+            "consecutive_failures": self.consecutive_failures,
+            "last_checked_at": self.last_checked_at
+        }
+
 
 class ProxyManager:
-    """Proxy configuration manager"""
+    """Proxy configuration manager
+
+    Resolution order: explicit proxy_url > token-specific proxy > proxy pool > global proxy.
+    Global config, token overrides and token->pool assignments are held in memory.
+    """
 
     def __init__(self, db: Database):
         self.db = db
+        self._global_config: Optional[ProxyConfig] = None
+        self._token_proxies: Dict[int, Optional[str]] = {}  # token_id -> token.proxy_url
+        self._pool: Dict[str, ProxyHealth] = {}  # proxy_url -> health
+        self._sticky: Dict[int, str] = {}  # token_id -> assigned pool proxy
+        self._pool_loaded = False
+        self._probe_task = None
 
     async def get_proxy_url(self, token_id: Optional[int] = None, proxy_url: Optional[str] = None) -> Optional[str]:
-        """Get proxy URL for a token, with fallback to global proxy
+        """Get proxy URL for a token, with fallback to pool and global proxy
 
         Args:
             token_id: Token ID (optional). If provided, returns token-specific proxy if set,
-                     otherwise falls back to global proxy.
+                     otherwise a pool proxy (sticky per token when configured).
             proxy_url: Direct proxy URL (optional). If provided, returns this proxy URL directly.
 
         Returns:
@@ -26,20 +98,141 @@ class ProxyManager:
 
         # If token_id is provided, try to get token-specific proxy first
         if token_id is not None:
-            token = await self.db.get_token(token_id)
-            if token and token.proxy_url:
-                return token.proxy_url
+            token_proxy = self._token_proxies.get(token_id, _UNSET)
+            if token_proxy is _UNSET:
+                token = await self.db.get_token(token_id)
+                token_proxy = token.proxy_url if token and token.proxy_url else None
+                self._token_proxies[token_id] = token_proxy
+            if token_proxy:
+                return token_proxy
+
+        # Then the proxy pool
+        if not self._pool_loaded:
+            await self.reload_pool()
+        pooled = self._select_pool_proxy(token_id)
+        if pooled:
+            return pooled
 
         # Fall back to global proxy
-        config = await self.db.get_proxy_config()
-        if config.proxy_enabled and config.proxy_url:
-            return config.proxy_url
+        global_config = await self.get_proxy_config()
+        if global_config.proxy_enabled and global_config.proxy_url:
+            return global_config.proxy_url
         return None
 
+    def _select_pool_proxy(self, token_id: Optional[int]) -> Optional[str]:
+        """Pick a pool member according to the configured policy"""
+        if not self._pool:
+            return None
+
+        healthy = [health for health in self._pool.values() if not health.ejected]
+        if not healthy:
+            # Every egress is failing; keep using the least bad one rather than going direct
+            return min(self._pool.values(), key=lambda h: h.consecutive_failures).proxy_url
+
+        if config.proxy_pool_policy == "sticky" and token_id is not None:
+            assigned = self._sticky.get(token_id)
+            if assigned in self._pool and not self._pool[assigned].ejected:
+                return assigned
+            # Assign to the fastest member with the fewest tokens already pinned to it
+            pinned: Dict[str, int] = {}
+            for url in self._sticky.values():
+                pinned[url] = pinned.get(url, 0) + 1
+            chosen = min(healthy, key=lambda h: (pinned.get(h.proxy_url, 0), h.score())).proxy_url
+            self._sticky[token_id] = chosen
+            return chosen
+
+        return min(healthy, key=lambda h: h.score()).proxy_url
+
+    def report_result(self, proxy_url: Optional[str], success: bool, latency: Optional[float] = None):
+        """Record the outcome of a real request made through a proxy
+
+        Args:
+            proxy_url: Proxy the request went through, ignored if not a pool member
+            success: False for transport failures (connect/timeout), not for upstream HTTP errors
+            latency: Request duration in seconds
+        """
+        health = self._pool.get(proxy_url) if proxy_url else None
+        if health:
+            health.record(success, latency)
+
+    async def reload_pool(self):
+        """Load pool members from the database, keeping health of existing members"""
+        entries = await self.db.get_proxy_pool()
+        pool = {}
+        for entry in entries:
+            if not entry.enabled:
+                continue
+            pool[entry.proxy_url] = self._pool.get(entry.proxy_url) or ProxyHealth(entry.id, entry.proxy_url)
+        self._pool = pool
+        self._sticky = {token_id: url for token_id, url in self._sticky.items() if url in pool}
+        self._pool_loaded = True
+
+    def invalidate_token(self, token_id: int):
+        """Forget cached proxy settings of a token after it was updated or deleted"""
+        self._token_proxies.pop(token_id, None)
+        self._sticky.pop(token_id, None)
+
+    async def start(self):
+        """Load the pool and start background health probes"""
+        await self.reload_pool()
+        if self._probe_task is None:
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    async def stop(self):
+        """Stop background health probes"""
+        if self._probe_task:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+
+    async def _probe_loop(self):
+        """Probe every pool member periodically, ejected members included so they can be re-admitted"""
+        while True:
+            try:
+                members = list(self._pool.values())
+                if members:
+                    await asyncio.gather(*(self._probe(health) for health in members))
+                await asyncio.sleep(config.proxy_pool_probe_interval)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                debug_logger.log_error(
+                    error_message=f"Proxy pool probe loop error: {str(e)}",
+                    status_code=0,
+                    response_text=""
+                )
+                await asyncio.sleep(config.proxy_pool_probe_interval)
+
+    async def _probe(self, health: ProxyHealth):
+        """Time one request through a proxy; any HTTP response counts as a working egress"""
+        start_time = time.time()
+        try:
+            async with AsyncSession() as session:
+                await session.get(
+                    config.proxy_pool_probe_url,
+                    proxy=health.proxy_url,
+                    timeout=config.proxy_pool_probe_timeout,
+                    impersonate=config.impersonate_browser
+                )
+            health.record(True, time.time() - start_time)
+        except Exception as e:
+            health.record(False)
+            debug_logger.log_info(f"Proxy probe failed for {health.proxy_url}: {str(e)}")
+
+    def get_pool_status(self) -> List[dict]:
+        """Get health of every pool member"""
+        return [health.to_dict() for health in self._pool.values()]
+
     async def update_proxy_config(self, enabled: bool, proxy_url: Optional[str]):
         """Update proxy configuration"""
         await self.db.update_proxy_config(enabled, proxy_url)
+        self._global_config = None
 
     async def get_proxy_config(self) -> ProxyConfig:
         """Get proxy configuration"""
-        return await self.db.get_proxy_config()
+        if self._global_config is None:
+            self._global_config = await self.db.get_proxy_config()
+        return self._global_config
@@ -0,0 +1,136 @@
+"""Upstream rate limiting module"""
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+from ..core.config import config
+from ..core.logger import debug_logger
+
+# Request priorities, lower value goes first
+PRIORITY_HIGH = 0  # Submissions, uploads, completion lookups
+PRIORITY_NORMAL = 1  # Everything else (sentinel, account calls)
+PRIORITY_POLL = 2  # Routine progress polls, also limited by the global poll cap
+
+# Share of each bucket's burst that only higher priorities may use
+PRIORITY_RESERVE = {PRIORITY_HIGH: 0.0, PRIORITY_NORMAL: 0.2}
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `rate` tokens per second"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, reserve: float, now: float) -> float:
+        """Seconds until one token can be taken while leaving `reserve` tokens in the bucket"""
+        self._refill(now)
+        needed = 1 + reserve - self.tokens
+        if needed <= 0:
+            return 0.0
+        return needed / self.rate if self.rate > 0 else float("inf")
+
+    def take(self):
+        """Consume one token (call only after wait_time returned 0)"""
+        self.tokens -= 1
+
+    def drain(self, seconds: float):
+        """Empty the bucket and push refill back, used after upstream signalled overload"""
+        self._refill(time.monotonic())
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+class RateLimiter:
+    """Token buckets per access token and per egress proxy, plus a global poll cap
+
+    Lower priorities keep a reserve in each bucket free for higher ones, so submissions and
+    completion lookups are not starved by routine polls when a bucket runs low.
+    """
+
+    def __init__(self):
+        self._token_buckets: Dict[str, TokenBucket] = {}
+        self._egress_buckets: Dict[Optional[str], TokenBucket] = {}
+        self._poll_bucket: Optional[TokenBucket] = None
+        self._throttled: Dict[int, int] = {}  # priority -> times a caller had to wait
+
+    def _buckets(self, token: Optional[str], proxy_url: Optional[str], priority: int) -> Tuple[TokenBucket, ...]:
+        """Buckets a request must pass, created on first use"""
+        buckets = []
+        if token:
+            bucket = self._token_buckets.get(token)
+            if bucket is None:
+                bucket = TokenBucket(config.rate_limit_token_rate, config.rate_limit_token_burst)
+                self._token_buckets[token] = bucket
+            buckets.append(bucket)
+
+        bucket = self._egress_buckets.get(proxy_url)
+        if bucket is None:
+            bucket = TokenBucket(config.rate_limit_egress_rate, config.rate_limit_egress_burst)
+            self._egress_buckets[proxy_url] = bucket
+        buckets.append(bucket)
+
+        if priority == PRIORITY_POLL:
+            if self._poll_bucket is None:
+                qps = config.rate_limit_poll_qps
+                self._poll_bucket = TokenBucket(qps, max(qps, 1.0))
+            buckets.append(self._poll_bucket)
+        return tuple(buckets)
+
+    async def acquire(self, token: Optional[str], proxy_url: Optional[str], priority: int = PRIORITY_NORMAL):
+        """Wait until the request may be sent
+
+        Args:
+            token: Access token the request is made with
+            proxy_url: Egress proxy the request goes through (None for direct)
+            priority: PRIORITY_HIGH / PRIORITY_NORMAL / PRIORITY_POLL
+        """
+        if not config.rate_limit_enabled:
+            return
+
+        buckets = self._buckets(token, proxy_url, priority)
+        reserve_share = PRIORITY_RESERVE.get(priority, config.rate_limit_poll_reserve)
+        waited = False
+        while True:
+            now = time.monotonic()
+            # The global poll cap is never reserved, it only ever sees polls
+            wait = max(
+                bucket.wait_time(0.0 if bucket is self._poll_bucket else bucket.capacity * reserve_share, now)
+                for bucket in buckets
+            )
+            if wait <= 0:
+                # No await between check and take, so this is atomic on the event loop
+                for bucket in buckets:
+                    bucket.take()
+                return
+            if not waited:
+                waited = True
+                self._throttled[priority] = self._throttled.get(priority, 0) + 1
+            await asyncio.sleep(wait)
+
+    def penalize(self, token: Optional[str], proxy_url: Optional[str]):
+        """Back off a token and its egress after upstream returned 429"""
+        if not config.rate_limit_enabled:
+            return
+        backoff = config.rate_limit_429_backoff
+        if token and token in self._token_buckets:
+            self._token_buckets[token].drain(backoff)
+        if proxy_url in self._egress_buckets:
+            self._egress_buckets[proxy_url].drain(backoff)
+        debug_logger.log_info(f"Rate limiter backing off {backoff}s for egress {proxy_url or 'direct'} after 429")
+
+    def get_stats(self) -> dict:
+        """Get limiter statistics"""
+        return {
+            "tokens": len(self._token_buckets),
+            "egresses": len(self._egress_buckets),
+            "throttled": {
+                "high": self._throttled.get(PRIORITY_HIGH, 0),
+                "normal": self._throttled.get(PRIORITY_NORMAL, 0),
+                "poll": self._throttled.get(PRIORITY_POLL, 0)
+            }
+        }
@@ -0,0 +1,205 @@
+"""Retry policy module"""
+import asyncio
+import random
+import re
+import time
+from typing import Any, Awaitable, Callable, Iterable, Optional, TypeVar
+from ..core.config import config
+from ..core.logger import debug_logger
+
+T = TypeVar("T")
+
+# Error classes
+ERROR_NETWORK = "network"  # Connect/TLS/reset/incomplete read, request likely never processed
+ERROR_TIMEOUT = "timeout"
+ERROR_SERVER = "server"  # 500/502/503/504 from upstream
+ERROR_RATE_LIMITED = "rate_limited"  # 429, handled by the rate limiter instead of retries
+ERROR_FATAL = "fatal"  # Everything else (4xx, business errors), never retried
+
+RETRYABLE_STATUS = {500, 502, 503, 504}
+
+# curl error codes: 6/7 resolve/connect, 35 TLS handshake, 52/55/56 empty reply/send/recv, 28 timeout
+_CURL_CODE = re.compile(r"curl: \((\d+)\)")
+_CURL_TIMEOUT_CODES = {28}
+_NETWORK_MARKERS = ("TLS", "OPENSSL", "error:00000000", "invalid library", "IncompleteRead",
+                    "URL Error", "Connection reset", "Connection refused", "Failed to read response")
+_STATUS_IN_MESSAGE = re.compile(r"(?:API request failed|HTTP Error): (\d{3})")
+
+
+def classify_status(status_code: int) -> Optional[str]:
+    """Error class of an HTTP status, None when the response is usable"""
+    if status_code in RETRYABLE_STATUS:
+        return ERROR_SERVER
+    if status_code == 429:
+        return ERROR_RATE_LIMITED
+    return None
+
+
+def classify_exception(error: BaseException) -> str:
+    """Error class of an exception raised by an upstream call"""
+    if isinstance(error, asyncio.TimeoutError):
+        return ERROR_TIMEOUT
+    message = str(error)
+    if "cf_shield_429" in message:
+        return ERROR_RATE_LIMITED
+
+    status_match = _STATUS_IN_MESSAGE.search(message)
+    if status_match:
+        return classify_status(int(status_match.group(1))) or ERROR_FATAL
+
+    curl_match = _CURL_CODE.search(message)
+    if curl_match:
+        return ERROR_TIMEOUT if int(curl_match.group(1)) in _CURL_TIMEOUT_CODES else ERROR_NETWORK
+    if "timed out" in message.lower():
+        return ERROR_TIMEOUT
+    if any(marker in message for marker in _NETWORK_MARKERS):
+        return ERROR_NETWORK
+    return ERROR_FATAL
+
+
+class RetryBudget:
+    """Process-wide cap on retries relative to first attempts
+
+    Each call deposits `ratio` tokens and each retry withdraws one, plus a small
+    time-based allowance, so during an outage retries add at most ~ratio extra load.
+    """
+
+    def __init__(self):
+        self._balance = None
+        self._updated_at = time.monotonic()
+        self.exhausted_count = 0
+
+    def _max_balance(self) -> float:
+        return max(10.0, config.retry_budget_min_per_second * 10)
+
+    def _refill(self):
+        now = time.monotonic()
+        if self._balance is None:
+            self._balance = self._max_balance()
+        self._balance = min(self._max_balance(),
+                            self._balance + (now - self._updated_at) * config.retry_budget_min_per_second)
+        self._updated_at = now
+
+    def record_call(self):
+        """Deposit for a new (first-attempt) call"""
+        self._refill()
+        self._balance = min(self._max_balance(), self._balance + config.retry_budget_ratio)
+
+    def try_spend(self) -> bool:
+        """Withdraw one retry, False when the budget is exhausted"""
+        self._refill()
+        if self._balance >= 1:
+            self._balance -= 1
+            return True
+        self.exhausted_count += 1
+        return False
+
+
+retry_budget = RetryBudget()
+
+
+class RetryPolicy:
+    """Retry with decorrelated-jitter backoff, a total deadline and the shared retry budget"""
+
+    def __init__(self, retry_on: Iterable[str] = (ERROR_NETWORK, ERROR_TIMEOUT, ERROR_SERVER),
+                 max_attempts: Optional[int] = None, base_delay: Optional[float] = None,
+                 max_delay: Optional[float] = None, deadline: Optional[float] = None):
+        """
+        Args:
+            retry_on: Error classes worth retrying
+            max_attempts / base_delay / max_delay / deadline: Override the [retry] config defaults
+        """
+        self.retry_on = frozenset(retry_on)
+        self._max_attempts = max_attempts
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._deadline = deadline
+
+    @property
+    def max_attempts(self) -> int:
+        return self._max_attempts or config.retry_max_attempts
+
+    @property
+    def base_delay(self) -> float:
+        return self._base_delay or config.retry_base_delay
+
+    @property
+    def max_delay(self) -> float:
+        return self._max_delay or config.retry_max_delay
+
+    @property
+    def deadline(self) -> float:
+        return self._deadline or config.retry_deadline
+
+    def next_delay(self, previous: Optional[float]) -> float:
+        """Decorrelated jitter: uniform between base and 3x the previous sleep, capped"""
+        previous = previous or self.base_delay
+        return min(self.max_delay, random.uniform(self.base_delay, previous * 3))
+
+    async def call(self, func: Callable[[], Awaitable[T]], description: str = "request",
+                   result_class: Optional[Callable[[Any], Optional[str]]] = None) -> T:
+        """Run func, retrying retryable failures
+
+        Args:
+            func: Zero-argument coroutine function performing one attempt
+            description: Label for logs
+            result_class: Optional classifier for a returned value (e.g. response -> classify_status);
+                          a retryable class is retried, and the last value is returned once retries run out
+
+        Returns:
+            Result of the first successful attempt
+        """
+        if not config.retry_enabled:
+            return await func()
+
+        retry_budget.record_call()
+        start_time = time.monotonic()
+        delay = None
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = await func()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error_class = classify_exception(e)
+                delay = self._retry_delay(error_class, attempt, start_time, delay, description, str(e))
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+
+            error_class = result_class(result) if result_class else None
+            if error_class:
+                retry_delay = self._retry_delay(error_class, attempt, start_time, delay, description,
+                                                f"retryable result ({error_class})")
+                if retry_delay is not None:
+                    delay = retry_delay
+                    await asyncio.sleep(delay)
+                    continue
+            return result
+
+    def _retry_delay(self, error_class: str, attempt: int, start_time: float,
+                     previous: Optional[float], description: str, reason: str) -> Optional[float]:
+        """Delay before the next attempt, or None when the failure should be surfaced"""
+        if error_class not in self.retry_on or attempt >= self.max_attempts:
+            return None
+        delay = self.next_delay(previous)
+        if time.monotonic() - start_time + delay > self.deadline:
+            return None
+        if not retry_budget.try_spend():
+            debug_logger.log_info(f"Retry budget exhausted, not retrying {description}: {reason[:200]}")
+            return None
+        debug_logger.log_info(
+            f"Retrying {description} in {delay:.1f}s (attempt {attempt + 1}/{self.max_attempts}, {error_class}): {reason[:200]}"
+        )
+        return delay
+
+
+# Idempotent reads: transport errors, timeouts and 5xx
+GET_RETRY_POLICY = RetryPolicy()
+# Uploads: only failures where the body most likely never reached upstream
+UPLOAD_RETRY_POLICY = RetryPolicy(retry_on=(ERROR_NETWORK,), max_attempts=5, base_delay=1.0, max_delay=15.0, deadline=60.0)
+# Progress polls: the poll loop itself tries again on its next tick
+POLL_RETRY_POLICY = RetryPolicy(retry_on=())
@@ -0,0 +1,174 @@
+"""Sentinel token pool module"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from ..core.config import config
+from ..core.logger import debug_logger
+
+# (proxy_url, access_token) - sentinel/req is sent through the egress proxy with the token's Authorization header
+PoolKey = Tuple[Optional[str], Optional[str]]
+
+
+class SentinelTokenPool:
+    """Pool of pre-generated openai-sentinel-tokens, refilled in the background per egress"""
+
+    def __init__(self, generator: Callable[[Optional[str], Optional[str]], Awaitable[str]]):
+        """
+        Initialize sentinel token pool
+
+        Args:
+            generator: Coroutine function (token, proxy_url) -> sentinel token, used to fill the pool
+        """
+        self._generator = generator
+        self._pools: Dict[PoolKey, List[Tuple[str, float]]] = {}  # key -> [(sentinel_token, created_at)]
+        self._last_used: Dict[PoolKey, float] = {}  # key -> last acquire timestamp
+        self._refill_tasks: Dict[PoolKey, asyncio.Task] = {}
+        self._lock = asyncio.Lock()  # Protect _pools
+        self._maintenance_task = None
+        self._hits = 0
+        self._misses = 0
+
+    def _is_fresh(self, created_at: float, now: float) -> bool:
+        """Check if a pooled token is still far enough from the end of its validity window"""
+        return now - created_at < config.sentinel_token_ttl - config.sentinel_refresh_margin
+
+    async def acquire(self, token: Optional[str], proxy_url: Optional[str]) -> Optional[str]:
+        """
+        Take a ready sentinel token from the pool
+
+        Args:
+            token: Access token the sentinel token was requested with
+            proxy_url: Egress proxy the sentinel token was requested through
+
+        Returns:
+            Sentinel token, or None if the pool for this egress is empty
+        """
+        key = (proxy_url, token)
+        now = time.time()
+        sentinel_token = None
+
+        async with self._lock:
+            self._last_used[key] = now
+            entries = [entry for entry in self._pools.get(key, []) if self._is_fresh(entry[1], now)]
+            if entries:
+                # Sentinel tokens are single-use, hand out the freshest one
+                sentinel_token, _ = entries.pop()
+            self._pools[key] = entries
+
+        if sentinel_token:
+            self._hits += 1
+        else:
+            self._misses += 1
+            debug_logger.log_info(f"Sentinel pool empty for egress {proxy_url or 'direct'}, generating inline")
+
+        self._schedule_refill(key)
+        return sentinel_token
+
+    def warm(self, token: Optional[str], proxy_url: Optional[str]):
+        """Start filling the pool for an egress ahead of an expected acquire
+
+        The egress counts as in use, so maintenance keeps its tokens fresh until then.
+        """
+        key = (proxy_url, token)
+        self._last_used[key] = time.time()
+        self._schedule_refill(key)
+
+    def _schedule_refill(self, key: PoolKey):
+        """Start a background refill for the key if one is not already running"""
+        task = self._refill_tasks.get(key)
+        if task and not task.done():
+            return
+        self._refill_tasks[key] = asyncio.create_task(self._refill(key))
+
+    async def _refill(self, key: PoolKey):
+        """Generate sentinel tokens until the pool for the key reaches its target size"""
+        proxy_url, token = key
+        try:
+            while True:
+                async with self._lock:
+                    now = time.time()
+                    entries = [entry for entry in self._pools.get(key, []) if self._is_fresh(entry[1], now)]
+                    self._pools[key] = entries
+                    if len(entries) >= config.sentinel_pool_size:
+                        return
+
+                sentinel_token = await self._generator(token, proxy_url)
+
+                async with self._lock:
+                    self._pools.setdefault(key, []).append((sentinel_token, time.time()))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Leave the pool short, submissions fall back to inline generation
+            debug_logger.log_error(
+                error_message=f"Sentinel pool refill failed: {str(e)}",
+                status_code=0,
+                response_text=str(e)
+            )
+
+    async def start(self):
+        """Start background maintenance task"""
+        if self._maintenance_task is None:
+            self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+
+    async def stop(self):
+        """Stop background maintenance and refill tasks"""
+        tasks = list(self._refill_tasks.values())
+        if self._maintenance_task:
+            tasks.append(self._maintenance_task)
+            self._maintenance_task = None
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._refill_tasks.clear()
+
+    async def _maintenance_loop(self):
+        """Evict tokens nearing expiry and keep recently used egresses topped up"""
+        while True:
+            try:
+                await asyncio.sleep(config.sentinel_refresh_margin / 2)
+                now = time.time()
+
+                async with self._lock:
+                    for key in list(self._last_used.keys()):
+                        if now - self._last_used[key] > config.sentinel_idle_timeout:
+                            # Egress not used recently, stop keeping tokens warm for it
+                            del self._last_used[key]
+                            self._pools.pop(key, None)
+                            continue
+                        self._pools[key] = [
+                            entry for entry in self._pools.get(key, []) if self._is_fresh(entry[1], now)
+                        ]
+                    active_keys = list(self._last_used.keys())
+
+                for key in active_keys:
+                    self._schedule_refill(key)
+
+                for key, task in list(self._refill_tasks.items()):
+                    if task.done():
+                        del self._refill_tasks[key]
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                debug_logger.log_error(
+                    error_message=f"Sentinel pool maintenance error: {str(e)}",
+                    status_code=0,
+                    response_text=""
+                )
+
+    def get_stats(self) -> dict:
+        """Get pool statistics"""
+        now = time.time()
+        ready = sum(
+            1 for entries in self._pools.values() for entry in entries if self._is_fresh(entry[1], now)
+        )
+        return {
+            "egresses": len(self._last_used),
+            "ready_tokens": ready,
+            "hits": self._hits,
+            "misses": self._misses
+        }
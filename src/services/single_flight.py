@@ -0,0 +1,106 @@
+"""Single-flight deduplication of identical generations"""
+import asyncio
+from typing import AsyncGenerator, Callable, Dict, List, Optional
+from ..core.config import config
+from ..core.logger import debug_logger
+from ..core.ttl_cache import TTLCache
+from .job_executor import ChunkBroadcast
+
+
+class Flight(ChunkBroadcast):
+    """One in-flight generation shared by every identical request"""
+
+    def __init__(self, key: str):
+        super().__init__()
+        self.key = key
+        self.task: Optional[asyncio.Task] = None
+        self.error: Optional[Exception] = None
+        self.cacheable = False  # Set by the producer once the task completed successfully
+
+
+class SingleFlight:
+    """Runs each distinct generation once and fans its stream out to identical requests
+
+    The generation runs in its own task owned by the flight, not by any client, and is
+    cancelled only once every attached client has gone. Streams of successful generations
+    are kept for a short time and replayed to identical requests that arrive later.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, Flight] = {}
+        self._results = TTLCache(config.dedup_max_results, config.dedup_result_ttl)
+        self.attached = 0  # Requests served by an in-flight generation
+        self.replayed = 0  # Requests served from the result cache
+
+    async def stream(self, key: str,
+                     producer: Callable[[Flight], AsyncGenerator[bytes, None]]) -> AsyncGenerator[bytes, None]:
+        """Stream the generation for key, starting it with producer(flight) if none is running
+
+        Raises the producer's exception to every attached request.
+        """
+        cached: Optional[List[bytes]] = self._results.get(key)
+        if cached is not None:
+            self.replayed += 1
+            debug_logger.log_info(f"Dedup: replaying cached result for {key[:12]}")
+            for chunk in cached:
+                yield chunk
+            return
+
+        flight = self._flights.get(key)
+        if flight is None or flight.task.done():
+            flight = Flight(key)
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._run(flight, producer))
+        else:
+            self.attached += 1
+            debug_logger.log_info(f"Dedup: attached to in-flight generation {key[:12]} "
+                                  f"({len(flight.subscribers) + 1} clients)")
+
+        subscription = flight.subscribe()
+        try:
+            async for chunk in subscription:
+                yield chunk
+        finally:
+            await subscription.aclose()
+            # Last client gone before the end: tear the generation down like a disconnect.
+            # Unmapped at once, a request arriving before _run unwinds must start a new flight
+            if not flight.subscribers and not flight.task.done():
+                self._forget(flight)
+                flight.task.cancel()
+
+        if flight.error:
+            raise flight.error
+
+    async def _run(self, flight: Flight, producer: Callable[[Flight], AsyncGenerator[bytes, None]]):
+        """Drive the producer, publishing its chunks to the flight"""
+        try:
+            async for chunk in producer(flight):
+                flight.publish(chunk.encode() if isinstance(chunk, str) else chunk)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            flight.error = e
+        finally:
+            # No await from here on, so no request can attach to a flight that already closed
+            self._forget(flight)
+            if flight.cacheable and flight.error is None:
+                self._results.set(flight.key, flight.history)
+            flight.close()
+
+    def _forget(self, flight: Flight):
+        """Stop handing out a flight, leaving a newer flight for the same key in place"""
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+
+    def purge(self) -> int:
+        """Drop cached results, return how many were dropped"""
+        return self._results.clear()
+
+    def get_stats(self) -> dict:
+        """Get deduplication statistics"""
+        return {
+            "in_flight": len(self._flights),
+            "attached": self.attached,
+            "replayed": self.replayed,
+            "results": self._results.get_stats()
+        }
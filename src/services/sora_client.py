@@ -9,17 +9,23 @@ import random
 import string
 import re
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, Tuple, Union
 from uuid import uuid4
 from urllib.request import Request, urlopen, build_opener, ProxyHandler
 from urllib.error import HTTPError, URLError
+from urllib.parse import quote
 from http.client import IncompleteRead
 from curl_cffi.requests import AsyncSession
 from curl_cffi import CurlMime
 from .proxy_manager import ProxyManager
 from .captcha_service import YesCaptchaService
+from .sentinel_pool import SentinelTokenPool
+from .media_spool import MediaFile
+from .rate_limiter import RateLimiter, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_POLL
+from .retry_policy import RetryPolicy, GET_RETRY_POLICY, UPLOAD_RETRY_POLICY, POLL_RETRY_POLICY, classify_status
 from ..core.config import config
 from ..core.logger import debug_logger
+from ..core.serialization import loads as json_loads
 
 # PoW related constants
 POW_MAX_ITERATION = 500000
@@ -83,6 +89,8 @@ class SoraClient:
         self.db = db
         self.base_url = config.sora_base_url
         self.timeout = config.sora_timeout
+        self.sentinel_pool = SentinelTokenPool(self._generate_sentinel_token)
+        self.rate_limiter = RateLimiter()
 
     @staticmethod
     def _get_pow_parse_time() -> str:
@@ -250,11 +258,14 @@ class SoraClient:
         }
 
         try:
+            await self.rate_limiter.acquire(token, proxy_url, PRIORITY_HIGH)
             result = await asyncio.to_thread(
                 self._post_json_sync, url, headers, payload, 30, proxy_url
             )
             return result
         except Exception as e:
+            if str(e).startswith("HTTP Error: 429"):
+                self.rate_limiter.penalize(token, proxy_url)
             debug_logger.log_error(
                 error_message=f"nf/create request failed: {str(e)}",
                 status_code=0,
@@ -262,13 +273,15 @@ class SoraClient:
             )
             raise
 
-    async def _generate_sentinel_token(self, token: Optional[str] = None) -> str:
+    async def _generate_sentinel_token(self, token: Optional[str] = None, proxy_url: Optional[str] = None) -> str:
         """Generate openai-sentinel-token by calling /backend-api/sentinel/req and solving PoW"""
         req_id = str(uuid4())
         user_agent = random.choice(DESKTOP_USER_AGENTS)
-        pow_token = self._get_pow_token(user_agent)
+        # PoW is CPU bound, keep it off the event loop
+        pow_token = await asyncio.to_thread(self._get_pow_token, user_agent)
 
-        proxy_url = await self.proxy_manager.get_proxy_url()
+        if proxy_url is None:
+            proxy_url = await self.proxy_manager.get_proxy_url()
 
         # Request sentinel/req endpoint
         url = f"{self.CHATGPT_BASE_URL}/backend-api/sentinel/req"
@@ -284,6 +297,7 @@ class SoraClient:
             headers["Authorization"] = f"Bearer {token}"
 
         try:
+            await self.rate_limiter.acquire(token, proxy_url, PRIORITY_NORMAL)
             resp = await asyncio.to_thread(
                 self._post_json_sync, url, headers, payload, 10, proxy_url
             )
@@ -296,11 +310,46 @@ class SoraClient:
             raise
 
         # Build final sentinel token
-        sentinel_token = self._build_sentinel_token(
-            self.SENTINEL_FLOW, req_id, pow_token, resp, user_agent
+        sentinel_token = await asyncio.to_thread(
+            self._build_sentinel_token, self.SENTINEL_FLOW, req_id, pow_token, resp, user_agent
         )
         return sentinel_token
 
+    async def _get_sentinel_token(self, token: Optional[str], proxy_url: Optional[str]) -> str:
+        """Get openai-sentinel-token from the pool, falling back to inline generation when it is empty
+
+        Args:
+            token: Access token of the request the sentinel token is for
+            proxy_url: Egress proxy that request is sent through, sentinel/req must use the same one
+        """
+        if config.sentinel_pool_enabled:
+            sentinel_token = await self.sentinel_pool.acquire(token, proxy_url)
+            if sentinel_token:
+                return sentinel_token
+
+        return await self._generate_sentinel_token(token, proxy_url)
+
+    async def acquire_sentinel_token(self, token: Optional[str] = None,
+                                     token_id: Optional[int] = None) -> Tuple[str, Optional[str]]:
+        """Get a sentinel token for a generation request, to be passed to generate_video
+
+        Lets callers acquire it while preparing the rest of the request.
+
+        Returns:
+            (sentinel token, egress proxy it was issued through), the submission must use that proxy
+        """
+        proxy_url = await self.proxy_manager.get_proxy_url(token_id)
+        return await self._get_sentinel_token(token, proxy_url), proxy_url
+
+    async def prepare_sentinel_token(self, token: Optional[str] = None, token_id: Optional[int] = None):
+        """Have a sentinel token ready in the pool for a generation request expected soon
+
+        No-op when the pool is disabled, the request then generates its token inline.
+        """
+        if config.sentinel_pool_enabled:
+            proxy_url = await self.proxy_manager.get_proxy_url(token_id)
+            self.sentinel_pool.warm(token, proxy_url)
+
     @staticmethod
     def is_storyboard_prompt(prompt: str) -> bool:
         """检测提示词是否为分镜模式格式
@@ -367,8 +416,32 @@ class SoraClient:
                            json_data: Optional[Dict] = None,
                            multipart: Optional[Dict] = None,
                            add_sentinel_token: bool = False,
-                           token_id: Optional[int] = None) -> Dict[str, Any]:
-        """Make HTTP request with proxy support
+                           token_id: Optional[int] = None,
+                           priority: Optional[int] = None,
+                           retry_policy: Optional[RetryPolicy] = None) -> Dict[str, Any]:
+        """Make HTTP request, retried according to the retry policy
+
+        GETs are idempotent and use the default policy. POSTs are only retried when the
+        caller passes a policy explicitly, generation requests never are.
+        """
+        if retry_policy is None and method == "GET":
+            retry_policy = GET_RETRY_POLICY
+        if retry_policy is None:
+            return await self._send_request(method, endpoint, token, json_data, multipart,
+                                            add_sentinel_token, token_id, priority)
+        return await retry_policy.call(
+            lambda: self._send_request(method, endpoint, token, json_data, multipart,
+                                       add_sentinel_token, token_id, priority),
+            description=f"{method} {endpoint}"
+        )
+
+    async def _send_request(self, method: str, endpoint: str, token: str,
+                            json_data: Optional[Dict] = None,
+                            multipart: Optional[Dict] = None,
+                            add_sentinel_token: bool = False,
+                            token_id: Optional[int] = None,
+                            priority: Optional[int] = None) -> Dict[str, Any]:
+        """Make one HTTP request with proxy support
 
         Args:
             method: HTTP method (GET/POST)
@@ -378,8 +451,11 @@ class SoraClient:
             multipart: Multipart form data (for file uploads)
             add_sentinel_token: Whether to add openai-sentinel-token header (only for generation requests)
             token_id: Token ID for getting token-specific proxy (optional)
+            priority: Rate limiter priority, defaults to high for POSTs and normal for GETs
         """
         proxy_url = await self.proxy_manager.get_proxy_url(token_id)
+        if priority is None:
+            priority = PRIORITY_HIGH if method == "POST" else PRIORITY_NORMAL
 
         headers = {
             "Authorization": f"Bearer {token}",
@@ -402,7 +478,7 @@ class SoraClient:
 
         # 只在生成请求时添加 sentinel token
         if add_sentinel_token:
-            headers["openai-sentinel-token"] = await self._generate_sentinel_token(token)
+            headers["openai-sentinel-token"] = await self._get_sentinel_token(token, proxy_url)
 
         if not multipart:
             headers["Content-Type"] = "application/json"
@@ -435,27 +511,36 @@ class SoraClient:
                 proxy=proxy_url
             )
 
+            await self.rate_limiter.acquire(token, proxy_url, priority)
+
             # Record start time
             start_time = time.time()
 
             # Make request
-            if method == "GET":
-                response = await session.get(url, **kwargs)
-            elif method == "POST":
-                response = await session.post(url, **kwargs)
-            else:
+            if method not in ("GET", "POST"):
                 raise ValueError(f"Unsupported method: {method}")
+            try:
+                if method == "GET":
+                    response = await session.get(url, **kwargs)
+                else:
+                    response = await session.post(url, **kwargs)
+            except Exception:
+                # Transport failure, count it against the egress
+                self.proxy_manager.report_result(proxy_url, False)
+                raise
 
             # Calculate duration
             duration_ms = (time.time() - start_time) * 1000
+            # Latency comes from health probes only, request durations include upstream processing time
+            self.proxy_manager.report_result(proxy_url, True)
 
             # Parse response with comprehensive error handling
             response_json = None
             response_text = None
             
-            # Try to parse JSON response
+            # Try to parse JSON response (straight from the body bytes, no str decode)
             try:
-                response_json = response.json()
+                response_json = json_loads(response.content)
             except Exception as json_err:
                 json_err_str = str(json_err)
                 # Check if it's an IncompleteRead error (may come from curl_cffi internals)
@@ -481,8 +566,8 @@ class SoraClient:
                     response_text = None
                 response_json = None
 
-            # Get response text if not already obtained
-            if response_text is None:
+            # Get response text if not already obtained (only needed for errors, or logging non-JSON bodies)
+            if response_text is None and (not response_json or response.status_code not in [200, 201]):
                 try:
                     response_text = response.text
                 except Exception as text_err:
@@ -506,6 +591,9 @@ class SoraClient:
 
             # Check status
             if response.status_code not in [200, 201]:
+                if response.status_code == 429:
+                    self.rate_limiter.penalize(token, proxy_url)
+
                 # Parse error response
                 error_data = None
                 try:
@@ -621,18 +709,32 @@ class SoraClient:
         """Get user information"""
         return await self._make_request("GET", "/me", token)
     
-    async def upload_image(self, image_data: bytes, token: str, filename: str = "image.png", token_id: Optional[int] = None) -> str:
+    async def upload_image(self, image_data: Union[bytes, MediaFile], token: str, filename: str = "image.png", token_id: Optional[int] = None) -> str:
         """Upload image and return media_id
 
         使用 CurlMime 对象上传文件（curl_cffi 的正确方式）
         参考：https://curl-cffi.readthedocs.io/en/latest/quick_start.html#uploads
         
         Args:
-            image_data: Image data as bytes
+            image_data: Image data as bytes, or a spooled file streamed from disk by curl
             token: Access token
-            filename: Image filename
+            filename: Image filename (a spooled file uses its own)
             token_id: Token ID for getting token-specific proxy (optional)
+
+        The media_id is cached per token by content hash, a cache hit skips the upload.
         """
+        is_file = isinstance(image_data, MediaFile)
+        if is_file:
+            filename = image_data.filename
+
+        content_hash = None
+        if token_id is not None and self.db and config.media_cache_enabled:
+            content_hash = image_data.sha256 if is_file else hashlib.sha256(image_data).hexdigest()
+            media_id = await self.db.get_cached_media(content_hash, token_id)
+            if media_id:
+                debug_logger.log_info(f"Media cache hit for token {token_id}: {media_id}")
+                return media_id
+
         # 检测图片类型
         mime_type = "image/png"
         if filename.lower().endswith('.jpg') or filename.lower().endswith('.jpeg'):
@@ -644,12 +746,20 @@ class SoraClient:
         mp = CurlMime()
 
         # 添加文件部分
-        mp.addpart(
-            name="file",
-            content_type=mime_type,
-            filename=filename,
-            data=image_data
-        )
+        if is_file:
+            mp.addpart(
+                name="file",
+                content_type=mime_type,
+                filename=filename,
+                local_path=image_data.path
+            )
+        else:
+            mp.addpart(
+                name="file",
+                content_type=mime_type,
+                filename=filename,
+                data=image_data
+            )
 
         # 添加文件名字段
         mp.addpart(
@@ -657,40 +767,24 @@ class SoraClient:
             data=filename.encode('utf-8')
         )
 
-        # Retry logic for TLS/OpenSSL errors (common on Windows)
-        max_retries = 5
-        retry_delay = 3  # Start with 3 seconds
-        
-        for attempt in range(max_retries):
-            try:
-                result = await self._make_request("POST", "/uploads", token, multipart=mp, token_id=token_id)
-                return result["id"]
-            except Exception as e:
-                error_msg = str(e)
-                is_tls_error = ("TLS" in error_msg or "curl" in error_msg or "OPENSSL" in error_msg or 
-                               "error:00000000" in error_msg or "invalid library" in error_msg)
-                
-                if is_tls_error and attempt < max_retries - 1:
-                    # Exponential backoff for TLS errors
-                    wait_time = retry_delay * (2 ** attempt)
-                    debug_logger.log_info(
-                        f"TLS/OpenSSL error during image upload (attempt {attempt + 1}/{max_retries}): {error_msg[:200]}. "
-                        f"Retrying in {wait_time}s..."
-                    )
-                    await asyncio.sleep(wait_time)
-                    continue
-                else:
-                    # Re-raise if not TLS error or last attempt
-                    debug_logger.log_error(
-                        error_message=f"Image upload failed: {error_msg}",
-                        status_code=500,
-                        response_text=error_msg
-                    )
-                    raise Exception(f"Failed to upload image: {error_msg}")
-        
-        # Should not reach here, but just in case
-        raise Exception("Image upload failed after all retries")
-    
+        # Transport/TLS errors (common on Windows) are retried by the upload policy
+        try:
+            result = await self._make_request("POST", "/uploads", token, multipart=mp, token_id=token_id,
+                                              retry_policy=UPLOAD_RETRY_POLICY)
+            media_id = result["id"]
+        except Exception as e:
+            error_msg = str(e)
+            debug_logger.log_error(
+                error_message=f"Image upload failed: {error_msg}",
+                status_code=500,
+                response_text=error_msg
+            )
+            raise Exception(f"Failed to upload image: {error_msg}")
+
+        if content_hash:
+            await self.db.save_cached_media(content_hash, token_id, media_id, config.media_cache_ttl)
+        return media_id
+
     async def generate_image(self, prompt: str, token: str, width: int = 360,
                             height: int = 360, media_id: Optional[str] = None, token_id: Optional[int] = None) -> str:
         """Generate image (text-to-image or image-to-image)"""
@@ -721,7 +815,8 @@ class SoraClient:
     
     async def generate_video(self, prompt: str, token: str, orientation: str = "landscape",
                             media_id: Optional[str] = None, n_frames: int = 450, style_id: Optional[str] = None,
-                            model: str = "sy_8", size: str = "small", token_id: Optional[int] = None) -> str:
+                            model: str = "sy_8", size: str = "small", token_id: Optional[int] = None,
+                            sentinel: Optional[Tuple[str, Optional[str]]] = None) -> str:
         """Generate video (text-to-video or image-to-video)
 
         Args:
@@ -734,6 +829,7 @@ class SoraClient:
             model: Model to use (sy_8 for standard, sy_ore for pro)
             size: Video size (small for standard, large for HD)
             token_id: Token ID for getting token-specific proxy (optional)
+            sentinel: (sentinel token, proxy URL) acquired ahead of time with acquire_sentinel_token (optional)
         """
         inpaint_items = []
         if media_id:
@@ -754,18 +850,32 @@ class SoraClient:
         }
 
         # 生成请求需要添加 sentinel token
-        proxy_url = await self.proxy_manager.get_proxy_url(token_id)
-        sentinel_token = await self._generate_sentinel_token(token)
+        if sentinel:
+            # Submit through the egress the sentinel token was issued for
+            sentinel_token, proxy_url = sentinel
+        else:
+            proxy_url = await self.proxy_manager.get_proxy_url(token_id)
+            sentinel_token = await self._get_sentinel_token(token, proxy_url)
         result = await self._nf_create_urllib(token, json_data, sentinel_token, proxy_url, token_id)
         return result["id"]
     
     async def get_image_tasks(self, token: str, limit: int = 20, token_id: Optional[int] = None) -> Dict[str, Any]:
         """Get recent image generation tasks"""
-        return await self._make_request("GET", f"/v2/recent_tasks?limit={limit}", token, token_id=token_id)
+        return await self._make_request("GET", f"/v2/recent_tasks?limit={limit}", token, token_id=token_id,
+                                        priority=PRIORITY_POLL, retry_policy=POLL_RETRY_POLICY)
 
-    async def get_video_drafts(self, token: str, limit: int = 15, token_id: Optional[int] = None) -> Dict[str, Any]:
-        """Get recent video drafts"""
-        return await self._make_request("GET", f"/project_y/profile/drafts?limit={limit}", token, token_id=token_id)
+    async def get_video_drafts(self, token: str, limit: int = 15, cursor: Optional[str] = None,
+                               token_id: Optional[int] = None) -> Dict[str, Any]:
+        """Get recent video drafts
+
+        Args:
+            cursor: Cursor returned by the previous page, None for the first page
+        """
+        endpoint = f"/project_y/profile/drafts?limit={limit}"
+        if cursor:
+            endpoint += f"&cursor={quote(cursor)}"
+        # Drafts are only fetched once tasks left the pending list, i.e. to pick up completions
+        return await self._make_request("GET", endpoint, token, token_id=token_id, priority=PRIORITY_HIGH)
 
     async def get_pending_tasks(self, token: str, token_id: Optional[int] = None) -> list:
         """Get pending video generation tasks
@@ -773,7 +883,8 @@ class SoraClient:
         Returns:
             List of pending tasks with progress information
         """
-        result = await self._make_request("GET", "/nf/pending/v2", token, token_id=token_id)
+        result = await self._make_request("GET", "/nf/pending/v2", token, token_id=token_id,
+                                          priority=PRIORITY_POLL, retry_policy=POLL_RETRY_POLICY)
         # The API returns a list directly
         return result if isinstance(result, list) else []
 
@@ -1238,23 +1349,31 @@ class SoraClient:
 
     # ==================== Character Creation Methods ====================
 
-    async def upload_character_video(self, video_data: bytes, token: str) -> str:
+    async def upload_character_video(self, video_data: Union[bytes, MediaFile], token: str) -> str:
         """Upload character video and return cameo_id
 
         Args:
-            video_data: Video file bytes
+            video_data: Video file bytes, or a spooled file streamed from disk by curl
             token: Access token
 
         Returns:
             cameo_id
         """
         mp = CurlMime()
-        mp.addpart(
-            name="file",
-            content_type="video/mp4",
-            filename="video.mp4",
-            data=video_data
-        )
+        if isinstance(video_data, MediaFile):
+            mp.addpart(
+                name="file",
+                content_type="video/mp4",
+                filename="video.mp4",
+                local_path=video_data.path
+            )
+        else:
+            mp.addpart(
+                name="file",
+                content_type="video/mp4",
+                filename="video.mp4",
+                data=video_data
+            )
         mp.addpart(
             name="timestamps",
             data=b"0,3"
@@ -1295,7 +1414,11 @@ class SoraClient:
             kwargs["proxy"] = proxy_url
 
         async with AsyncSession() as session:
-            response = await session.get(image_url, **kwargs)
+            response = await GET_RETRY_POLICY.call(
+                lambda: session.get(image_url, **kwargs),
+                description="character image download",
+                result_class=lambda r: classify_status(r.status_code)
+            )
             if response.status_code != 200:
                 raise Exception(f"Failed to download image: {response.status_code}")
             return response.content
@@ -1367,39 +1490,19 @@ class SoraClient:
             data=b"profile"
         )
 
-        # Retry logic for TLS/OpenSSL errors (common on Windows)
-        max_retries = 5
-        retry_delay = 3  # Start with 3 seconds
-        
-        for attempt in range(max_retries):
-            try:
-                result = await self._make_request("POST", "/project_y/file/upload", token, multipart=mp, token_id=token_id)
-                return result.get("asset_pointer")
-            except Exception as e:
-                error_msg = str(e)
-                is_tls_error = ("TLS" in error_msg or "curl" in error_msg or "OPENSSL" in error_msg or 
-                               "error:00000000" in error_msg or "invalid library" in error_msg)
-                
-                if is_tls_error and attempt < max_retries - 1:
-                    # Exponential backoff for TLS errors
-                    wait_time = retry_delay * (2 ** attempt)
-                    debug_logger.log_info(
-                        f"TLS/OpenSSL error during character image upload (attempt {attempt + 1}/{max_retries}): {error_msg[:200]}. "
-                        f"Retrying in {wait_time}s..."
-                    )
-                    await asyncio.sleep(wait_time)
-                    continue
-                else:
-                    # Re-raise if not TLS error or last attempt
-                    debug_logger.log_error(
-                        error_message=f"Character image upload failed: {error_msg}",
-                        status_code=500,
-                        response_text=error_msg
-                    )
-                    raise Exception(f"Failed to upload character image: {error_msg}")
-        
-        # Should not reach here, but just in case
-        raise Exception("Character image upload failed after all retries")
+        # Transport/TLS errors (common on Windows) are retried by the upload policy
+        try:
+            result = await self._make_request("POST", "/project_y/file/upload", token, multipart=mp, token_id=token_id,
+                                              retry_policy=UPLOAD_RETRY_POLICY)
+            return result.get("asset_pointer")
+        except Exception as e:
+            error_msg = str(e)
+            debug_logger.log_error(
+                error_message=f"Character image upload failed: {error_msg}",
+                status_code=500,
+                response_text=error_msg
+            )
+            raise Exception(f"Failed to upload character image: {error_msg}")
 
     async def delete_character(self, character_id: str, token: str) -> bool:
         """Delete a character
@@ -1464,7 +1567,7 @@ class SoraClient:
 
         # Generate sentinel token and call /nf/create using urllib
         proxy_url = await self.proxy_manager.get_proxy_url()
-        sentinel_token = await self._generate_sentinel_token(token)
+        sentinel_token = await self._get_sentinel_token(token, proxy_url)
         result = await self._nf_create_urllib(token, json_data, sentinel_token, proxy_url)
         return result.get("id")
 
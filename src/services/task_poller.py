@@ -0,0 +1,217 @@
+"""Per-token task polling module"""
+import asyncio
+import math
+import time
+from typing import Any, Dict, Optional, Tuple
+from .poll_scheduler import AdaptivePollScheduler, PollState
+from ..core.logger import debug_logger
+
+# Max page size accepted by /project_y/profile/drafts
+DRAFTS_PAGE_SIZE = 15
+# Default page size of /v2/recent_tasks
+IMAGE_TASKS_LIMIT = 20
+
+# (access_token, is_video) - pending/drafts and recent_tasks are polled separately
+PollerKey = Tuple[str, bool]
+
+
+class _TokenPoller:
+    """Polling loop shared by all in-flight tasks of one token"""
+
+    def __init__(self, owner: "TaskPoller", token: str, token_id: Optional[int], is_video: bool):
+        self.owner = owner
+        self.token = token
+        self.token_id = token_id
+        self.is_video = is_video
+        self.subscribers: Dict[str, asyncio.Queue] = {}  # task_id -> latest update
+        self.states: Dict[str, PollState] = {}  # task_id -> poll schedule
+        self.wakeup = asyncio.Event()  # Set when subscribers change, to re-plan the next tick
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the polling loop if it is not running"""
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+            self.task.add_done_callback(self._on_exit)
+
+    def _on_exit(self, task: asyncio.Task):
+        """Fail the tasks still waiting when the loop died, nothing else would ever wake them
+
+        Cancellation only happens at shutdown, those tasks are left to recovery.
+        """
+        if task.cancelled() or task.exception() is None:
+            return
+        error = task.exception()
+        debug_logger.log_error(
+            error_message=f"{'Video' if self.is_video else 'Image'} poller for token {self.token_id} stopped: {str(error)}",
+            status_code=0,
+            response_text=str(error)
+        )
+        self.owner._retire(self)
+        closed = ("closed", Exception(f"Task poller stopped: {error}"))
+        for queue in self.subscribers.values():
+            _put_latest(queue, closed)
+
+    async def _run(self):
+        """Fetch when the earliest task is due and fan the result out to every waiting task"""
+        sora_client = self.owner.sora_client
+        scheduler = self.owner.scheduler
+        while True:
+            if not self.subscribers:
+                # No task left for this token, retire until the next subscribe
+                self.owner._retire(self)
+                return
+
+            delay = min(state.next_poll_at for state in self.states.values()) - time.time()
+            if delay > 0:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=delay)
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+
+            task_ids = list(self.subscribers.keys())
+            try:
+                if self.is_video:
+                    updates = await self._poll_video(sora_client, task_ids)
+                else:
+                    updates = await self._poll_image(sora_client, task_ids)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                updates = {task_id: ("error", e) for task_id in task_ids}
+
+            # One fetch answers every task, so all of them get the update and a new schedule
+            now = time.time()
+            for task_id, update in updates.items():
+                queue = self.subscribers.get(task_id)
+                if queue is None:
+                    continue
+                state = self.states[task_id]
+                kind, payload = update
+                if kind in ("pending", "task"):
+                    state.observe(payload.get("progress_pct"), now)
+                scheduler.schedule(state, now)
+                _put_latest(queue, update)
+
+    async def _poll_video(self, sora_client, task_ids: list) -> Dict[str, Tuple[str, Any]]:
+        """Check pending list once, then page through drafts for tasks that left it"""
+        pending_tasks = await sora_client.get_pending_tasks(self.token, token_id=self.token_id)
+        pending_by_id = {task.get("id"): task for task in pending_tasks}
+
+        missing = {task_id for task_id in task_ids if task_id not in pending_by_id}
+        drafts_by_id = {}
+        if missing:
+            # Drafts are newest first, so finished tasks are within the first few pages
+            max_pages = math.ceil(len(missing) / DRAFTS_PAGE_SIZE) + 1
+            cursor = None
+            for _ in range(max_pages):
+                result = await sora_client.get_video_drafts(
+                    self.token, limit=DRAFTS_PAGE_SIZE, cursor=cursor, token_id=self.token_id
+                )
+                for item in result.get("items", []):
+                    if item.get("task_id") in missing:
+                        drafts_by_id[item["task_id"]] = item
+                cursor = result.get("cursor")
+                if not cursor or missing.issubset(drafts_by_id.keys()):
+                    break
+
+        updates = {}
+        for task_id in task_ids:
+            if task_id in pending_by_id:
+                updates[task_id] = ("pending", pending_by_id[task_id])
+            elif task_id in drafts_by_id:
+                updates[task_id] = ("draft", drafts_by_id[task_id])
+            else:
+                updates[task_id] = ("missing", None)
+        return updates
+
+    async def _poll_image(self, sora_client, task_ids: list) -> Dict[str, Tuple[str, Any]]:
+        """Fetch recent image tasks once, large enough to cover every waiting task"""
+        limit = max(IMAGE_TASKS_LIMIT, len(task_ids))
+        result = await sora_client.get_image_tasks(self.token, limit=limit, token_id=self.token_id)
+        tasks_by_id = {task.get("id"): task for task in result.get("task_responses", [])}
+
+        updates = {}
+        for task_id in task_ids:
+            if task_id in tasks_by_id:
+                updates[task_id] = ("task", tasks_by_id[task_id])
+            else:
+                updates[task_id] = ("missing", None)
+        return updates
+
+
+def _put_latest(queue: asyncio.Queue, update: Tuple[str, Any]):
+    """Replace any unread update, every tick carries the full state of the task"""
+    if queue.full():
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+    queue.put_nowait(update)
+
+
+class TaskPoller:
+    """Batch status polling of in-flight tasks per token
+
+    Each waiting task subscribes with its task_id and reads updates from a queue.
+    A token's loop fetches when its earliest task is due per AdaptivePollScheduler.
+    Update kinds:
+    - ("pending", task) - video still in /nf/pending/v2
+    - ("draft", item) - video finished, matching drafts item
+    - ("task", task_response) - image task from /v2/recent_tasks
+    - ("missing", None) - task not found in this tick
+    - ("error", exception) - the shared request failed
+    - ("closed", exception) - the poller loop died, no further updates will come
+    """
+
+    def __init__(self, sora_client, db):
+        self.sora_client = sora_client
+        self.scheduler = AdaptivePollScheduler(db)
+        self._pollers: Dict[PollerKey, _TokenPoller] = {}
+
+    async def subscribe(self, task_id: str, token: str, is_video: bool, token_id: Optional[int] = None,
+                        model: Optional[str] = None, model_config: Optional[dict] = None) -> asyncio.Queue:
+        """Register a task and return the queue its updates are delivered to
+
+        Args:
+            model: Model name, used to look up historical durations
+            model_config: MODEL_CONFIG entry, used for the duration prior
+        """
+        state = await self.scheduler.create_state(model, model_config)
+        key = (token, is_video)
+        poller = self._pollers.get(key)
+        if poller is None:
+            poller = _TokenPoller(self, token, token_id, is_video)
+            self._pollers[key] = poller
+            debug_logger.log_info(f"Started {'video' if is_video else 'image'} poller for token {token_id}")
+
+        queue = asyncio.Queue(maxsize=1)
+        poller.subscribers[task_id] = queue
+        poller.states[task_id] = state
+        poller.wakeup.set()
+        poller.start()
+        return queue
+
+    def unsubscribe(self, task_id: str, token: str, is_video: bool):
+        """Stop delivering updates for a task"""
+        poller = self._pollers.get((token, is_video))
+        if poller is not None:
+            poller.subscribers.pop(task_id, None)
+            poller.states.pop(task_id, None)
+            poller.wakeup.set()
+
+    def _retire(self, poller: _TokenPoller):
+        """Drop an idle poller"""
+        key = (poller.token, poller.is_video)
+        if self._pollers.get(key) is poller:
+            del self._pollers[key]
+            debug_logger.log_info(f"Stopped {'video' if poller.is_video else 'image'} poller for token {poller.token_id}")
+
+    def get_stats(self) -> dict:
+        """Get active poller statistics"""
+        return {
+            "pollers": len(self._pollers),
+            "tasks": sum(len(poller.subscribers) for poller in self._pollers.values())
+        }
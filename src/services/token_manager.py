@@ -10,15 +10,16 @@ from ..core.database import Database
 from ..core.models import Token, TokenStats
 from ..core.config import config
 from .proxy_manager import ProxyManager
+from .retry_policy import GET_RETRY_POLICY, classify_status
 from ..core.logger import debug_logger
 
 class TokenManager:
     """Token lifecycle manager"""
 
-    def __init__(self, db: Database):
+    def __init__(self, db: Database, proxy_manager: Optional[ProxyManager] = None):
         self.db = db
         self._lock = asyncio.Lock()
-        self.proxy_manager = ProxyManager(db)
+        self.proxy_manager = proxy_manager or ProxyManager(db)
         self.fake = Faker()
     
     async def decode_jwt(self, token: str) -> dict:
@@ -59,6 +60,14 @@ class TokenManager:
         # 转换为小写
         return format_choice.lower()
 
+    async def _get(self, session: AsyncSession, url: str, **kwargs):
+        """GET retried on transport errors and 5xx by the shared retry policy"""
+        return await GET_RETRY_POLICY.call(
+            lambda: session.get(url, **kwargs),
+            description=f"GET {url}",
+            result_class=lambda response: classify_status(response.status_code)
+        )
+
     async def get_user_info(self, access_token: str, token_id: Optional[int] = None, proxy_url: Optional[str] = None) -> dict:
         """Get user info from Sora API"""
         proxy_url = await self.proxy_manager.get_proxy_url(token_id, proxy_url)
@@ -80,10 +89,7 @@ class TokenManager:
             if proxy_url:
                 kwargs["proxy"] = proxy_url
 
-            response = await session.get(
-                f"{config.sora_base_url}/me",
-                **kwargs
-            )
+            response = await self._get(session, f"{config.sora_base_url}/me", **kwargs)
 
             if response.status_code != 200:
                 # Check for token_invalidated error
@@ -131,7 +137,7 @@ class TokenManager:
                 kwargs["proxy"] = proxy_url
                 print(f"🌐 使用代理: {proxy_url}")
 
-            response = await session.get(url, **kwargs)
+            response = await self._get(session, url, **kwargs)
             print(f"📥 响应状态码: {response.status_code}")
 
             if response.status_code == 200:
@@ -194,10 +200,7 @@ class TokenManager:
                 kwargs["proxy"] = proxy_url
                 print(f"🌐 使用代理: {proxy_url}")
 
-            response = await session.get(
-                "https://sora.chatgpt.com/backend/project_y/invite/mine",
-                **kwargs
-            )
+            response = await self._get(session, "https://sora.chatgpt.com/backend/project_y/invite/mine", **kwargs)
 
             print(f"📥 响应状态码: {response.status_code}")
 
@@ -303,10 +306,7 @@ class TokenManager:
                 kwargs["proxy"] = proxy_url
                 print(f"🌐 使用代理: {proxy_url}")
 
-            response = await session.get(
-                "https://sora.chatgpt.com/backend/nf/check",
-                **kwargs
-            )
+            response = await self._get(session, "https://sora.chatgpt.com/backend/nf/check", **kwargs)
 
             print(f"📥 响应状态码: {response.status_code}")
 
@@ -520,7 +520,7 @@ class TokenManager:
             debug_logger.log_info(f"[ST_TO_AT] 📡 请求 URL: {url}")
 
             try:
-                response = await session.get(url, **kwargs)
+                response = await self._get(session, url, **kwargs)
                 debug_logger.log_info(f"[ST_TO_AT] 📥 响应状态码: {response.status_code}")
 
                 if response.status_code != 200:
@@ -921,6 +921,7 @@ class TokenManager:
     async def delete_token(self, token_id: int):
         """Delete a token"""
         await self.db.delete_token(token_id)
+        self.proxy_manager.invalidate_token(token_id)
 
     async def update_token(self, token_id: int,
                           token: Optional[str] = None,
@@ -947,6 +948,8 @@ class TokenManager:
         await self.db.update_token(token_id, token=token, st=st, rt=rt, client_id=client_id, proxy_url=proxy_url, remark=remark, expiry_time=expiry_time,
                                    image_enabled=image_enabled, video_enabled=video_enabled,
                                    image_concurrency=image_concurrency, video_concurrency=video_concurrency)
+        if proxy_url is not None:
+            self.proxy_manager.invalidate_token(token_id)
 
         # If token (AT) is updated and not in offline mode, test it and clear expired flag if valid
         if token and not skip_status_update:
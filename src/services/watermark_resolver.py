@@ -0,0 +1,163 @@
+"""Watermark-free URL resolution module"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from ..core.config import config
+from ..core.logger import debug_logger
+from ..core.models import WatermarkFreeConfig
+from ..core.ttl_cache import TTLCache
+from .sora_client import SoraClient
+
+# Parse method names as stored in the watermark-free config
+METHOD_BUILTIN = "sora_downloader"
+METHOD_EXTERNAL = "sora_downloader_external"
+METHOD_CUSTOM = "custom"
+METHOD_THIRD_PARTY = "third_party"
+
+
+class ParseMethodStats:
+    """Success rate and latency of one parse method"""
+
+    def __init__(self):
+        self.attempts = 0
+        self.successes = 0
+        self.failures = 0
+        self.wins = 0  # Times this method's URL was the one used
+        self.total_latency = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "attempts": self.attempts,
+            "successes": self.successes,
+            "failures": self.failures,
+            "wins": self.wins,
+            "success_rate": round(self.successes / self.attempts, 3) if self.attempts else None,
+            "avg_latency": round(self.total_latency / self.successes, 3) if self.successes else None
+        }
+
+
+class WatermarkFreeResolver:
+    """Resolves a published post to its watermark-free URL
+
+    The configured parse method starts first; the other usable parsers are started when it
+    fails or has not answered within watermark_free.hedge_delay seconds, and the first valid
+    URL wins. Resolved URLs are cached per post ID.
+    """
+
+    def __init__(self, sora_client: SoraClient):
+        self.sora_client = sora_client
+        self._cache = TTLCache(maxsize=1024, ttl=config.watermark_free_url_cache_ttl)
+        self.stats: Dict[str, ParseMethodStats] = {}
+
+    def _candidates(self, post_id: str, watermark_config: WatermarkFreeConfig, token: Optional[str],
+                    token_id: Optional[int]) -> List[Tuple[str, Callable[[], Awaitable[str]]]]:
+        """Usable parsers, the configured one first"""
+        parse_url = watermark_config.custom_parse_url
+        parse_token = watermark_config.custom_parse_token
+        parsers = {
+            METHOD_BUILTIN: lambda: self.sora_client.get_watermark_free_url_builtin(
+                post_id=post_id,
+                token=token,
+                token_id=token_id
+            )
+        }
+        # External servers share the URL/token settings, so only the configured kind is usable
+        if watermark_config.parse_method == METHOD_EXTERNAL and parse_url:
+            parsers[METHOD_EXTERNAL] = lambda: self.sora_client.get_watermark_free_url_sora_downloader(
+                parse_url=parse_url,
+                parse_token=parse_token or "",
+                post_id=post_id
+            )
+        if watermark_config.parse_method == METHOD_CUSTOM and parse_url and parse_token:
+            parsers[METHOD_CUSTOM] = lambda: self.sora_client.get_watermark_free_url_custom(
+                parse_url=parse_url,
+                parse_token=parse_token,
+                post_id=post_id
+            )
+
+        primary = watermark_config.parse_method
+        if primary in (METHOD_EXTERNAL, METHOD_CUSTOM) and primary not in parsers:
+            raise Exception(f"Parse server URL or token not configured for {primary}")
+        ordered = [primary] + [name for name in parsers if name != primary]
+        return [(name, parsers[name]) for name in ordered if name in parsers]
+
+    async def resolve(self, post_id: str, watermark_config: WatermarkFreeConfig,
+                      token: Optional[str] = None, token_id: Optional[int] = None) -> Tuple[str, str]:
+        """Get the watermark-free URL of a post
+
+        Returns:
+            (url, parse method that produced it)
+        """
+        cached = self._cache.get(post_id)
+        if cached:
+            return cached
+
+        if watermark_config.parse_method not in (METHOD_BUILTIN, METHOD_EXTERNAL, METHOD_CUSTOM):
+            # Third-party parse (default) is a URL template, nothing to race
+            return f"https://oscdn2.dyysy.com/MP4/{post_id}.mp4", METHOD_THIRD_PARTY
+
+        candidates = self._candidates(post_id, watermark_config, token, token_id)
+        running: Dict[asyncio.Task, str] = {}
+        errors: List[str] = []
+        next_index = 0
+
+        def start_next():
+            nonlocal next_index
+            name, parser = candidates[next_index]
+            next_index += 1
+            running[asyncio.create_task(self._run_parser(name, parser))] = name
+
+        start_next()
+        try:
+            while running:
+                hedge = next_index < len(candidates)
+                done, _ = await asyncio.wait(
+                    running, timeout=config.watermark_free_hedge_delay if hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Slowest path: hedge with the next parser while the current ones keep going
+                    debug_logger.log_info(f"Watermark-free parse for {post_id} slow, hedging with {candidates[next_index][0]}")
+                    start_next()
+                    continue
+                for task in done:
+                    name = running.pop(task)
+                    try:
+                        url = task.result()
+                    except Exception as e:
+                        errors.append(f"{name}: {str(e)}")
+                        continue
+                    self.stats[name].wins += 1
+                    self._cache.set(post_id, (url, name))
+                    return url, name
+                # Everything that finished failed: fall through to the next parser right away
+                if not running and next_index < len(candidates):
+                    start_next()
+        finally:
+            for task in running:
+                task.cancel()
+
+        raise Exception("All watermark-free parsers failed: " + "; ".join(errors))
+
+    async def _run_parser(self, name: str, parser: Callable[[], Awaitable[str]]) -> str:
+        """Run one parser, recording its outcome; an empty or non-http result counts as a failure"""
+        stats = self.stats.setdefault(name, ParseMethodStats())
+        stats.attempts += 1
+        start_time = time.time()
+        try:
+            url = await parser()
+            if not url or not url.startswith("http"):
+                raise Exception(f"Invalid URL returned: {url!r}")
+        except asyncio.CancelledError:
+            stats.attempts -= 1  # Lost the race, not a verdict on the method
+            raise
+        except Exception:
+            stats.failures += 1
+            raise
+        stats.successes += 1
+        stats.total_latency += time.time() - start_time
+        return url
+
+    def get_stats(self) -> dict:
+        """Get per parse method statistics"""
+        return {name: stats.to_dict() for name, stats in self.stats.items()}
@@ -0,0 +1,186 @@
+"""Webhook delivery module"""
+import asyncio
+import hashlib
+import hmac
+import random
+import time
+from typing import Optional
+from curl_cffi.requests import AsyncSession
+from ..core.config import config
+from ..core.database import Database
+from ..core.models import Task
+from ..core.logger import debug_logger
+from ..core.serialization import dumps, loads
+from ..core.url_guard import UnsafeURLError, ensure_public_url, pinned_options
+
+# Task status -> webhook event
+TASK_EVENTS = {
+    "completed": "generation.completed",
+    "failed": "generation.failed",
+    "cancelled": "generation.cancelled"
+}
+
+
+def sign_payload(body: bytes, timestamp: int) -> str:
+    """HMAC-SHA256 over "<timestamp>.<body>", keyed by the webhook secret (API key when unset)"""
+    secret = (config.webhook_secret or config.api_key).encode()
+    digest = hmac.new(secret, str(timestamp).encode() + b"." + body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+class WebhookDispatcher:
+    """Delivers completion webhooks from the durable outbox table
+
+    Finished tasks are written to the outbox first and delivered by a background loop,
+    so pending deliveries survive restarts and are retried with exponential backoff.
+    URLs are checked again before every attempt and the delivery connects only to the
+    addresses that were checked, a URL that now resolves to a non-public address is given
+    up at once. Redirects are not followed.
+    """
+
+    def __init__(self, db: Database):
+        self.db = db
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    async def enqueue(self, task: Task) -> Optional[int]:
+        """Queue the completion webhook of a finished task
+
+        Uses the task's webhook_url, falling back to the configured default URL.
+
+        Returns:
+            Outbox ID, or None if no webhook applies
+        """
+        url = task.webhook_url or config.webhook_default_url
+        if not url or task.status not in TASK_EVENTS:
+            return None
+
+        result_urls = None
+        if task.result_urls:
+            try:
+                result_urls = loads(task.result_urls)
+            except Exception:
+                result_urls = [task.result_urls]
+
+        duration = None
+        if task.created_at and task.completed_at:
+            duration = round((task.completed_at - task.created_at).total_seconds(), 1)
+
+        payload = {
+            "event": TASK_EVENTS[task.status],
+            "task_id": task.task_id,
+            "job_id": task.job_id,
+            "model": task.model,
+            "status": task.status,
+            "result_urls": result_urls,
+            "error": task.error_message,
+            "created_at": task.created_at.isoformat() if task.created_at else None,
+            "completed_at": task.completed_at.isoformat() if task.completed_at else None,
+            "duration": duration
+        }
+        outbox_id = await self.db.enqueue_webhook(task.task_id, url, dumps(payload).decode())
+        self._wakeup.set()
+        return outbox_id
+
+    async def start(self):
+        """Start the delivery loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the delivery loop, undelivered webhooks stay in the outbox"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        """Deliver due webhooks, then sleep until the next one is due or a new one is queued"""
+        while True:
+            try:
+                due = await self.db.get_due_webhooks()
+                if due:
+                    limit = asyncio.Semaphore(max(1, config.webhook_max_concurrency))
+                    await asyncio.gather(*(self._deliver_limited(limit, entry) for entry in due))
+                    continue
+
+                next_due = await self.db.get_next_webhook_due_at()
+                timeout = config.webhook_idle_interval if next_due is None else \
+                    max(0.0, min(next_due - time.time(), config.webhook_idle_interval))
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                debug_logger.log_error(
+                    error_message=f"Webhook dispatcher error: {str(e)}",
+                    status_code=0,
+                    response_text=""
+                )
+                await asyncio.sleep(config.webhook_idle_interval)
+
+    async def _deliver_limited(self, limit: asyncio.Semaphore, entry: dict):
+        """Deliver one webhook once a delivery slot is free"""
+        async with limit:
+            await self._deliver(entry)
+
+    async def _deliver(self, entry: dict):
+        """POST one signed payload; any 2xx counts as delivered"""
+        attempts = entry["attempts"] + 1
+        body = entry["payload"].encode()
+        timestamp = int(time.time())
+        headers = {
+            "Content-Type": "application/json",
+            "X-Webhook-Id": str(entry["id"]),
+            "X-Webhook-Timestamp": str(timestamp),
+            "X-Webhook-Signature": sign_payload(body, timestamp)
+        }
+        try:
+            resolve = await ensure_public_url(entry["url"])
+        except UnsafeURLError as e:
+            # Not retried: the receiver is not allowed, not unreachable
+            error = str(e)[:500]
+            await self.db.reschedule_webhook(entry["id"], attempts, None, error)
+            debug_logger.log_error(
+                error_message=f"Webhook for task {entry['task_id']} refused: {error}",
+                status_code=0,
+                response_text=error
+            )
+            return
+
+        try:
+            async with AsyncSession(curl_options=pinned_options(resolve)) as session:
+                response = await session.post(entry["url"], data=body, headers=headers,
+                                              timeout=config.webhook_timeout, allow_redirects=False)
+            if 200 <= response.status_code < 300:
+                await self.db.mark_webhook_delivered(entry["id"], attempts)
+                debug_logger.log_info(f"Webhook delivered for task {entry['task_id']} (attempt {attempts})")
+                return
+            error = f"HTTP {response.status_code}"
+        except Exception as e:
+            error = str(e)[:500]
+
+        if attempts >= config.webhook_max_attempts:
+            await self.db.reschedule_webhook(entry["id"], attempts, None, error)
+            debug_logger.log_error(
+                error_message=f"Webhook for task {entry['task_id']} failed after {attempts} attempts: {error}",
+                status_code=0,
+                response_text=error
+            )
+            return
+
+        # Exponential backoff with full jitter on the upper half
+        backoff = min(config.webhook_max_backoff, config.webhook_base_backoff * (2 ** (attempts - 1)))
+        next_attempt_at = time.time() + random.uniform(backoff / 2, backoff)
+        await self.db.reschedule_webhook(entry["id"], attempts, next_attempt_at, error)
+        debug_logger.log_info(f"Webhook for task {entry['task_id']} failed ({error}), retry {attempts + 1} in {backoff:.0f}s")
+
+    async def get_stats(self) -> dict:
+        """Get outbox statistics"""
+        return await self.db.get_webhook_outbox_stats()
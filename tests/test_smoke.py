@@ -0,0 +1,32 @@
+"""Smoke checks: the application module imports and its services are wired together"""
+import asyncio
+
+import pytest
+
+from src.core.database import Database
+
+
+def test_app_imports_and_wires_services():
+    from src import main
+
+    handler = main.generation_handler
+    assert handler.media_fetcher.proxy_manager is main.proxy_manager
+    assert handler.file_cache is not None
+    assert main.job_executor.generation_handler is handler
+
+
+def test_database_schema_initializes(tmp_path):
+    db = Database(str(tmp_path / "smoke.db"))
+    asyncio.run(db.init_db())
+    # init_db runs on every start, it must be safe to repeat
+    asyncio.run(db.init_db())
+
+
+def test_spool_dir_is_not_publicly_served(monkeypatch):
+    from src.core.config import config
+    from src.services.media_spool import get_spool_dir
+
+    assert get_spool_dir().name == "spool"
+    monkeypatch.setitem(config._config, "uploads", {"spool_dir": "tmp/uploads"})
+    with pytest.raises(ValueError):
+        get_spool_dir()